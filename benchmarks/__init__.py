@@ -0,0 +1,7 @@
+"""Benchmarks for the hot paths of the app.
+
+Each benchmark is a module that can be run on its own (from the root of the
+repository), e.g `python -m benchmarks.registry`. The results are written
+as JSON (see `benchmarks.common`) and can be compared between commits with
+`python -m benchmarks.compare <old.json> <new.json>`.
+"""
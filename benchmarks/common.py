@@ -0,0 +1,155 @@
+from typing import Any, Callable, Dict, List, Optional
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results")
+# the format of the results files (changed if they can no longer be compared)
+RESULTS_FORMAT = 1
+
+
+def prepare_environment(work_dir: str) -> None:
+    """Point the app at a fresh database and storage within a folder.
+
+    This needs to be done before anything from `src.app` is imported
+    since the environment is read at import time.
+
+    Args:
+        work_dir (str): The (empty) folder to use.
+    """
+    storage_path = os.path.join(work_dir, "models")
+    os.makedirs(storage_path, exist_ok=True)
+    os.environ["MEDCATMLFLOW_DB_URI"] = (
+        "sqlite:///" + os.path.join(work_dir, "mlflow.db"))
+    os.environ["MEDCATMLFLOW_MODEL_STORAGE_PATH"] = storage_path
+    os.environ["MEDCATMLFLOW_LOGS_PATH"] = os.path.join(work_dir, "logs")
+    # NOTE: the benchmarks shouldn't wait for or reject any work
+    os.environ.setdefault("MEDCATMLFLOW_ADMISSION_MEMORY_MB", str(1024 ** 2))
+
+
+def summarise(times: List[float]) -> Dict[str, float]:
+    """Summarise the times of a number of calls.
+
+    Args:
+        times (List[float]): The times in seconds.
+
+    Returns:
+        Dict[str, float]: The minimum, median, mean and maximum time.
+    """
+    return {"min": min(times), "median": statistics.median(times),
+            "mean": statistics.mean(times), "max": max(times)}
+
+
+def time_call(func: Callable[[], Any], repeat: int,
+              setup: Optional[Callable[[], Any]] = None,
+              warmup: int = 1) -> Dict[str, float]:
+    """Time a call.
+
+    Args:
+        func (Callable[[], Any]): The call to time.
+        repeat (int): The number of times to time it.
+        setup (Optional[Callable[[], Any]]): Called (untimed) before each
+            call, e.g to clear a cache.
+        warmup (int): The number of (untimed) calls before timing.
+
+    Returns:
+        Dict[str, float]: The minimum, median, mean and maximum time
+            in seconds (see `summarise`).
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    times: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarise(times)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True,
+                             cwd=os.path.dirname(__file__), check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def get_git_info() -> Dict[str, Any]:
+    """Get the commit the benchmarks were run at.
+
+    Returns:
+        Dict[str, Any]: The commit (if known) and whether there were
+            uncommitted changes.
+    """
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(status) if status is not None else None}
+
+
+def new_results(benchmark: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Start the results of a benchmark run.
+
+    Args:
+        benchmark (str): The name of the benchmark.
+        params (Dict[str, Any]): The parameters of the run.
+
+    Returns:
+        Dict[str, Any]: The (empty) results.
+    """
+    return {
+        "format": RESULTS_FORMAT,
+        "benchmark": benchmark,
+        **get_git_info(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": [],
+    }
+
+
+def add_result(results: Dict[str, Any], name: str, size: int,
+               timings: Dict[str, float], **extra: Any) -> None:
+    """Add (and print) the timings of a call.
+
+    Args:
+        results (Dict[str, Any]): The results of the run.
+        name (str): The name of the timed call.
+        size (int): The size it was timed at.
+        timings (Dict[str, float]): The timings (see `time_call`).
+        **extra (Any): Anything else worth recording (e.g the number of
+            items returned).
+    """
+    results["results"].append({"name": name, "size": size, **timings,
+                               **extra})
+    print(f"{name:<40} {size:>8} {timings['median'] * 1000:>12.2f} ms")
+
+
+def get_default_output(benchmark: str) -> str:
+    commit = get_git_info()["commit"] or "unknown"
+    return os.path.join(RESULTS_PATH, f"{benchmark}-{commit[:10]}.json")
+
+
+def write_results(results: Dict[str, Any], path: str) -> None:
+    """Write the results of a run.
+
+    Args:
+        results (Dict[str, Any]): The results.
+        path (str): The JSON file to write.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to '{path}'")
@@ -0,0 +1,94 @@
+"""Compare the results of two benchmark runs (e.g before and after a change).
+
+Run from the root of the repository:
+    python -m benchmarks.compare <old.json> <new.json>
+
+The median times of the calls timed in both runs are compared and the
+ones that got slower by more than the threshold are marked. The exit
+status is 1 if there were any.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import argparse
+import json
+import sys
+
+from .common import RESULTS_FORMAT
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"Unknown results format in '{path}': "
+                         f"{results.get('format')}")
+    return results
+
+
+def _by_key(results: Dict[str, Any]
+            ) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    return {(res["name"], res["size"]): res for res in results["results"]}
+
+
+def _describe(results: Dict[str, Any]) -> str:
+    commit = (results.get("commit") or "unknown")[:10]
+    dirty = " (with uncommitted changes)" if results.get("dirty") else ""
+    return f"{commit}{dirty} at {results['timestamp']}"
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float) -> List[Tuple[str, int, float, float, bool]]:
+    """Compare the median times of two runs.
+
+    Args:
+        old (Dict[str, Any]): The results of the old run.
+        new (Dict[str, Any]): The results of the new run.
+        threshold (float): The ratio (new / old) above which a call
+            is considered to have gotten slower.
+
+    Returns:
+        List[Tuple[str, int, float, float, bool]]: The name, size, old and
+            new median times and whether it got slower for each call
+            timed in both runs.
+    """
+    old_results = _by_key(old)
+    out = []
+    for key, new_res in _by_key(new).items():
+        if key not in old_results:
+            continue
+        old_time = old_results[key]["median"]
+        new_time = new_res["median"]
+        slower = old_time > 0 and new_time / old_time > threshold
+        out.append((key[0], key[1], old_time, new_time, slower))
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("old", help="The results of the old run")
+    parser.add_argument("new", help="The results of the new run")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="The ratio (new / old) above which a call is "
+                        "marked as slower")
+    args = parser.parse_args(argv)
+    old, new = _load(args.old), _load(args.new)
+    if old["benchmark"] != new["benchmark"]:
+        raise ValueError(f"Can't compare '{old['benchmark']}' results to "
+                         f"'{new['benchmark']}' results")
+    if old["params"] != new["params"]:
+        print("WARNING: The runs used different parameters")
+    print(f"Old: {_describe(old)}")
+    print(f"New: {_describe(new)}")
+    print(f"{'name':<40} {'size':>8} {'old (ms)':>12} {'new (ms)':>12} "
+          f"{'ratio':>8}")
+    compared = compare(old, new, args.threshold)
+    for name, size, old_time, new_time, slower in compared:
+        ratio = new_time / old_time if old_time > 0 else float("inf")
+        print(f"{name:<40} {size:>8} {old_time * 1000:>12.2f} "
+              f"{new_time * 1000:>12.2f} {ratio:>8.2f}"
+              f"{'  SLOWER' if slower else ''}")
+    return int(any(slower for *_, slower in compared))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
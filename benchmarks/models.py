@@ -0,0 +1,56 @@
+"""Benchmark model loading and evaluation as the models grow.
+
+Seeded synthetic model packs (see `benchmarks.packs`) of each size and
+matching MCT-format datasets are made. Loading the model, creating its
+metadata, getting its CUI counts and its performance on the dataset
+are timed at each size.
+
+Run from the root of the repository:
+    python -m benchmarks.models --sizes 100 1000 10000
+"""
+from typing import List, Optional
+
+import argparse
+import tempfile
+
+from .common import prepare_environment, get_default_output, write_results
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10000],
+                        help="The numbers of concepts in the models")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="The number of times to time each call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--names-per-cui", type=int, default=3,
+                        help="The number of names of each concept")
+    parser.add_argument("--vocab-size", type=int,
+                        help="The number of words in the vocab (defaults "
+                        "to twice the number of concepts, at least 1000)")
+    parser.add_argument("--vector-size", type=int, default=300,
+                        help="The size of the word and context vectors")
+    parser.add_argument("--docs", type=int, default=50,
+                        help="The number of documents in the datasets")
+    parser.add_argument("--annotations-per-doc", type=int, default=10,
+                        help="The number of annotations in each document")
+    parser.add_argument("--output", help="The results file (defaults to "
+                        "benchmarks/results/models-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    with tempfile.TemporaryDirectory() as work_dir:
+        prepare_environment(work_dir)
+        # NOTE: the app reads the environment when it's imported
+        from .models_suite import run
+        results = run(args.sizes, args.repeat, args.seed,
+                      args.names_per_cui, args.vocab_size, args.vector_size,
+                      args.docs, args.annotations_per_doc)
+    write_results(results, args.output or get_default_output("models"))
+
+
+if __name__ == "__main__":
+    main()
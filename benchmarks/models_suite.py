@@ -0,0 +1,96 @@
+"""The model benchmarks (see `benchmarks.models` for running them).
+
+NOTE: The app reads its environment at import time, so this module must
+      only be imported once `common.prepare_environment` has been called.
+"""
+from typing import Any, Dict, List, Optional
+
+import contextlib
+import os
+import time
+
+from src.app.main.envs import STORAGE_PATH
+from src.app.medcat_linkage.medcat_integration import (
+    load_CAT, get_cui_counts_for_model, get_model_performance_with_dataset
+)
+from src.app.medcat_linkage.metadata import create_meta
+
+from .common import time_call, new_results, add_result
+from .packs import SyntheticPack, make_model_pack, make_dataset
+
+
+def _get_performance(pack: SyntheticPack, dataset_path: str) -> None:
+    # NOTE: MedCAT prints the stats (of each CUI) and its progress
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        get_model_performance_with_dataset(pack.file_path, dataset_path)
+
+
+def _time_at_size(results: Dict[str, Any], pack: SyntheticPack,
+                  dataset_path: str, size: int, repeat: int) -> None:
+    pack_size = os.path.getsize(pack.file_path)
+    add_result(results, "load_CAT", size,
+               time_call(lambda: load_CAT(pack.file_path,
+                                          keep_in_cache=False), repeat),
+               pack_size=pack_size)
+    # NOTE: the CDB hash is known so that MedCATtrainer isn't asked
+    hash2mct_id = {pack.cdb_hash: None}
+    add_result(results, "create_meta", size,
+               time_call(lambda: create_meta(
+                   pack.file_path, model_name="synthetic",
+                   description="synthetic", category="synthetic",
+                   run_id="synthetic", hash2mct_id=hash2mct_id), repeat),
+               pack_size=pack_size)
+    # NOTE: these use the (short lived) model cache - the first (untimed)
+    #       call loads the model
+    cuis = list(pack.names)
+    add_result(results, "get_cui_counts_for_model", size,
+               time_call(lambda: get_cui_counts_for_model(pack.file_path,
+                                                          cuis), repeat),
+               nr_of_cuis=len(cuis))
+    add_result(results, "get_model_performance_with_dataset", size,
+               time_call(lambda: _get_performance(pack, dataset_path),
+                         repeat))
+
+
+def run(sizes: List[int], repeat: int, seed: int, names_per_cui: int,
+        vocab_size: Optional[int], vector_size: int, nr_of_docs: int,
+        annotations_per_doc: int) -> Dict[str, Any]:
+    """Make a synthetic model pack (and dataset) of each size and time
+    the model loading and evaluation paths.
+
+    Args:
+        sizes (List[int]): The numbers of concepts in the models.
+        repeat (int): The number of times to time each call.
+        seed (int): The random seed.
+        names_per_cui (int): The number of names of each concept.
+        vocab_size (Optional[int]): The number of words in the vocab.
+            Defaults to twice the number of concepts (at least 1000).
+        vector_size (int): The size of the word and context vectors.
+        nr_of_docs (int): The number of documents in the dataset.
+        annotations_per_doc (int): The number of annotations per document.
+
+    Returns:
+        Dict[str, Any]: The results.
+    """
+    results = new_results("models", {
+        "sizes": sizes, "repeat": repeat, "seed": seed,
+        "names_per_cui": names_per_cui, "vocab_size": vocab_size,
+        "vector_size": vector_size, "nr_of_docs": nr_of_docs,
+        "annotations_per_doc": annotations_per_doc})
+    for size in sorted(sizes):
+        print(f"Making a model pack with {size} concepts")
+        start = time.perf_counter()
+        pack = make_model_pack(
+            STORAGE_PATH, seed=seed, nr_of_cuis=size,
+            names_per_cui=names_per_cui,
+            vocab_size=vocab_size or max(1000, 2 * size),
+            vector_size=vector_size)
+        dataset_path = make_dataset(
+            pack, os.path.join(STORAGE_PATH, f"dataset_{size}.json"),
+            seed=seed, nr_of_docs=nr_of_docs,
+            annotations_per_doc=annotations_per_doc)
+        print(f"Made in {time.perf_counter() - start:.1f} seconds")
+        _time_at_size(results, pack, dataset_path, size, repeat)
+    return results
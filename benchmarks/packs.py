@@ -0,0 +1,247 @@
+"""Seeded synthetic MedCAT model packs and MCT-format datasets.
+
+The packs are tiny (or not so tiny) but valid: they have a CDB with the
+requested number of concepts and names (some of them trained), a vocab
+with word vectors and a blank spacy model, and are saved with
+`CAT.create_model_pack` so that they load like any other pack. The
+datasets annotate the names of the concepts in the pack so that the
+model actually finds (most of) them.
+"""
+from typing import Dict, List, Optional, Set
+
+import json
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+import spacy
+from medcat.cat import CAT
+from medcat.cdb import CDB
+from medcat.config import Config
+from medcat.vocab import Vocab
+
+from .synthetic import make_cuis
+
+
+_SYLLABLES = ("ab", "ac", "al", "an", "ar", "ba", "ca", "de", "di", "do",
+              "el", "en", "er", "fa", "ge", "hy", "id", "in", "is", "ka",
+              "la", "li", "lo", "ma", "me", "mi", "na", "ne", "no", "os",
+              "pa", "pe", "po", "ra", "re", "ro", "sa", "se", "si", "ta",
+              "te", "ti", "to", "ul", "um", "ur", "va", "ve", "xa", "zo")
+_MAX_NAME_TOKENS = 3
+_NR_OF_TYPES = 20
+_WORDS_BETWEEN_ANNOTATIONS = (3, 15)
+# the unigram table is only used for (negative sampling in) training,
+# so it's kept small (MedCAT's default size is 100M)
+_UNIGRAM_TABLE_SIZE_PER_WORD = 100
+
+
+@dataclass
+class SyntheticPack:
+    """A synthetic model pack.
+
+    Args:
+        file_path (str): The model pack ZIP.
+        cdb_hash (str): The hash of its CDB (once loaded).
+        names (Dict[str, List[str]]): The (raw) names of each concept.
+        words (List[str]): The words in the vocab.
+    """
+    file_path: str
+    cdb_hash: str
+    names: Dict[str, List[str]]
+    words: List[str]
+
+
+def _make_words(rng: random.Random, nr_of_words: int) -> List[str]:
+    words: Set[str] = set()
+    while len(words) < nr_of_words:
+        words.add("".join(rng.choice(_SYLLABLES)
+                          for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _make_names(rng: random.Random, words: List[str],
+                names_per_cui: int) -> List[str]:
+    names: Set[str] = set()
+    while len(names) < names_per_cui:
+        nr_of_tokens = rng.randint(1, _MAX_NAME_TOKENS)
+        names.add(" ".join(rng.choice(words) for _ in range(nr_of_tokens)))
+    return sorted(names)
+
+
+def _prepare_names(raw_names: List[str], separator: str) -> Dict[str, dict]:
+    # same format as medcat.preprocessing.cleaners.prepare_name
+    # NOTE: the names are lower case words (i.e need no cleaning)
+    names = {}
+    for raw_name in raw_names:
+        tokens = raw_name.split(" ")
+        snames = {separator.join(tokens[:nr + 1])
+                  for nr in range(len(tokens))}
+        names[separator.join(tokens)] = {"tokens": tokens, "snames": snames,
+                                         "raw_name": raw_name,
+                                         "is_upper": False}
+    return names
+
+
+def _make_vocab(rng: random.Random, np_rng: np.random.RandomState,
+                words: List[str], vector_size: int) -> Vocab:
+    vocab = Vocab()
+    for word in words:
+        vocab.add_word(word, cnt=rng.randint(1, 100000),
+                       vec=np_rng.uniform(-1, 1, vector_size),
+                       replace=True)
+    vocab.make_unigram_table(
+        table_size=len(words) * _UNIGRAM_TABLE_SIZE_PER_WORD)
+    return vocab
+
+
+def _make_cdb(rng: random.Random, np_rng: np.random.RandomState,
+              config: Config, names: Dict[str, List[str]],
+              vector_size: int, trained_fraction: float) -> CDB:
+    cdb = CDB(config=config)
+    separator = config.general.separator
+    context_types = list(config.linking.context_vector_sizes)
+    for cui, raw_names in names.items():
+        type_ids = {f"T{rng.randrange(_NR_OF_TYPES):03d}"}
+        # the first name is the preferred one
+        cdb._add_concept(cui, _prepare_names(raw_names[:1], separator),
+                         ontologies={"SYNTHETIC"}, name_status="P",
+                         type_ids=type_ids, description="",
+                         full_build=True)
+        cdb.add_names(cui, _prepare_names(raw_names[1:], separator),
+                      name_status="A", full_build=True)
+        if rng.random() < trained_fraction:
+            cdb.cui2count_train[cui] = rng.randint(1, 1000)
+            cdb.cui2context_vectors[cui] = {
+                context_type: np_rng.uniform(-1, 1, vector_size)
+                for context_type in context_types}
+    return cdb
+
+
+def _make_spacy_model(folder: str) -> str:
+    spacy_path = os.path.join(folder, "spacy_model")
+    nlp = spacy.blank("en")
+    nlp.meta["name"] = "synthetic"
+    nlp.to_disk(spacy_path)
+    return spacy_path
+
+
+def make_model_pack(save_dir: str, seed: int = 42, nr_of_cuis: int = 100,
+                    names_per_cui: int = 3, vocab_size: int = 1000,
+                    vector_size: int = 300, trained_fraction: float = 0.5,
+                    pack_name: Optional[str] = None) -> SyntheticPack:
+    """Make a (valid) synthetic model pack.
+
+    The concept names are made up of the words in the vocab.
+
+    Args:
+        save_dir (str): The folder to save the pack in.
+        seed (int): The random seed. Defaults to 42.
+        nr_of_cuis (int): The number of concepts. Defaults to 100.
+        names_per_cui (int): The number of names of each concept.
+            Defaults to 3.
+        vocab_size (int): The number of words in the vocab.
+            Defaults to 1000.
+        vector_size (int): The size of the word and context vectors.
+            Defaults to 300.
+        trained_fraction (float): The fraction of the concepts that
+            have been trained. Defaults to 0.5.
+        pack_name (Optional[str]): The name of the pack (before MedCAT
+            adds the hash). Defaults to one based on the size.
+
+    Returns:
+        SyntheticPack: The model pack.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.RandomState(seed)
+    words = _make_words(rng, vocab_size)
+    names = {cui: _make_names(rng, words, names_per_cui)
+             for cui in make_cuis(nr_of_cuis)}
+    config = Config()
+    config.version.description = (
+        f"Synthetic model with {nr_of_cuis} concepts (seed {seed})")
+    config.version.ontology = ["SYNTHETIC"]
+    config.version.location = "synthetic"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # NOTE: the spacy model is copied into the pack
+        config.general.spacy_model = _make_spacy_model(temp_dir)
+        cat = CAT(cdb=_make_cdb(rng, np_rng, config, names, vector_size,
+                                trained_fraction),
+                  config=config,
+                  vocab=_make_vocab(rng, np_rng, words, vector_size))
+        full_name = cat.create_model_pack(
+            save_dir, pack_name or f"synthetic_{nr_of_cuis}_cuis")
+    # NOTE: the hash of the loaded CDB (i.e with the config of the pack)
+    #       differs from that of the one in memory
+    cdb_hash = CAT.load_model_pack(
+        os.path.join(save_dir, full_name)).cdb.get_hash()
+    return SyntheticPack(file_path=os.path.join(save_dir, full_name + ".zip"),
+                         cdb_hash=cdb_hash, names=names, words=words)
+
+
+def _make_document(rng: random.Random, pack: SyntheticPack, doc_id: int,
+                   project: dict, nr_of_annotations: int) -> dict:
+    cuis = list(pack.names)
+    text = ""
+    annotations = []
+    for ann_id in range(nr_of_annotations):
+        nr_of_words = rng.randint(*_WORDS_BETWEEN_ANNOTATIONS)
+        text += " ".join(rng.choice(pack.words)
+                         for _ in range(nr_of_words)) + " "
+        cui = rng.choice(cuis)
+        value = rng.choice(pack.names[cui])
+        annotations.append({
+            "id": doc_id * nr_of_annotations + ann_id,
+            "user": "synthetic",
+            "cui": cui,
+            "value": value,
+            "start": len(text),
+            "end": len(text) + len(value),
+            "validated": True,
+            "correct": True,
+            "deleted": False,
+            "alternative": False,
+            "killed": False,
+            "irrelevant": False,
+            "acc": 1.0,
+            "meta_anns": {},
+            "project name": project["name"],
+            "document name": f"Document #{doc_id}",
+            "project id": project["id"],
+            "document id": doc_id,
+        })
+        text += value + ". "
+    return {"id": doc_id, "name": f"Document #{doc_id}", "text": text,
+            "last_modified": "2023-01-01 00:00:00.000000",
+            "annotations": annotations}
+
+
+def make_dataset(pack: SyntheticPack, file_path: str, seed: int = 42,
+                 nr_of_docs: int = 20, annotations_per_doc: int = 10) -> str:
+    """Make a (MCT export format) dataset for a synthetic model pack.
+
+    Each document annotates names of (random) concepts in the pack,
+    separated by (random) words in the vocab.
+
+    Args:
+        pack (SyntheticPack): The model pack.
+        file_path (str): The JSON file to write.
+        seed (int): The random seed. Defaults to 42.
+        nr_of_docs (int): The number of documents. Defaults to 20.
+        annotations_per_doc (int): The number of annotations in each
+            document. Defaults to 10.
+
+    Returns:
+        str: The path of the dataset.
+    """
+    rng = random.Random(seed)
+    project = {"name": "Synthetic project", "id": 0,
+               "cuis": "", "tuis": "", "documents": []}
+    project["documents"] = [
+        _make_document(rng, pack, doc_id, project, annotations_per_doc)
+        for doc_id in range(nr_of_docs)]
+    with open(file_path, 'w') as f:
+        json.dump({"projects": [project]}, f)
+    return file_path
@@ -0,0 +1,58 @@
+"""Benchmark the registry hot paths at a number of registry sizes.
+
+A local SQLite-backed MLflow registry is filled with synthetic models
+(with realistic tags and version histories), datasets and cached
+performance results. The model metadata, lineage trees, version history,
+(cached) performance lookup and plot rendering are timed at each size.
+
+Run from the root of the repository:
+    python -m benchmarks.registry --sizes 10 100 500
+"""
+from typing import List, Optional
+
+import argparse
+import tempfile
+
+from .common import prepare_environment, get_default_output, write_results
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10, 100, 500],
+                        help="The numbers of registered models to time at")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="The number of times to time each call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--categories", type=int, default=5,
+                        help="The number of categories (experiments)")
+    parser.add_argument("--datasets", type=int, default=2,
+                        help="The number of datasets")
+    parser.add_argument("--cuis", type=int, default=500,
+                        help="The number of CUIs in the models")
+    parser.add_argument("--cuis-per-dataset", type=int, default=100,
+                        help="The number of CUIs in each dataset")
+    parser.add_argument("--examples", type=int, default=1,
+                        help="The number of examples per CUI in the "
+                        "cached results")
+    parser.add_argument("--compared", type=int, default=5,
+                        help="The number of models compared at once")
+    parser.add_argument("--output", help="The results file (defaults to "
+                        "benchmarks/results/registry-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    with tempfile.TemporaryDirectory() as work_dir:
+        prepare_environment(work_dir)
+        # NOTE: the app reads the environment when it's imported
+        from .registry_suite import run
+        results = run(args.sizes, args.repeat, args.seed, args.categories,
+                      args.datasets, args.cuis, args.cuis_per_dataset,
+                      args.examples, args.compared)
+    write_results(results, args.output or get_default_output("registry"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""The registry benchmarks (see `benchmarks.registry` for running them).
+
+NOTE: The app reads its environment at import time, so this module must
+      only be imported once `common.prepare_environment` has been called.
+"""
+from typing import Any, Dict, List
+
+import hashlib
+import logging
+import os
+import random
+import time
+
+from flask import Flask
+
+from src.app.main.envs import STORAGE_PATH
+from src.app.main.models import setup_db, db, TestDataset
+from src.app.medcat_linkage.metadata import ModelMetaData
+from src.app.modelmanage.mlflow_integration import (
+    setup_mlflow, has_experiment, create_mlflow_experiment,
+    _mlflow_pre_meta, _register_model, _change_model_count,
+    get_all_model_metadata, get_all_trees_with_links, get_history
+)
+from src.app.performance.cache import add_to_cache
+from src.app.performance.datasets import DATASET_PATH
+from src.app.performance.datasets import find_or_load_performance
+from src.app.performance import imaging
+
+from .common import time_call, summarise, new_results, add_result
+from .synthetic import RegistryGenerator, make_cuis, make_performance_result
+
+
+class _Registry:
+
+    def __init__(self, generator: RegistryGenerator, rng: random.Random,
+                 dataset_cuis: Dict[str, List[str]],
+                 nr_of_examples: int) -> None:
+        self.generator = generator
+        # NOTE: separate from the generator so that the models don't
+        #       depend on the size of the results
+        self.rng = rng
+        self.dataset_cuis = dataset_cuis
+        self.nr_of_examples = nr_of_examples
+        self.models: List[ModelMetaData] = []
+        self.register_times: List[float] = []
+
+    def _register(self, values: Dict[str, Any]) -> ModelMetaData:
+        category = values["category"]
+        if not has_experiment(category):
+            create_mlflow_experiment(category, f"Synthetic {category}")
+        pack_hash = hashlib.sha256(values["name"].encode()).hexdigest()
+        # same steps as for an upload, apart from reading the pack
+        run_id = _mlflow_pre_meta(category, pack_hash,
+                                  values["description"])
+        meta = ModelMetaData(run_id=run_id, **values)
+        _register_model(meta, os.path.join(STORAGE_PATH,
+                                           meta.model_file_name))
+        _change_model_count(category, 1)
+        return meta
+
+    def _cache_results(self, meta: ModelMetaData) -> None:
+        for ds_name, cuis in self.dataset_cuis.items():
+            perf = make_performance_result(self.rng, cuis,
+                                           self.nr_of_examples)
+            add_to_cache(meta.id, ds_name, perf)  # type: ignore
+
+    def grow(self, nr_of_models: int) -> None:
+        while len(self.models) < nr_of_models:
+            values = self.generator.next_model()
+            start = time.perf_counter()
+            meta = self._register(values)
+            self.register_times.append(time.perf_counter() - start)
+            self._cache_results(meta)
+            self.models.append(meta)
+
+    def get_deepest(self) -> ModelMetaData:
+        return max(self.models, key=lambda meta: len(meta.version_history))
+
+
+def _add_datasets(rng: random.Random, nr_of_datasets: int,
+                  nr_of_cuis: int, cuis_per_dataset: int
+                  ) -> Dict[str, List[str]]:
+    all_cuis = make_cuis(nr_of_cuis)
+    dataset_cuis: Dict[str, List[str]] = {}
+    for nr in range(nr_of_datasets):
+        ds_name = f"dataset{nr}.json"
+        db.session.add(TestDataset(
+            name=ds_name, category_name="synthetic",
+            description=f"Synthetic dataset {nr}",
+            file_path=os.path.join(DATASET_PATH, ds_name)))
+        dataset_cuis[ds_name] = sorted(rng.sample(
+            all_cuis, min(cuis_per_dataset, nr_of_cuis)))
+    db.session.commit()
+    return dataset_cuis
+
+
+def _clear_plots() -> None:
+    imaging._RENDER_CACHE.cache.clear()
+
+
+def _time_at_size(results: Dict[str, Any], registry: _Registry, size: int,
+                  prev_size: int, repeat: int, nr_compared: int) -> None:
+    # the models registered since the previous size
+    add_result(results, "register_model", size,
+               summarise(registry.register_times[prev_size:]))
+    add_result(results, "get_all_model_metadata", size,
+               time_call(get_all_model_metadata, repeat))
+    add_result(results, "get_all_trees_with_links", size,
+               time_call(get_all_trees_with_links, repeat),
+               nr_of_trees=len(get_all_trees_with_links()))
+    deepest = registry.get_deepest()
+    add_result(results, "get_history", size,
+               time_call(lambda: get_history(deepest), repeat),
+               depth=len(deepest.version_history))
+    compared = registry.models[-nr_compared:]
+    datasets = list(registry.dataset_cuis)
+    add_result(results, "find_or_load_performance", size,
+               time_call(lambda: find_or_load_performance(compared, datasets),
+                         repeat),
+               nr_compared=len(compared), nr_of_datasets=len(datasets))
+    perf = find_or_load_performance(compared, datasets)
+    # NOTE: the rendered plots are cached - this times the rendering
+    add_result(results, "get_buffers", size,
+               time_call(lambda: imaging.get_buffers(perf), repeat,
+                         setup=_clear_plots),
+               nr_compared=len(compared), nr_of_datasets=len(datasets))
+
+
+def run(sizes: List[int], repeat: int, seed: int, nr_of_categories: int,
+        nr_of_datasets: int, nr_of_cuis: int, cuis_per_dataset: int,
+        nr_of_examples: int, nr_compared: int) -> Dict[str, Any]:
+    """Fill the registry in steps and time the hot paths at each size.
+
+    Args:
+        sizes (List[int]): The number of registered models to time at.
+        repeat (int): The number of times to time each call.
+        seed (int): The random seed.
+        nr_of_categories (int): The number of categories (experiments).
+        nr_of_datasets (int): The number of datasets.
+        nr_of_cuis (int): The number of CUIs in the models.
+        cuis_per_dataset (int): The number of CUIs in each dataset.
+        nr_of_examples (int): The number of (fp, fn, tp) examples per CUI
+            in the cached results.
+        nr_compared (int): The number of models compared at once.
+
+    Returns:
+        Dict[str, Any]: The results.
+    """
+    results = new_results("registry", {
+        "sizes": sizes, "repeat": repeat, "seed": seed,
+        "nr_of_categories": nr_of_categories,
+        "nr_of_datasets": nr_of_datasets, "nr_of_cuis": nr_of_cuis,
+        "cuis_per_dataset": cuis_per_dataset,
+        "nr_of_examples": nr_of_examples, "nr_compared": nr_compared})
+    # NOTE: MLflow logs every model version it registers
+    #       (and its logging is set up when it's imported)
+    logging.getLogger("mlflow").setLevel(logging.WARNING)
+    app = Flask(__name__)
+    setup_db(app)
+    setup_mlflow()
+    generator = RegistryGenerator(seed, nr_of_categories, nr_of_cuis)
+    rng = random.Random(seed)
+    with app.app_context():
+        dataset_cuis = _add_datasets(rng, nr_of_datasets, nr_of_cuis,
+                                     cuis_per_dataset)
+        registry = _Registry(generator, rng, dataset_cuis, nr_of_examples)
+        prev_size = 0
+        for size in sorted(sizes):
+            print(f"Registering {size - prev_size} more models")
+            registry.grow(size)
+            _time_at_size(results, registry, size, prev_size, repeat,
+                          min(nr_compared, size))
+            prev_size = size
+    return results
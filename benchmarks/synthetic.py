@@ -0,0 +1,168 @@
+"""Seeded synthetic data for the benchmarks.
+
+Nothing from the app is imported here so that the data can be generated
+before the environment is set up (see `common.prepare_environment`).
+"""
+from typing import Any, Dict, List, Optional
+
+import random
+
+
+_WORDS = ("model", "trained", "on", "discharge", "summaries", "radiology",
+          "reports", "with", "supervised", "unsupervised", "training",
+          "for", "the", "SNOMED", "UMLS", "ICD10", "subset", "of",
+          "concepts", "filtered", "by", "type", "meta", "annotations",
+          "hospital", "notes", "updated", "vocab", "retrained", "linker")
+# the chance of a model starting a new lineage tree
+_NEW_TREE_CHANCE = 0.15
+# the chance of a model having a version in its history that was
+# never registered (e.g an intermediate training run)
+_UNREGISTERED_PARENT_CHANCE = 0.2
+# new models are mostly trained on top of one of the recent ones
+_RECENT_PARENTS = 10
+_EXAMPLES_PER_CUI = 3
+
+
+def make_cuis(nr_of_cuis: int) -> List[str]:
+    return [f"C{nr:07d}" for nr in range(nr_of_cuis)]
+
+
+class RegistryGenerator:
+    """Generates the metadata of models as they'd be registered over time.
+
+    The models are split between the categories and each one (mostly)
+    continues the version history of a recent model in the same category
+    so that the lineage trees are realistically deep and bushy.
+
+    Args:
+        seed (int): The random seed.
+        nr_of_categories (int): The number of categories (experiments).
+        nr_of_cuis (int): The number of CUIs in the (largest) models.
+    """
+
+    def __init__(self, seed: int, nr_of_categories: int = 5,
+                 nr_of_cuis: int = 200) -> None:
+        self.rng = random.Random(seed)
+        self.categories = [f"category{nr}" for nr in range(nr_of_categories)]
+        self.nr_of_cuis = nr_of_cuis
+        self.nr_of_models = 0
+        self._recent: Dict[str, List[Dict[str, Any]]] = {
+            category: [] for category in self.categories}
+
+    def _make_version(self) -> str:
+        return "%016x" % self.rng.getrandbits(64)
+
+    def _make_text(self, nr_of_words: int) -> str:
+        return " ".join(self.rng.choice(_WORDS) for _ in range(nr_of_words))
+
+    def _make_stats(self) -> Dict[str, Any]:
+        # same keys as medcat's CDB.make_stats
+        nr_of_concepts = self.rng.randint(self.nr_of_cuis // 2,
+                                          self.nr_of_cuis)
+        nr_trained = self.rng.randint(0, nr_of_concepts)
+        nr_of_examples = nr_trained * self.rng.randint(1, 500)
+        return {
+            "Number of concepts": nr_of_concepts,
+            "Number of names": nr_of_concepts * self.rng.randint(2, 6),
+            "Number of concepts that received training": nr_trained,
+            "Number of seen training examples in total": nr_of_examples,
+            "Average training examples per concept": (
+                nr_of_examples / nr_trained if nr_trained else 0.0),
+        }
+
+    def _make_performance(self) -> Dict[str, Any]:
+        # same format as medcat's config.version.performance
+        if self.rng.random() < 0.5:
+            return {"ner": {}, "meta": {}}
+        prec, recall = self.rng.uniform(0.5, 1), self.rng.uniform(0.5, 1)
+        return {
+            "ner": {"precision": prec, "recall": recall,
+                    "f1": 2 * prec * recall / (prec + recall)},
+            "meta": {"Status": {"f1": self.rng.uniform(0.5, 1),
+                                "precision": self.rng.uniform(0.5, 1),
+                                "recall": self.rng.uniform(0.5, 1)}},
+        }
+
+    def _get_history(self, category: str) -> List[str]:
+        recent = self._recent[category]
+        if not recent or self.rng.random() < _NEW_TREE_CHANCE:
+            return []
+        parent = self.rng.choice(recent[-_RECENT_PARENTS:])
+        history = parent["version_history"] + [parent["version"]]
+        if self.rng.random() < _UNREGISTERED_PARENT_CHANCE:
+            history.append(self._make_version())
+        return history
+
+    def next_model(self) -> Dict[str, Any]:
+        """Generate the metadata of the next model.
+
+        The values are the same as the fields of the app's ModelMetaData
+        (apart from the run ID which is only known once registered).
+
+        Returns:
+            Dict[str, Any]: The model metadata values.
+        """
+        nr = self.nr_of_models
+        self.nr_of_models += 1
+        category = self.rng.choice(self.categories)
+        model = {
+            "id": "%032x" % self.rng.getrandbits(128),
+            "name": f"{category}_model_{nr}",
+            "description": self._make_text(self.rng.randint(5, 30)),
+            "category": category,
+            "version": self._make_version(),
+            "version_history": self._get_history(category),
+            "cdb_hash": "%016x" % self.rng.getrandbits(64),
+            "stats": self._make_stats(),
+            "performance": self._make_performance(),
+            "changed_parts": [],
+            "model_file_name": f"{category}_model_{nr}.zip",
+            "mct_cdb_id": (str(self.rng.randint(1, 50))
+                           if self.rng.random() < 0.7 else None),
+        }
+        self._recent[category].append(model)
+        return model
+
+
+def _make_example(rng: random.Random, cui: str) -> Dict[str, Any]:
+    start = rng.randint(0, 5000)
+    return {"text": " ".join(rng.choice(_WORDS) for _ in range(20)),
+            "cui": cui, "start": start, "end": start + rng.randint(3, 30)}
+
+
+def make_performance_result(rng: random.Random, cuis: List[str],
+                            nr_of_examples: Optional[int] = None
+                            ) -> Dict[str, Any]:
+    """Make the (per dataset) performance results of a model.
+
+    The format is the same as the app's PerDatasetPerformanceResult.
+
+    Args:
+        rng (random.Random): The random number generator.
+        cuis (List[str]): The CUIs in the dataset.
+        nr_of_examples (Optional[int]): The number of examples per CUI for
+            each of fp, fn and tp. Defaults to 3.
+
+    Returns:
+        Dict[str, Any]: The performance results.
+    """
+    if nr_of_examples is None:
+        nr_of_examples = _EXAMPLES_PER_CUI
+    prec = {cui: rng.uniform(0.3, 1) for cui in cuis}
+    recall = {cui: rng.uniform(0.3, 1) for cui in cuis}
+    f1 = {cui: 2 * prec[cui] * recall[cui] / (prec[cui] + recall[cui])
+          for cui in cuis}
+    return {
+        "False positives": rng.randint(0, 50 * len(cuis)),
+        "False negatives": rng.randint(0, 50 * len(cuis)),
+        "True positives": rng.randint(0, 500 * len(cuis)),
+        "Precision for each CUI": prec,
+        "Recall for each CUI": recall,
+        "F1 for each CUI": f1,
+        "Counts for each CUI": {cui: rng.randint(1, 500) for cui in cuis},
+        "Examples for each of the fp, fn, tp": {
+            kind: {cui: [_make_example(rng, cui)
+                         for _ in range(nr_of_examples)]
+                   for cui in cuis}
+            for kind in ("fp", "fn", "tp")},
+    }
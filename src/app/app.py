@@ -6,13 +6,18 @@ import logging
 
 from .main.models import setup_db
 
-from .main.utils import setup_logging
+from .main.utils import setup_logging, setup_request_ids
+from .main.metrics import setup_metrics
+from .main.profiling import setup_profiling
 
 # blueprints
 from .main.views import main_bp
 from .modelmanage.views import models_bp
 from .performance.views import perf_bp
-from .modelmanage.mlflow_integration import setup_mlflow
+from .modelmanage.mlflow_integration import setup_mlflow, get_pack_cdb_hash
+from .medcat_linkage.medcat_integration import set_cdb_hash_lookup
+from .modelmanage.search import setup_search_index
+from .modelmanage.preload import preload_pinned_models
 
 # setup logging for root logger
 logger = logging.getLogger()
@@ -22,16 +27,26 @@ def create_app() -> Flask:
     setup_logging(logger)
     app = Flask(__name__)
     app.debug = True
+    setup_request_ids(app)
+    setup_metrics(app)
+    setup_profiling(app)
 
     # setup the database
     setup_db(app)
+    setup_search_index(app)
 
     # setup mlflow
     setup_mlflow()
+    # loaded models with the same CDB hash share the CDB
+    set_cdb_hash_lookup(get_pack_cdb_hash)
 
     # setup blueprints
 
     app.register_blueprint(main_bp)
     app.register_blueprint(models_bp)
     app.register_blueprint(perf_bp)
+
+    # NOTE: last so that everything loaded before is shared (copy-on-write)
+    #       by the gunicorn workers when preloading
+    preload_pinned_models(app)
     return app
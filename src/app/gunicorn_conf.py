@@ -0,0 +1,8 @@
+# gunicorn settings (see run_app.sh)
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # drop the (live) metrics of the worker that exited
+    multiprocess.mark_process_dead(worker.pid)
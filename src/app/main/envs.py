@@ -2,11 +2,49 @@ import os
 
 STORAGE_PATH = os.environ.get("MEDCATMLFLOW_MODEL_STORAGE_PATH",
                               "/app/db/medcatmlflow/models/")
+# unpacked model packs (least recently used ones are removed above the quota)
+EXTRACTION_PATH = os.environ.get("MEDCATMLFLOW_EXTRACTION_PATH",
+                                 os.path.join(STORAGE_PATH, ".extracted"))
+EXTRACTION_QUOTA_MB = int(os.environ.get("MEDCATMLFLOW_EXTRACTION_QUOTA_MB",
+                                         "20480"))
+# bulk imports through the web UI can only read packs from here
+IMPORT_PATH = os.environ.get("MEDCATMLFLOW_IMPORT_PATH",
+                             "/app/db/medcatmlflow/import/")
+IMPORT_WORKERS = int(os.environ.get("MEDCATMLFLOW_IMPORT_WORKERS", "2"))
+# recalculating (stale) model metadata
+RECALC_WORKERS = int(os.environ.get("MEDCATMLFLOW_RECALC_WORKERS", "2"))
+RECALC_MEMORY_MB = int(os.environ.get("MEDCATMLFLOW_RECALC_MEMORY_MB",
+                                      "8192"))
+# admission control for the work that loads models (per gunicorn worker)
+# NOTE: work that doesn't fit in the memory budget waits in a queue and is
+#       rejected if the queue is full or it waits for too long
+ADMISSION_MEMORY_MB = int(os.environ.get("MEDCATMLFLOW_ADMISSION_MEMORY_MB",
+                                         "8192"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("MEDCATMLFLOW_ADMISSION_MAX_QUEUE",
+                                         "8"))
+ADMISSION_TIMEOUT_SECONDS = float(os.environ.get(
+    "MEDCATMLFLOW_ADMISSION_TIMEOUT_SECONDS", "120"))
+# models (registered names or IDs) loaded at startup and kept loaded
+# NOTE: with gunicorn's --preload they're loaded once and shared by the workers
+PINNED_MODELS = [name.strip() for name in os.environ.get(
+    "MEDCATMLFLOW_PINNED_MODELS", "").split(",") if name.strip()]
 
 LOG_PATH = os.environ.get("MEDCATMLFLOW_LOGS_PATH",
                           os.path.join("..", "..", "logs"))
 LOG_BACKUP_DAYS = int(os.environ.get("MEDCATMLFLOW_LOG_BACKUP_DAYS", "30"))
 LOG_LEVEL = os.environ.get("MEDCATMLFLOW_LOG_LEVEL", "INFO")
+# either "text" or "json" (one object per line, with the request ID)
+LOG_FORMAT = os.environ.get("MEDCATMLFLOW_LOG_FORMAT", "text").lower()
+
+# per request profiling (saved under LOG_PATH/profiles)
+# NOTE: profiles every request if enabled, otherwise only the requests with
+#       the (admin) token in the query (?profile=<token>)
+PROFILE_ALL_REQUESTS = os.environ.get(
+    "MEDCATMLFLOW_PROFILE_ALL_REQUESTS", "false").lower() in ("true", "1",
+                                                              "yes")
+PROFILE_TOKEN = os.environ.get("MEDCATMLFLOW_PROFILE_TOKEN") or None
+PROFILE_MAX_FILES = int(os.environ.get("MEDCATMLFLOW_PROFILE_MAX_FILES",
+                                       "100"))
 
 # linking to MedCATtrainer
 MCT_USERNAME = os.environ.get("MCT_USERNAME", "admin")
@@ -15,3 +53,28 @@ MCT_PASSWORD = os.environ.get("MCT_PASSWORD", "admin")
 MCT_BASE_URL = os.environ.get("MCT_BASE_URL")
 
 MEDCATMLFLOW_DB_URI = os.environ.get("MEDCATMLFLOW_DB_URI")
+
+# rendered performance graphs
+PLOT_CACHE_SECONDS = int(os.environ.get("MEDCATMLFLOW_PLOT_CACHE_SECONDS",
+                                        "3600"))
+PLOT_CACHE_SIZE = int(os.environ.get("MEDCATMLFLOW_PLOT_CACHE_SIZE", "128"))
+# plot modes are chosen by the number of CUIs to plot:
+#  - up to PLOT_FULL_MAX_CUIS - every CUI is shown
+#  - up to PLOT_DOWNSAMPLE_MAX_CUIS - lines are downsampled
+#  - above that - top-k / histogram summaries
+PLOT_FULL_MAX_CUIS = int(os.environ.get("MEDCATMLFLOW_PLOT_FULL_MAX_CUIS",
+                                        "50"))
+PLOT_DOWNSAMPLE_MAX_CUIS = int(os.environ.get(
+    "MEDCATMLFLOW_PLOT_DOWNSAMPLE_MAX_CUIS", "1000"))
+PLOT_MAX_POINTS = int(os.environ.get("MEDCATMLFLOW_PLOT_MAX_POINTS", "200"))
+PLOT_TOP_K = int(os.environ.get("MEDCATMLFLOW_PLOT_TOP_K", "20"))
+
+# background pre-evaluation of newly uploaded models / datasets
+PREEVALUATE = os.environ.get("MEDCATMLFLOW_PREEVALUATE",
+                             "false").lower() in ("true", "1", "yes")
+PREEVALUATE_WORKERS = int(os.environ.get("MEDCATMLFLOW_PREEVALUATE_WORKERS",
+                                         "1"))
+PREEVALUATE_MEMORY_MB = int(os.environ.get(
+    "MEDCATMLFLOW_PREEVALUATE_MEMORY_MB", "8192"))
+PREEVALUATE_RECENT_MODELS = int(os.environ.get(
+    "MEDCATMLFLOW_PREEVALUATE_RECENT_MODELS", "5"))
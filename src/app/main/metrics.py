@@ -0,0 +1,140 @@
+from typing import Any, Tuple
+
+import os
+import time
+from functools import wraps
+
+from flask import Flask, g, request
+from flask.wrappers import Response
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client import CollectorRegistry, REGISTRY
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+
+
+# NOTE: With gunicorn, each worker writes its metrics to its own files in
+#       PROMETHEUS_MULTIPROC_DIR (set up by run_app.sh) and the files
+#       of all the workers are merged whenever the metrics are read.
+
+# buckets for the work that loads models (seconds to minutes)
+_SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+                 600.0)
+
+REQUEST_DURATION = Histogram(
+    "medcatmlflow_request_duration_seconds",
+    "The time taken to handle a request (until the response is returned)",
+    ["endpoint", "method", "status"])
+MLFLOW_CALL_DURATION = Histogram(
+    "medcatmlflow_mlflow_call_duration_seconds",
+    "The time taken by the calls to the MLflow client", ["method"])
+MCT_CALL_DURATION = Histogram(
+    "medcatmlflow_mct_call_duration_seconds",
+    "The time taken by the calls to MedCATtrainer", ["endpoint"])
+CAT_LOAD_DURATION = Histogram(
+    "medcatmlflow_cat_load_duration_seconds",
+    "The time taken to load a model", buckets=_SLOW_BUCKETS)
+EVALUATION_DURATION = Histogram(
+    "medcatmlflow_evaluation_duration_seconds",
+    "The time taken to evaluate a model against a dataset",
+    buckets=_SLOW_BUCKETS)
+PLOT_RENDER_DURATION = Histogram(
+    "medcatmlflow_plot_render_duration_seconds",
+    "The time taken to render a plot")
+CACHE_REQUESTS = Counter(
+    "medcatmlflow_cache_requests_total",
+    "The number of cache lookups", ["cache", "result"])
+ADMISSION_USED_BYTES = Gauge(
+    "medcatmlflow_admission_used_bytes",
+    "The (estimated) memory reserved by the admitted work", ["budget"],
+    multiprocess_mode="livesum")
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "medcatmlflow_admission_queue_depth",
+    "The number of requests waiting to be admitted", ["budget"],
+    multiprocess_mode="livesum")
+ADMISSION_REJECTED = Counter(
+    "medcatmlflow_admission_rejected_total",
+    "The number of requests rejected by the admission control", ["budget"])
+
+
+def record_cache_lookups(cache_name: str, nr_of_hits: int,
+                         nr_of_misses: int = 0) -> None:
+    """Record the number of cache hits and misses.
+
+    Args:
+        cache_name (str): The name of the cache.
+        nr_of_hits (int): The number of hits.
+        nr_of_misses (int): The number of misses.
+    """
+    if nr_of_hits:
+        CACHE_REQUESTS.labels(cache_name, "hit").inc(nr_of_hits)
+    if nr_of_misses:
+        CACHE_REQUESTS.labels(cache_name, "miss").inc(nr_of_misses)
+
+
+class TimedProxy:
+    """Times the (public) method calls of the wrapped object.
+
+    Args:
+        obj (Any): The object to wrap.
+        histogram (Histogram): The histogram (labelled by method name).
+    """
+
+    def __init__(self, obj: Any, histogram: Histogram) -> None:
+        self._obj = obj
+        self._histogram = histogram
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._obj, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        histogram = self._histogram.labels(name)
+
+        @wraps(attr)
+        def timed(*args, **kwargs):
+            with histogram.time():
+                return attr(*args, **kwargs)
+        return timed
+
+
+def _start_timer() -> None:
+    g.request_start_time = time.perf_counter()
+
+
+def _record_request(response: Response) -> Response:
+    start = g.pop("request_start_time", None)
+    if start is not None:
+        # NOTE: the rule rather than the path so that the number of
+        #       label values stays limited
+        endpoint = (request.url_rule.rule if request.url_rule is not None
+                    else "unmatched")
+        REQUEST_DURATION.labels(endpoint, request.method,
+                                str(response.status_code)).observe(
+            time.perf_counter() - start)
+    return response
+
+
+def setup_metrics(app: Flask) -> None:
+    """Record the latency of each request.
+
+    Args:
+        app (Flask): The app.
+    """
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+
+
+def get_metrics() -> Tuple[bytes, str]:
+    """Get the metrics in the Prometheus text format.
+
+    When running with multiple (gunicorn) workers, the metrics of all
+    the workers are merged.
+
+    Returns:
+        Tuple[bytes, str]: The metrics and their content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
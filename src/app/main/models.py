@@ -71,3 +71,136 @@ class ModelDatasetPerformanceResult(db.Model):  # type: ignore
             counts=json.dumps(data_dict.get('counts') or {}),
             examples=json.dumps(data_dict.get('examples') or {}),
         )
+
+
+class LineageNode(db.Model):  # type: ignore
+    version = db.Column(db.String(100), primary_key=True)
+    category = db.Column(db.String(100), nullable=False, index=True)
+    # for keeping the (insertion) order of siblings
+    order = db.Column(db.Integer, nullable=False, default=0)
+
+
+class LineageModel(db.Model):  # type: ignore
+    """A registered model of a version in the lineage graph.
+
+    A version without any is just a parent in some model's version
+    history. Several models can have the same version (e.g copies).
+    """
+    # NOTE: the (insertion) order picks the model shown for a version
+    id = db.Column(db.Integer, primary_key=True)
+    model_id = db.Column(db.String(100), nullable=False, unique=True)
+    version = db.Column(db.String(100), nullable=False, index=True)
+    model_name = db.Column(db.String(100), nullable=False)
+
+
+class LineageClosure(db.Model):  # type: ignore
+    """The closure table of the lineage graph.
+
+    There's one row for each (ancestor, descendant) pair, including
+    each node with itself (with a depth of 0).
+    Direct parent-child relationships have a depth of 1.
+    """
+    ancestor = db.Column(db.String(100), primary_key=True)
+    descendant = db.Column(db.String(100), primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False, index=True)
+
+
+class ModelSearchEntry(db.Model):  # type: ignore
+    """The searchable values of a registered model.
+
+    On SQLite, these are indexed by an FTS5 table that is kept in sync
+    by triggers (see modelmanage.search).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    model_id = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    category = db.Column(db.String(100), nullable=True, index=True)
+    version = db.Column(db.String(100), nullable=True)
+    run_id = db.Column(db.String(100), nullable=True)
+
+
+class ModelMetaDataRecord(db.Model):  # type: ignore
+    """The metadata of a registered model (see ModelMetaData).
+
+    The registry tags hold a copy of the same data, but this is what's
+    read by the app.
+    """
+    id = db.Column(db.String(100), primary_key=True)
+    # the name the model is registered under in MLflow
+    # NOTE: this doesn't change when the model is renamed
+    registered_name = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    category = db.Column(db.String(100), nullable=False, index=True)
+    version = db.Column(db.String(100), nullable=True, index=True)
+    version_history = db.Column(db.JSON, nullable=False, default=list)
+    cdb_hash = db.Column(db.String(100), nullable=True, index=True)
+    stats = db.Column(db.JSON, nullable=False, default=dict)
+    performance = db.Column(db.JSON, nullable=False, default=dict)
+    changed_parts = db.Column(db.JSON, nullable=False, default=list)
+    # NOTE: several models may share the same (content addressed) pack
+    model_file_name = db.Column(db.String(200), nullable=False, index=True)
+    run_id = db.Column(db.String(100), nullable=False)
+    mct_cdb_id = db.Column(db.String(100), nullable=True)
+
+
+class ModelMetaDataSource(db.Model):  # type: ignore
+    """What the metadata of a model was calculated from.
+
+    The metadata is stale if the pack has changed since or if it was
+    calculated with an older metadata version (see medcat_linkage.metadata).
+    """
+    model_id = db.Column(db.String(100), primary_key=True)
+    pack_hash = db.Column(db.String(64), nullable=True)
+    metadata_version = db.Column(db.Integer, nullable=False)
+
+
+class ExperimentModelCount(db.Model):  # type: ignore
+    """The (cached) number of registered models in each experiment."""
+    experiment_name = db.Column(db.String(100), primary_key=True)
+    nr_of_models = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ModelPack(db.Model):  # type: ignore
+    """A model pack (file) in the model storage.
+
+    The packs are stored under their content hash so that the same pack
+    is only stored once. The pack is referenced by the models (through
+    their model file name) and is removed along with the last of them.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    file_name = db.Column(db.String(200), nullable=False, unique=True)
+    # the (hex) SHA-256 of the file
+    pack_hash = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+
+
+class BackgroundJob(db.Model):  # type: ignore
+    """The progress of a (long running) background job.
+
+    The results (see BackgroundJobResult) are kept in the database so
+    that the progress can be followed from any worker.
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True)
+    # running, finished or failed
+    status = db.Column(db.String(20), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    nr_done = db.Column(db.Integer, nullable=False, default=0)
+    nr_failed = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    started = db.Column(db.DateTime, nullable=False)
+    finished = db.Column(db.DateTime, nullable=True)
+
+
+class BackgroundJobResult(db.Model):  # type: ignore
+    """The result of processing one item in a background job.
+
+    These are separate rows so that recording a result doesn't rewrite
+    all the previous ones.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), nullable=False, index=True)
+    item = db.Column(db.Text, nullable=False)
+    error = db.Column(db.Text, nullable=True)
@@ -0,0 +1,157 @@
+from typing import List, Optional, Tuple
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+from datetime import datetime
+
+from flask import Flask, g, request
+from flask.wrappers import Response
+
+from .envs import LOG_PATH, PROFILE_ALL_REQUESTS, PROFILE_TOKEN
+from .envs import PROFILE_MAX_FILES
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), LOG_PATH, "profiles")
+# the query parameter that holds the token
+PROFILE_PARAM = "profile"
+_PROFILE_SUFFIX = ".prof"
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def is_profiling_enabled() -> bool:
+    return PROFILE_ALL_REQUESTS or PROFILE_TOKEN is not None
+
+
+def has_valid_token(token: Optional[str]) -> bool:
+    """Check an (admin) profiling token.
+
+    Args:
+        token (Optional[str]): The token to check.
+
+    Returns:
+        bool: Whether the token is valid.
+    """
+    if PROFILE_TOKEN is None or token is None:
+        return False
+    return hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def _should_profile() -> bool:
+    return (PROFILE_ALL_REQUESTS
+            or has_valid_token(request.args.get(PROFILE_PARAM)))
+
+
+def _start_profile() -> None:
+    if not _should_profile():
+        return
+    profiler = cProfile.Profile()
+    g.profiler = profiler
+    profiler.enable()
+
+
+def _get_profile_name() -> str:
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    endpoint = _UNSAFE_CHARS.sub("_", request.endpoint or "unmatched")
+    return f"{timestamp}_{endpoint}{_PROFILE_SUFFIX}"
+
+
+def _remove_old_profiles() -> None:
+    for name in list_profiles()[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_PATH, name))
+        except OSError as e:
+            logger.warning("Unable to remove old profile '%s'", name,
+                           exc_info=e)
+
+
+def _save_profile(response: Response) -> Response:
+    profiler: Optional[cProfile.Profile] = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    os.makedirs(PROFILE_PATH, exist_ok=True)
+    name = _get_profile_name()
+    profiler.dump_stats(os.path.join(PROFILE_PATH, name))
+    logger.info("Saved the profile of %s %s to '%s'", request.method,
+                request.path, name)
+    _remove_old_profiles()
+    return response
+
+
+def setup_profiling(app: Flask) -> None:
+    """Profile requests (if enabled).
+
+    A request is profiled if all requests are profiled
+    (MEDCATMLFLOW_PROFILE_ALL_REQUESTS) or if it has the admin token
+    (MEDCATMLFLOW_PROFILE_TOKEN) in the `profile` query parameter.
+    The (cProfile) profiles are saved under the log path with the
+    endpoint and a timestamp in the name.
+
+    Nothing is hooked into the app unless profiling is enabled.
+
+    Args:
+        app (Flask): The app.
+    """
+    if not is_profiling_enabled():
+        return
+    logger.info("Profiling %s", "all requests" if PROFILE_ALL_REQUESTS
+                else "the requests with the profiling token")
+    app.before_request(_start_profile)
+    app.after_request(_save_profile)
+
+
+def list_profiles() -> List[str]:
+    """List the saved profiles.
+
+    Returns:
+        List[str]: The profile (file) names, newest first.
+    """
+    if not os.path.isdir(PROFILE_PATH):
+        return []
+    return sorted((name for name in os.listdir(PROFILE_PATH)
+                   if name.endswith(_PROFILE_SUFFIX)), reverse=True)
+
+
+def get_profile_path(name: str) -> Optional[str]:
+    """Get the path of a saved profile.
+
+    Args:
+        name (str): The profile name.
+
+    Returns:
+        Optional[str]: The path (if there's such a profile).
+    """
+    if name not in list_profiles():
+        return None
+    return os.path.join(PROFILE_PATH, name)
+
+
+def get_profile_summary(name: str, sort_by: str = "cumulative",
+                        limit: int = 50) -> Optional[Tuple[str, str]]:
+    """Get the summary of a saved profile.
+
+    Args:
+        name (str): The profile name.
+        sort_by (str): The pstats sort key. Defaults to cumulative.
+        limit (int): The number of functions to show. Defaults to 50.
+
+    Returns:
+        Optional[Tuple[str, str]]: The sort key used and the summary
+            (if there's such a profile).
+    """
+    path = get_profile_path(name)
+    if path is None:
+        return None
+    if sort_by not in pstats.Stats.sort_arg_dict_default:
+        sort_by = "cumulative"
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort_by).print_stats(limit)
+    return sort_by, out.getvalue()
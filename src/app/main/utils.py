@@ -1,18 +1,38 @@
-from typing import Iterable, Callable, List, Dict, Tuple, Set
+from typing import Iterable, Callable, List, Dict, Tuple, Set, Optional, Any
+from typing import Deque, Iterator
 import os
 import sys
+import re
+import copy
+import json
+import queue
+import atexit
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
 from functools import wraps
+from uuid import uuid4
 import time
+import threading
 
 from anytree import Node, RenderTree
+from flask import Flask, Response, g, request
 
 import logging
 from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener
 
 
 from .envs import LOG_PATH
 from .envs import LOG_BACKUP_DAYS
 from .envs import LOG_LEVEL
+from .envs import LOG_FORMAT
+from .envs import ADMISSION_MEMORY_MB, ADMISSION_MAX_QUEUE
+from .envs import ADMISSION_TIMEOUT_SECONDS
+from .metrics import record_cache_lookups
+from .metrics import ADMISSION_USED_BYTES, ADMISSION_QUEUE_DEPTH
+from .metrics import ADMISSION_REJECTED
 
 logger = logging.getLogger(__name__)
 
@@ -148,51 +168,244 @@ def get_all_trees(nodes: Iterable[Node],
     return trees
 
 
-def setup_logging(logger: logging.Logger) -> None:
-    logger.setLevel(LOG_LEVEL)
+# the ID of the request being handled (in the current thread)
+_REQUEST_ID: ContextVar[Optional[str]] = ContextVar("request_id",
+                                                    default=None)
+REQUEST_ID_HEADER = "X-Request-ID"
+# incoming request IDs are only used if they're sensible
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def get_request_id() -> Optional[str]:
+    """Get the ID of the request being handled.
+
+    Returns:
+        Optional[str]: The request ID (or None outside of a request).
+    """
+    return _REQUEST_ID.get()
+
+
+def _start_request() -> None:
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    if not _VALID_REQUEST_ID.match(request_id):
+        request_id = uuid4().hex
+    g.request_id_token = _REQUEST_ID.set(request_id)
+
+
+def _add_request_id(response: Response) -> Response:
+    request_id = get_request_id()
+    if request_id is not None:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def _end_request(exc: Optional[BaseException]) -> None:
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        _REQUEST_ID.reset(token)
+
+
+def setup_request_ids(app: Flask) -> None:
+    """Give each request an ID (for the logs).
+
+    The ID is taken from the X-Request-ID header if there is a (valid) one
+    and returned in the same header.
+
+    Args:
+        app (Flask): The app.
+    """
+    app.before_request(_start_request)
+    app.after_request(_add_request_id)
+    app.teardown_request(_end_request)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the ID of the current request (if any) to the log records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id()
+        return True
 
-    # Define the log file and log format
+
+class JsonFormatter(logging.Formatter):
+    """Formats the log records as JSON objects (one per line)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exception"] = record.exc_text
+        if record.stack_info:
+            out["stack"] = record.stack_info
+        return json.dumps(out, default=str)
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    # NOTE: the queue is unbounded so putting a record never blocks
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message (and exception) is resolved right away since the
+        # arguments may change before the record is written, but the
+        # formatting is left to the handlers
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_LOG_HANDLER: Optional[_NonBlockingQueueHandler] = None
+_LOG_LISTENER: Optional[QueueListener] = None
+
+
+def _get_formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _make_handlers() -> List[logging.Handler]:
+    log_format = _get_formatter()
+    # Define the log file
     log_file = os.path.join(os.path.dirname(__file__),
                             os.path.join(LOG_PATH, "medcatmlflow.log"))
-    log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
     # Add a rotating file handler, which creates a new log file every day
     file_handler = TimedRotatingFileHandler(log_file, when="midnight",
                                             backupCount=LOG_BACKUP_DAYS)
     file_handler.setFormatter(log_format)
-    logger.addHandler(file_handler)
 
     # Add a stream handler to log to stdout (Docker container's console)
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(log_format)
-    logger.addHandler(stream_handler)
+    return [file_handler, stream_handler]
+
+
+def _start_listener(handlers: List[logging.Handler]) -> None:
+    global _LOG_LISTENER
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    if _LOG_HANDLER is not None:
+        _LOG_HANDLER.queue = log_queue
+    _LOG_LISTENER = QueueListener(log_queue, *handlers,
+                                  respect_handler_level=True)
+    _LOG_LISTENER.start()
+
+
+def stop_logging(logger: Optional[logging.Logger] = None) -> None:
+    """Write out the queued log records and stop the background writer.
+
+    Args:
+        logger (Optional[logging.Logger]): The logger to detach the
+            queue from (if specified).
+    """
+    global _LOG_HANDLER, _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+        for handler in _LOG_LISTENER.handlers:
+            handler.close()
+        _LOG_LISTENER = None
+    if logger is not None and _LOG_HANDLER is not None:
+        logger.removeHandler(_LOG_HANDLER)
+        _LOG_HANDLER = None
+
+
+def _restart_listener_after_fork() -> None:
+    # the thread of the listener doesn't survive a fork (e.g gunicorn
+    # workers with --preload) so each child needs its own
+    if _LOG_LISTENER is not None:
+        _start_listener(list(_LOG_LISTENER.handlers))
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+atexit.register(stop_logging)
+
+
+def setup_logging(logger: logging.Logger) -> None:
+    """Set up logging to the log file and stdout.
+
+    The records are put on a queue and written by a background thread
+    so that the (request) threads never wait for the log I/O. The
+    records have the ID of the request they were logged in.
+
+    Args:
+        logger (logging.Logger): The logger (i.e the root logger).
+    """
+    global _LOG_HANDLER
+    # in case it was set up before
+    stop_logging(logger)
+    logger.setLevel(LOG_LEVEL)
+    _LOG_HANDLER = _NonBlockingQueueHandler(queue.SimpleQueue())
+    _LOG_HANDLER.addFilter(RequestIdFilter())
+    logger.addHandler(_LOG_HANDLER)
+    _start_listener(_make_handlers())
 
 
 class ExpiringCache:
 
-    def __init__(self, expiration_seconds):
-        self.cache = {}
+    def __init__(self, expiration_seconds, max_items: Optional[int] = None,
+                 name: Optional[str] = None):
+        self.cache: Dict[Any, Tuple[Any, float]] = {}
         self.expiration_seconds = expiration_seconds
+        # if specified, the oldest items get dropped when the limit is reached
+        self.max_items = max_items
+        # if specified, the hits and misses are recorded in the metrics
+        self.name = name
+        self._lock = threading.Lock()
+
+    def _record(self, hit: bool) -> None:
+        if self.name is not None:
+            record_cache_lookups(self.name, int(hit), int(not hit))
+
+    def _get(self, key) -> Tuple[bool, Any]:
+        with self._lock:
+            value, timestamp = self.cache.get(key, (None, None))
+            if timestamp is None:
+                return False, None
+            if time.time() - timestamp > self.expiration_seconds:
+                # NOTE: under the lock so that a newer value that was just
+                #       set for the same key isn't dropped instead
+                del self.cache[key]
+                return False, None
+            return True, value
 
     def get(self, key):
-        value, timestamp = self.cache.get(key, (None, None))
-        if timestamp is None:
-            return None
-        if time.time() - timestamp > self.expiration_seconds:
-            return None
+        hit, value = self._get(key)
+        self._record(hit)
         return value
 
     def set(self, key, value):
-        self.cache[key] = (value, time.time())
+        with self._lock:
+            # re-insert so that the insertion order reflects the age
+            self.cache.pop(key, None)
+            self.cache[key] = (value, time.time())
+            if self.max_items is not None:
+                while len(self.cache) > self.max_items:
+                    del self.cache[next(iter(self.cache))]
 
     def invalidate(self, key):
-        if key in self.cache:
-            del self.cache[key]
+        with self._lock:
+            self.cache.pop(key, None)
 
 
 def expire_cache_after(seconds):
     def decorator(func):
-        cache = ExpiringCache(seconds)
+        cache = ExpiringCache(seconds, name=func.__qualname__)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -207,9 +420,202 @@ def expire_cache_after(seconds):
     return decorator
 
 
+# the loaded model takes up (roughly) this many times the size of the pack
+PACK_MEMORY_FACTOR = 3
+
+
+class AdmissionRejectedException(RuntimeError):
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Too busy to take on more work right now - {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """Admits work within a budget of (estimated) memory use.
+
+    Work that doesn't fit waits in a (first come first served) queue.
+    If the queue is full or the work waits for longer than the timeout,
+    it is rejected instead. Work that must not be rejected (i.e background
+    jobs) always waits.
+
+    If a single reservation is larger than the entire budget, it is
+    allowed when nothing else is running.
+
+    Args:
+        total_bytes (int): The total budget.
+        max_queue_size (Optional[int]): The maximum number of waiting
+            requests. Defaults to no limit.
+        timeout_seconds (Optional[float]): The maximum time to wait.
+            Defaults to no limit.
+        name (Optional[str]): If specified, the use, queue depth and
+            rejections are recorded in the metrics under this name.
+    """
+
+    def __init__(self, total_bytes: int,
+                 max_queue_size: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None,
+                 name: Optional[str] = None) -> None:
+        self.total_bytes = total_bytes
+        self.max_queue_size = max_queue_size
+        self.timeout_seconds = timeout_seconds
+        self.name = name
+        self.used_bytes = 0
+        self.nr_rejected = 0
+        self._cond = threading.Condition()
+        self._queue: Deque[object] = deque()
+        self._local = threading.local()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _fits(self, nr_of_bytes: int) -> bool:
+        if self.used_bytes == 0:
+            return True
+        return self.used_bytes + nr_of_bytes <= self.total_bytes
+
+    def _update_metrics(self) -> None:
+        if self.name is not None:
+            ADMISSION_USED_BYTES.labels(self.name).set(self.used_bytes)
+            ADMISSION_QUEUE_DEPTH.labels(self.name).set(len(self._queue))
+
+    def _reject(self, reason: str) -> AdmissionRejectedException:
+        self.nr_rejected += 1
+        if self.name is not None:
+            ADMISSION_REJECTED.labels(self.name).inc()
+        logger.warning("Rejecting work (%d bytes in use, %d waiting) - %s",
+                       self.used_bytes, len(self._queue), reason)
+        return AdmissionRejectedException(reason)
+
+    def acquire(self, nr_of_bytes: int, must_wait: bool = False) -> None:
+        """Reserve memory, waiting for it if needed.
+
+        Args:
+            nr_of_bytes (int): The (estimated) memory needed.
+            must_wait (bool): Whether to wait regardless of the queue
+                size and timeout. Defaults to False.
+
+        Raises:
+            AdmissionRejectedException: If the work is rejected.
+        """
+        with self._cond:
+            if not self._queue and self._fits(nr_of_bytes):
+                self.used_bytes += nr_of_bytes
+                self._update_metrics()
+                return
+            if (not must_wait and self.max_queue_size is not None
+                    and len(self._queue) >= self.max_queue_size):
+                raise self._reject("the queue is full")
+            ticket = object()
+            self._queue.append(ticket)
+            self._update_metrics()
+            logger.info("Queueing work for %d bytes (%d waiting)",
+                        nr_of_bytes, len(self._queue))
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: (self._queue[0] is ticket
+                             and self._fits(nr_of_bytes)),
+                    timeout=None if must_wait else self.timeout_seconds)
+                if not admitted:
+                    raise self._reject("timed out waiting in the queue")
+                self.used_bytes += nr_of_bytes
+            finally:
+                self._queue.remove(ticket)
+                self._update_metrics()
+                self._cond.notify_all()
+
+    def release(self, nr_of_bytes: int) -> None:
+        with self._cond:
+            self.used_bytes -= nr_of_bytes
+            self._update_metrics()
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, nr_of_bytes: int, must_wait: bool = False
+              ) -> Iterator[None]:
+        """Reserve memory for the duration of the context.
+
+        Nested admissions (within the same thread) don't reserve again,
+        i.e loading a model for an admitted evaluation.
+
+        Args:
+            nr_of_bytes (int): The (estimated) memory needed.
+            must_wait (bool): Whether to wait regardless of the queue
+                size and timeout. Defaults to False.
+
+        Raises:
+            AdmissionRejectedException: If the work is rejected.
+
+        Yields:
+            None: Once admitted.
+        """
+        if getattr(self._local, "admitted", False):
+            yield
+            return
+        self.acquire(nr_of_bytes, must_wait)
+        self._local.admitted = True
+        try:
+            yield
+        finally:
+            self._local.admitted = False
+            self.release(nr_of_bytes)
+
+    def get_status(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "total_bytes": self.total_bytes,
+                "used_bytes": self.used_bytes,
+                "queue_depth": len(self._queue),
+                "nr_rejected": self.nr_rejected,
+            }
+
+
+class MemoryBudget(AdmissionController):
+    """A blocking budget of (estimated) memory use.
+
+    Nothing is ever rejected - the work just waits for its turn.
+
+    Args:
+        total_bytes (int): The total budget.
+    """
+
+    def __init__(self, total_bytes: int) -> None:
+        super().__init__(total_bytes)
+
+
+_ADMISSION_CONTROLLER: Optional[AdmissionController] = None
+_ADMISSION_CONTROLLER_LOCK = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the admission controller for the (model loading) work.
+
+    The controller is per process (i.e per gunicorn worker).
+
+    Returns:
+        AdmissionController: The admission controller.
+    """
+    global _ADMISSION_CONTROLLER
+    with _ADMISSION_CONTROLLER_LOCK:
+        if _ADMISSION_CONTROLLER is None:
+            _ADMISSION_CONTROLLER = AdmissionController(
+                ADMISSION_MEMORY_MB * 1024 * 1024, ADMISSION_MAX_QUEUE,
+                ADMISSION_TIMEOUT_SECONDS, name="models")
+        return _ADMISSION_CONTROLLER
+
+
 class NoSuchModelExcepton(ValueError):
 
     def __init__(self, key: str, value: str) -> None:
         super().__init__(f"Could not find a model  where '{key}' = '{value}'")
         self.key = key
         self.value = value
+
+
+class StaleMetadataException(ValueError):
+
+    def __init__(self, model_name: str) -> None:
+        super().__init__(f"The metadata of model '{model_name}' is stale "
+                         "and needs to be recalculated")
+        self.model_name = model_name
@@ -1,4 +1,14 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify, Response
+from flask import abort, send_file
+
+from typing import Optional
+
+from .envs import ADMISSION_TIMEOUT_SECONDS
+from .utils import AdmissionRejectedException, get_admission_controller
+from .metrics import get_metrics
+from .profiling import is_profiling_enabled, has_valid_token, list_profiles
+from .profiling import get_profile_path, get_profile_summary
+from .envs import PROFILE_TOKEN
 
 
 main_bp = Blueprint('main', __name__)
@@ -7,3 +17,60 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route("/")
 def landing_page():
     return render_template("main/landing.html")
+
+
+@main_bp.route("/api/admission")
+def admission_status():
+    return jsonify(get_admission_controller().get_status())
+
+
+@main_bp.route("/metrics")
+def metrics():
+    data, content_type = get_metrics()
+    return Response(data, content_type=content_type)
+
+
+def _check_profiles_access() -> Optional[str]:
+    # the profiles are only available with the (admin) token if there is one
+    if not is_profiling_enabled():
+        abort(404, "Profiling is not enabled")
+    token = request.args.get("token")
+    if PROFILE_TOKEN is not None and not has_valid_token(token):
+        abort(403, "Need a valid profiling token")
+    return token
+
+
+@main_bp.route("/admin/profiles")
+def profiles():
+    token = _check_profiles_access()
+    return render_template("main/profiles.html", profiles=list_profiles(),
+                           token=token)
+
+
+@main_bp.route("/admin/profiles/<name>")
+def profile(name: str):
+    token = _check_profiles_access()
+    summary = get_profile_summary(name, request.args.get("sort",
+                                                         "cumulative"))
+    if summary is None:
+        abort(404, f"No such profile: {name}")
+    sort_by, stats = summary
+    return render_template("main/profile.html", name=name, sort_by=sort_by,
+                           stats=stats, token=token)
+
+
+@main_bp.route("/admin/profiles/<name>/download")
+def download_profile(name: str):
+    _check_profiles_access()
+    path = get_profile_path(name)
+    if path is None:
+        abort(404, f"No such profile: {name}")
+    return send_file(path, as_attachment=True, download_name=name)
+
+
+@main_bp.app_errorhandler(AdmissionRejectedException)
+def too_busy(e: AdmissionRejectedException):
+    headers = {"Retry-After": str(int(ADMISSION_TIMEOUT_SECONDS))}
+    if request.path.startswith("/api/"):
+        return jsonify({"error": str(e)}), 503, headers
+    return render_template("main/too_busy.html", reason=e.reason), 503, headers
@@ -0,0 +1,261 @@
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from ..main.envs import EXTRACTION_PATH, EXTRACTION_QUOTA_MB
+
+
+logger = logging.getLogger(__name__)
+
+# NOTE: MedCAT counts the .json files in a model pack folder,
+#       so the marker must not be one
+_SIZE_FILE_NAME = ".extracted_size"
+_TEMP_PREFIX = ".extract-"
+# leftovers of crashed extractions are removed after this long
+_STALE_TEMP_SECONDS = 60 * 60
+
+
+def _get_folder_size(folder_path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(folder_path):
+        for file_name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass
+    return total
+
+
+class ExtractionCache:
+    """Unpacked model packs on disk, limited by a disk quota.
+
+    Each pack is extracted into a temporary folder first and then renamed
+    into place so that a folder in the cache is always complete - even
+    when other workers are reading it or extracting the same pack.
+    When the cache goes above its quota, the least recently used folders
+    are removed. Folders used within the last `min_age_seconds` are kept
+    since they may still be loading.
+
+    Args:
+        cache_dir (str): The folder to extract the packs in.
+        quota_bytes (int): The disk quota for the extracted folders.
+        min_age_seconds (float): The minimum time since the last use
+            before a folder can be evicted.
+    """
+
+    def __init__(self, cache_dir: str, quota_bytes: int,
+                 min_age_seconds: float = 300) -> None:
+        self.cache_dir = cache_dir
+        self.quota_bytes = quota_bytes
+        self.min_age_seconds = min_age_seconds
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _get_key(self, zip_path: str) -> str:
+        base_name = os.path.basename(zip_path)
+        if base_name.endswith(".zip"):
+            base_name = base_name[:-4]
+        return base_name
+
+    def get_path(self, zip_path: str) -> str:
+        """Get the path of the extracted folder of a model pack.
+
+        The folder does not necessarily exist.
+
+        Args:
+            zip_path (str): The model pack ZIP.
+
+        Returns:
+            str: The path of the extracted folder.
+        """
+        return os.path.join(self.cache_dir, self._get_key(zip_path))
+
+    def _touch(self, folder_path: str) -> bool:
+        try:
+            os.utime(folder_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get_folder(self, zip_path: str) -> str:
+        """Get the extracted folder of a model pack.
+
+        Extracts the pack if needed (and evicts older folders if that
+        takes the cache over its quota). Folders are returned as is.
+
+        Args:
+            zip_path (str): The model pack ZIP.
+
+        Returns:
+            str: The path of the extracted folder.
+        """
+        if os.path.isdir(zip_path):
+            return zip_path
+        folder_path = self.get_path(zip_path)
+        if self._touch(folder_path):
+            return folder_path
+        with self._get_lock(self._get_key(zip_path)):
+            # may have been extracted while waiting for the lock
+            if self._touch(folder_path):
+                return folder_path
+            temp_path = self.make_temp_folder()
+            try:
+                logger.info("Extracting model pack '%s' to '%s'",
+                            zip_path, folder_path)
+                shutil.unpack_archive(zip_path, temp_path, format="zip")
+                self._move_into_place(temp_path, folder_path, replace=False)
+            finally:
+                if os.path.exists(temp_path):
+                    shutil.rmtree(temp_path)
+        self.evict(keep=folder_path)
+        return folder_path
+
+    def make_temp_folder(self) -> str:
+        """Make a temporary folder in the cache.
+
+        The folder is expected to be moved into place with `replace_folder`
+        or removed by the caller.
+
+        Returns:
+            str: The path of the temporary folder.
+        """
+        return tempfile.mkdtemp(prefix=_TEMP_PREFIX, dir=self.cache_dir)
+
+    def _move_into_place(self, temp_path: str, folder_path: str,
+                         replace: bool) -> None:
+        with open(os.path.join(temp_path, _SIZE_FILE_NAME), 'w') as f:
+            f.write(str(_get_folder_size(temp_path)))
+        if replace and os.path.exists(folder_path):
+            # rename the old one out of the way first so that the
+            # folder is never half-written
+            old_path = self.make_temp_folder()
+            os.rename(folder_path, os.path.join(old_path, "old"))
+            shutil.rmtree(old_path)
+        try:
+            os.rename(temp_path, folder_path)
+        except OSError:
+            if not os.path.isdir(folder_path):
+                raise
+            # another process extracted the same pack first
+            logger.debug("Model pack folder '%s' extracted elsewhere",
+                         folder_path)
+
+    def replace_folder(self, zip_path: str, new_folder: str) -> str:
+        """Replace the extracted folder of a model pack.
+
+        This is used to keep an upgraded version of a pack in the cache
+        without changing the pack itself.
+
+        Args:
+            zip_path (str): The model pack ZIP.
+            new_folder (str): The new folder (from `make_temp_folder`).
+
+        Returns:
+            str: The path of the extracted folder.
+        """
+        folder_path = self.get_path(zip_path)
+        with self._get_lock(self._get_key(zip_path)):
+            self._move_into_place(new_folder, folder_path, replace=True)
+        return folder_path
+
+    def remove(self, zip_path: str) -> None:
+        """Remove the extracted folder of a model pack (if there is one).
+
+        Args:
+            zip_path (str): The model pack ZIP.
+        """
+        folder_path = self.get_path(zip_path)
+        with self._get_lock(self._get_key(zip_path)):
+            if os.path.isdir(folder_path):
+                logger.info("Removing extracted model pack '%s'",
+                            folder_path)
+                shutil.rmtree(folder_path, ignore_errors=True)
+
+    def _get_size(self, folder_path: str) -> int:
+        try:
+            with open(os.path.join(folder_path, _SIZE_FILE_NAME)) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return _get_folder_size(folder_path)
+
+    def _get_entries(self) -> List[Tuple[float, str, int]]:
+        entries: List[Tuple[float, str, int]] = []
+        now = time.time()
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                last_used = os.path.getmtime(path)
+            except OSError:
+                continue
+            if file_name.startswith(_TEMP_PREFIX):
+                if now - last_used > _STALE_TEMP_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if os.path.isdir(path):
+                entries.append((last_used, path, self._get_size(path)))
+        return entries
+
+    def get_usage(self) -> int:
+        """Get the disk space used by the extracted folders.
+
+        Returns:
+            int: The number of bytes used.
+        """
+        return sum(size for _, _, size in self._get_entries())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove the least recently used folders until within the quota.
+
+        Args:
+            keep (Optional[str]): A folder to never remove.
+
+        Returns:
+            int: The number of folders removed.
+        """
+        entries = sorted(self._get_entries())
+        total = sum(size for _, _, size in entries)
+        now = time.time()
+        removed = 0
+        for last_used, path, size in entries:
+            if total <= self.quota_bytes:
+                break
+            if path == keep or now - last_used < self.min_age_seconds:
+                continue
+            logger.info("Evicting extracted model pack '%s' (%d bytes)",
+                        path, size)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if total > self.quota_bytes:
+            logger.warning("Extracted model packs take up %d bytes - above "
+                           "the quota of %d bytes", total, self.quota_bytes)
+        return removed
+
+
+_EXTRACTION_CACHE: Optional[ExtractionCache] = None
+_EXTRACTION_CACHE_LOCK = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the (shared) extraction cache.
+
+    Returns:
+        ExtractionCache: The extraction cache.
+    """
+    global _EXTRACTION_CACHE
+    with _EXTRACTION_CACHE_LOCK:
+        if _EXTRACTION_CACHE is None:
+            _EXTRACTION_CACHE = ExtractionCache(
+                EXTRACTION_PATH, EXTRACTION_QUOTA_MB * 1024 * 1024)
+        return _EXTRACTION_CACHE
@@ -10,6 +10,7 @@ from urllib.parse import urlparse
 from .medcat_integration import get_cdb_hash
 from ..main.utils import expire_cache_after
 from ..main.envs import MCT_BASE_URL, MCT_USERNAME, MCT_PASSWORD
+from ..main.metrics import MCT_CALL_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,8 @@ def _download_url(url: str) -> Optional[str]:
     except ValueError as e:
         logger.warn("Issue while downloading from '%s':", url, exc_info=e)
         return None
-    response = requests.get(url, headers=headers, stream=True)
+    with MCT_CALL_DURATION.labels("download").time():
+        response = requests.get(url, headers=headers, stream=True)
     # Check if the request was successful
     if response.status_code == 200:
         file_extension = url.split(".")[-1]
@@ -86,7 +88,8 @@ def _get_auth_token(username: str = MCT_USERNAME,
     logger.info("Getting new authentication token")
     payload = {"username": username, "password": password}
     url = f"{MCT_BASE_URL}api-token-auth/"
-    resp = requests.post(url, json=payload)
+    with MCT_CALL_DURATION.labels("api-token-auth/").time():
+        resp = requests.post(url, json=payload)
     if resp.status_code != 200:
         raise ValueError(f"FAILED auth: {resp.status_code}")
     return json.loads(resp.text)["token"]
@@ -116,9 +119,9 @@ def _get_from_endpoint(endpoint: str) -> List[dict]:
 
     django_api_url = f"{MCT_BASE_URL}{endpoint}"
 
-    response = requests.get(django_api_url, headers=headers)
-
-    j_dict = response.json()
+    with MCT_CALL_DURATION.labels(endpoint).time():
+        response = requests.get(django_api_url, headers=headers)
+        j_dict = response.json()
     return j_dict["results"]
 
 
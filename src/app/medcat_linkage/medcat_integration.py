@@ -1,87 +1,324 @@
-from typing import Dict, TypedDict, Optional, List, Tuple
+from typing import Callable, Dict, TypedDict, Optional, List, Tuple, Set
 
 import logging
 
 from medcat.cat import CAT
 from medcat.cdb import CDB
+from medcat.meta_cat import MetaCAT
+from medcat.vocab import Vocab
+from medcat.utils.saving.serializer import SPECIALITY_NAMES
 from medcat.utils.versioning import ConfigUpgrader
 
 from pydantic import ValidationError
 
 import shutil
 import os
+import copy
+import hashlib
 import json
+import threading
+import weakref
+import zipfile
+from functools import partial
 
-from ..main.utils import expire_cache_after
+from ..main.utils import expire_cache_after, PACK_MEMORY_FACTOR
+from ..main.utils import get_admission_controller
+from ..main.metrics import CAT_LOAD_DURATION
+from .extraction import get_extraction_cache
 
 
 logger = logging.getLogger(__name__)
 
+_CDB_FILE_NAME = "cdb.dat"
+_CONFIG_FILE_NAME = "config.json"
 
-def _try_update_and_load(file_path: str, overwrite: bool = True) -> CAT:
-    if file_path.endswith('.zip'):
-        new_model = file_path[:-4] + '_cbdfix'
-    else:
-        new_model = file_path + '_cbdfix'
+# the loaded CDBs that are shared between models
+# (by CDB hash and the hash of the config they were loaded with)
+# NOTE: a CDB is dropped once no loaded model uses it
+_SHARED_CDBS: "weakref.WeakValueDictionary[Tuple[str, str], CDB]" = (
+    weakref.WeakValueDictionary())
+_SHARED_CDB_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+_SHARED_CDB_LOCKS_LOCK = threading.Lock()
+
+# finds the (recorded) CDB hash of a model pack
+_CDB_HASH_LOOKUP: Optional[Callable[[str], Optional[str]]] = None
+
+
+def _try_update_and_load(file_path: str, keep_in_cache: bool,
+                         share_cdb: bool) -> CAT:
+    cache = get_extraction_cache()
     logger.debug("Setting up upgrader for %s", file_path)
-    upgrader = ConfigUpgrader(file_path)
-    logger.debug("Starting the upgrade process")
-    upgrader.upgrade(new_model, overwrite=overwrite)
-    logger.debug("Loading from new file: %s", new_model)
-
-    # remove original
-    if file_path.endswith('.zip'):
-        zip_path = file_path
-        folder_path = file_path[:-4]
+    upgrader = ConfigUpgrader(cache.get_folder(file_path))
+    new_folder = cache.make_temp_folder()
+    try:
+        logger.debug("Starting the upgrade process")
+        upgrader.upgrade(new_folder, overwrite=True)
+        # the upgrader archives the new folder as well - the pack
+        # itself is kept as uploaded
+        os.remove(new_folder + ".zip")
+        logger.debug("Replacing the extracted folder of %s", file_path)
+        cache.replace_folder(file_path, new_folder)
+    finally:
+        if os.path.exists(new_folder):
+            shutil.rmtree(new_folder)
+    return _get_loader(keep_in_cache, share_cdb)(file_path)
+
+
+def set_cdb_hash_lookup(lookup: Optional[Callable[[str], Optional[str]]]
+                        ) -> None:
+    """Set the function that finds the CDB hash of a model pack.
+
+    Models loaded into the model pool share their CDB with other loaded
+    models with the same CDB hash. Without a lookup (or if it returns
+    None for a pack), the CDB isn't shared.
+
+    Args:
+        lookup (Optional[Callable[[str], Optional[str]]]): Finds the
+            CDB hash for the path of a model pack.
+    """
+    global _CDB_HASH_LOOKUP
+    _CDB_HASH_LOOKUP = lookup
+
+
+def _get_top_level_names(file_path: str) -> Set[str]:
+    if os.path.isdir(file_path):
+        return set(os.listdir(file_path))
+    with zipfile.ZipFile(file_path) as zf:
+        return {name.split("/")[0] for name in zf.namelist()}
+
+
+def _can_share_cdb(names: Set[str]) -> bool:
+    # NOTE: the config needs to be separate from the CDB (config.json),
+    #       the transformer NER models use the CDB's config and the
+    #       JSON serialised CDBs aren't worth the special casing
+    return (_CONFIG_FILE_NAME in names
+            and not any(name.startswith("trf_") for name in names)
+            and not any(f"{name}.json" in names
+                        for name in SPECIALITY_NAMES))
+
+
+def _get_config_hash(file_path: str) -> Optional[str]:
+    # NOTE: the CDB is only shared between packs with identical configs
+    if os.path.isdir(file_path):
+        config_path = os.path.join(file_path, _CONFIG_FILE_NAME)
+        if not os.path.exists(config_path):
+            return None
+        with open(config_path, 'rb') as f:
+            data = f.read()
     else:
-        zip_path = file_path + '.zip'
-        folder_path = file_path
-    logger.debug("Removing original: %s", file_path)
-    # remove folder
-    shutil.rmtree(folder_path)
-    # remove zip
-    os.remove(zip_path)
-
-    logger.debug("Moving new: %s -> %s", new_model, folder_path)
-    # move to original
-    # move folder
-    shutil.move(new_model, folder_path)
-    # move zip
-    shutil.move(new_model + ".zip", zip_path)
-    return _load_CAT(zip_path)
+        with zipfile.ZipFile(file_path) as zf:
+            try:
+                data = zf.read(_CONFIG_FILE_NAME)
+            except KeyError:
+                return None
+    return hashlib.sha256(data).hexdigest()
+
+
+def _get_shared_cdb_lock(key: Tuple[str, str]) -> threading.Lock:
+    with _SHARED_CDB_LOCKS_LOCK:
+        return _SHARED_CDB_LOCKS.setdefault(key, threading.Lock())
+
+
+def _get_shared_cdb(key: Tuple[str, str], folder: str) -> Optional[CDB]:
+    cdb = _SHARED_CDBS.get(key)
+    if cdb is not None:
+        logger.info("Sharing the loaded CDB %s for '%s'", key[0], folder)
+        return cdb
+    # same as CAT.load_model_pack
+    cdb = CDB.load(os.path.join(folder, _CDB_FILE_NAME))
+    if cdb._config_from_file:
+        # a config in cdb.dat as well as in config.json is ambiguous
+        return None
+    cdb.load_config(os.path.join(folder, _CONFIG_FILE_NAME))
+    _SHARED_CDBS[key] = cdb
+    return cdb
+
+
+def _build_CAT(folder: str, cdb: CDB) -> CAT:
+    # same as CAT.load_model_pack, but with the (shared) CDB
+    # NOTE: each model gets its own copy of the (identical) config
+    #       since the spacy model is in its own folder
+    config = copy.deepcopy(cdb.config)
+    config.general.spacy_model = os.path.join(
+        folder, os.path.basename(config.general.spacy_model))
+    vocab_path = os.path.join(folder, "vocab.dat")
+    vocab = Vocab.load(vocab_path) if os.path.exists(vocab_path) else None
+    meta_cats = [MetaCAT.load(save_dir_path=os.path.join(folder, name))
+                 for name in sorted(os.listdir(folder))
+                 if name.startswith("meta_")]
+    shared_config = cdb.config
+    try:
+        return CAT(cdb=cdb, config=config, vocab=vocab, meta_cats=meta_cats)
+    finally:
+        # CAT sets its config as the CDB's config
+        cdb.config = shared_config
+
+
+def _lookup_cdb_hash(file_path: str) -> Optional[str]:
+    if _CDB_HASH_LOOKUP is None:
+        return None
+    return _CDB_HASH_LOOKUP(file_path)
+
+
+def _load_CAT_sharing_cdb(folder: str, cdb_hash: Optional[str]
+                          ) -> Optional[CAT]:
+    if cdb_hash is None or not _can_share_cdb(_get_top_level_names(folder)):
+        return None
+    config_hash = _get_config_hash(folder)
+    if config_hash is None:
+        return None
+    key = (cdb_hash, config_hash)
+    # NOTE: the model is built under the lock as well
+    #       since that (briefly) sets the CDB's config
+    with _get_shared_cdb_lock(key):
+        cdb = _get_shared_cdb(key, folder)
+        if cdb is None:
+            return None
+        return _build_CAT(folder, cdb)
+
+
+def _load_CAT_uncached(file_path: str, share_cdb: bool = False) -> CAT:
+    cdb_hash = _lookup_cdb_hash(file_path) if share_cdb else None
+    with get_admission_controller().admit(
+            estimate_load_memory(file_path, cdb_hash)
+    ), CAT_LOAD_DURATION.time():
+        folder = get_extraction_cache().get_folder(file_path)
+        if share_cdb:
+            cat = _load_CAT_sharing_cdb(folder, cdb_hash)
+            if cat is not None:
+                return cat
+        return CAT.load_model_pack(folder)
 
 
 @expire_cache_after(60)  # keep for 1 minute
+def _load_CAT_cached(file_path: str) -> CAT:
+    return _load_CAT_uncached(file_path, share_cdb=True)
+
+
+def get_shared_cdb_hashes() -> List[str]:
+    """Get the hashes of the CDBs currently shared by the loaded models.
+
+    Returns:
+        List[str]: The CDB hashes.
+    """
+    return sorted({cdb_hash for cdb_hash, _ in _SHARED_CDBS.keys()})
+
+
+def _get_cdb_file_size(file_path: str) -> int:
+    if os.path.isdir(file_path):
+        return os.path.getsize(os.path.join(file_path, _CDB_FILE_NAME))
+    with zipfile.ZipFile(file_path) as zf:
+        try:
+            return zf.getinfo(_CDB_FILE_NAME).compress_size
+        except KeyError:
+            return 0
+
+
+def estimate_load_memory(file_path: str,
+                         cdb_hash: Optional[str] = None,
+                         pack_size: Optional[int] = None) -> int:
+    """Estimate the memory needed to load a model into the model pool.
+
+    The estimate is based on the size of the model pack. If the model's
+    CDB is already loaded (and can be shared), it isn't counted again.
+
+    Args:
+        file_path (str): The model ZIP.
+        cdb_hash (Optional[str]): The CDB hash of the model (if known).
+        pack_size (Optional[int]): The (recorded) size of the pack.
+            Defaults to the size of the file.
+
+    Returns:
+        int: The estimated number of bytes (0 if the pack isn't found).
+    """
+    try:
+        size = (pack_size if pack_size is not None
+                else os.path.getsize(file_path))
+        if (cdb_hash is not None
+                and _can_share_cdb(_get_top_level_names(file_path))
+                and (cdb_hash, _get_config_hash(file_path)) in _SHARED_CDBS):
+            size -= _get_cdb_file_size(file_path)
+    except (OSError, zipfile.BadZipFile):
+        return 0
+    return max(size, 0) * PACK_MEMORY_FACTOR
+
+
+# models that are kept loaded for the lifetime of the process
+_PINNED_MODELS: Dict[str, CAT] = {}
+
+
 def _load_CAT(file_path: str) -> CAT:
-    return CAT.load_model_pack(file_path)
+    pinned = _PINNED_MODELS.get(file_path)
+    if pinned is not None:
+        return pinned
+    return _load_CAT_cached(file_path)
+
+
+def pin_CAT(file_path: str) -> CAT:
+    """Load a model and keep it loaded for the lifetime of the process.
+
+    When this is done before gunicorn forks its workers (i.e with
+    --preload), the workers share the memory of the model (until they
+    write to it).
+
+    Args:
+        file_path (str): The model ZIP to load.
+
+    Returns:
+        CAT: The loaded model.
+    """
+    if file_path not in _PINNED_MODELS:
+        _PINNED_MODELS[file_path] = load_CAT(file_path, keep_in_cache=False,
+                                             share_cdb=True)
+    return _PINNED_MODELS[file_path]
 
 
-def load_CAT(file_path: str, overwrite: bool = True) -> CAT:
+def get_pinned_models() -> List[str]:
+    return list(_PINNED_MODELS)
+
+
+def _get_loader(keep_in_cache: bool, share_cdb: bool
+                ) -> Callable[[str], CAT]:
+    if keep_in_cache:
+        return _load_CAT
+    return partial(_load_CAT_uncached, share_cdb=share_cdb)
+
+
+def load_CAT(file_path: str, keep_in_cache: bool = True,
+             share_cdb: bool = False) -> CAT:
     """Load CAT or update and load CAT.
 
+    The model pack is extracted in the (managed) extraction cache.
+
     If there's a ValidationError (common for older models)
     while loading the model this method will attempt to fix
     the underlying issue and load the subsequent model.
+    The fixed model replaces the extracted folder, but the
+    model pack itself is left unchanged.
 
-    The user can specify whether or not the fixed model
-    overwrites the existing one.
+    Models kept in the cache always share their CDB with other loaded
+    models with the same CDB hash (where that is safe - see
+    `set_cdb_hash_lookup`). Since the CDB is shared, the models must not
+    be trained.
 
     Args:
         file_path (str): The model ZIP to load.
-        overwrite (bool, optional): Whether to overwrite old model when
-            trying to update. Defaults to True.
+        keep_in_cache (bool): Whether to keep the model in the (short
+            lived) model cache. Defaults to True.
+        share_cdb (bool): Whether a model that isn't kept in the cache
+            shares its CDB. Defaults to False.
 
     Returns:
         CAT: The loaded model.
     """
     try:
-        return _load_CAT(file_path)
+        return _get_loader(keep_in_cache, share_cdb)(file_path)
     except ValidationError as e:
         logger.warning("Validation issue when loading CAT (%s). "
                        "Trying to load after fixing issue with "
                        "config.linking.filters.cuis",
                        file_path, exc_info=e)
-    return _try_update_and_load(file_path, overwrite)
+    return _try_update_and_load(file_path, keep_in_cache, share_cdb)
 
 
 def get_cdb_hash(cdb_file: str) -> str:
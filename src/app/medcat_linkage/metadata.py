@@ -3,17 +3,24 @@ import logging
 import os
 from uuid import uuid4
 
-from dataclasses import dataclass, field, fields
-from typing import Optional, List
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, Optional, List
 
 from mlflow.entities.model_registry import RegisteredModel
 
 from .medcat_integration import load_CAT
 from .mct_integration import get_mct_cdb_id
+from .tag_codec import CODEC_TAG, CODEC_VERSION, encode_value, decode_value
+from .tag_codec import encode_optional, decode_optional, is_omitted
 
 logger = logging.getLogger(__name__)
 
 
+# the version of the values read from the model pack (see read_pack_data)
+# NOTE: bump this when they change so that existing metadata is seen as stale
+METADATA_VERSION = 1
+
+
 @dataclass
 class ModelMetaData:
     # stuff to identify model and/or its metadata
@@ -41,80 +48,156 @@ class ModelMetaData:
     def get_keys(cls) -> List[str]:
         return [field.name for field in fields(cls)]
 
+    def as_tags(self) -> Dict[str, str]:
+        """Get the registry tags for the metadata.
+
+        Returns:
+            Dict[str, str]: The (encoded) tag values.
+        """
+        tags = {CODEC_TAG: CODEC_VERSION}
+        for key, value in self.as_dict().items():
+            if key in _STRUCTURED_KEYS:
+                tags[key] = encode_value(value)
+            elif key in _OPTIONAL_KEYS:
+                tags[key] = encode_optional(value)
+            else:
+                tags[key] = value
+        return tags
+
     @classmethod
     def from_mlflow_model(cls, model: RegisteredModel,
                           run_id: str) -> "ModelMetaData":
         kwargs = {}
         for key in cls.get_keys():
-            kwargs[key] = model.tags[key]
+            value = model.tags[key]
+            if key in _STRUCTURED_KEYS:
+                if is_omitted(value):
+                    logger.warning("The value of '%s' was not saved for "
+                                   "model '%s'", key, model.name)
+                    kwargs[key] = _STRUCTURED_KEYS[key]()
+                else:
+                    kwargs[key] = decode_value(value)
+            elif key in _OPTIONAL_KEYS:
+                kwargs[key] = decode_optional(value)
+            else:
+                kwargs[key] = value
         kwargs["run_id"] = run_id
-        # fix all non-string values
-        # TODO - do this better
-        if ('performance' in kwargs
-                and not isinstance(kwargs['performance'], dict)):
-            # TODO - make the below better
-            kwargs["performance"] = eval(kwargs["performance"])
-        if ('stats' in kwargs
-                and not isinstance(kwargs['stats'], dict)):
-            # TODO - make the below better
-            kwargs["stats"] = eval(kwargs["stats"])
-        # str -> list
-        kwargs["version_history"] = eval(kwargs["version_history"])
         return cls(**kwargs)
 
 
+# the (non-string) values and their (empty) types
+_STRUCTURED_KEYS: Dict[str, Callable[[], Any]] = {
+    "version_history": list,
+    "stats": dict,
+    "performance": dict,
+    "changed_parts": list,
+}
+_OPTIONAL_KEYS = {"version", "mct_cdb_id"}
+
+
 def _generate_new_model_id():
     return str(uuid4())
 
 
-def create_meta(
-    file_path: str,
+def copy_meta(meta: ModelMetaData, model_name: str, description: str,
+              category: str, run_id: str) -> ModelMetaData:
+    """Copy the metadata of a model for a new model with the same pack.
+
+    The (expensive) values read from the model itself are kept, but the
+    new model gets a new ID.
+
+    Args:
+        meta (ModelMetaData): The metadata of the existing model.
+        model_name (str): The (short) name of the new model
+        description (str): The description of the new model
+        category (str): The category of the new model
+        run_id (str): The internal run ID of the new model
+
+    Returns:
+        ModelMetaData: The metadata of the new model.
+    """
+    return replace(copy.deepcopy(meta), id=_generate_new_model_id(),
+                   name=model_name, description=description,
+                   category=category, run_id=run_id)
+
+
+def read_pack_data(file_path: str) -> Dict[str, Any]:
+    """Read the (expensive) metadata values from a model pack.
+
+    This loads the model, but does not keep it in the model cache.
+    The output only has plain values so that it can be passed between
+    processes.
+
+    Args:
+        file_path (str): The path to the model .zip
+
+    Returns:
+        Dict[str, Any]: The version, version history, CDB hash, stats,
+            performance and model file name.
+    """
+    cat = load_CAT(file_path, keep_in_cache=False)
+    return {
+        "version": cat.config.version.id,
+        "version_history": cat.config.version.history.copy(),
+        # make sure it's a deep copy
+        "performance": copy.deepcopy(cat.config.version.performance),
+        "cdb_hash": cat.cdb.get_hash(),
+        "stats": cat.cdb.make_stats(),
+        "model_file_name": os.path.basename(file_path),
+    }
+
+
+def get_mct_cdb_id_for_hash(cdb_hash: str, hash2mct_id: dict
+                            ) -> Optional[str]:
+    """Get the MCT CDB id for a CDB hash.
+
+    Existing models are used where possible, MedCATtrainer is asked
+    otherwise.
+
+    Args:
+        cdb_hash (str): The CDB hash.
+        hash2mct_id (dict): The dictionary of CDB hashes mapped to
+            MCT CDB ids
+
+    Returns:
+        Optional[str]: The MCT CDB id (if found).
+    """
+    if cdb_hash in hash2mct_id:
+        mct_cdb_id = hash2mct_id[cdb_hash]
+        logger.debug("Setting MCT CDB hash for '%s' to '%s' "
+                     "based on existing models", cdb_hash, mct_cdb_id)
+    else:
+        mct_cdb_id = get_mct_cdb_id(cdb_hash)
+        logger.debug("Setting MCT CDB hash for '%s' to '%s' "
+                     "as read from the CDB", cdb_hash, mct_cdb_id)
+    return mct_cdb_id
+
+
+def meta_from_pack_data(
+    pack_data: Dict[str, Any],
     model_name: str,
     description: str,
     category: str,
     run_id: str,
-    hash2mct_id: dict,
+    mct_cdb_id: Optional[str],
     existing_id: Optional[str] = None
 ) -> ModelMetaData:
-    """Create model metadata.
-
-    This will method load the model and read the data from the model
-    and create a metadata object.
-
-    The idea is that we then don't have to load the entire model
-    every time we want to know something about it.
+    """Create model metadata from the values read from the model pack.
 
     Args:
-        file_path (str): The path to the model .zip
+        pack_data (Dict[str, Any]): The values read from the model pack
+            (see read_pack_data).
         model_name (str): The (short) name of the model
         description (str): The model description
         category (str): The category of the model (e.g ontology)
         run_id (str): The internal run ID
-        hash2mct_id (dict): The dictionary of CDB hashes mapped to MCT CDB ids
+        mct_cdb_id (Optional[str]): The MCT CDB id
         existing_id (Optional[str], optional): The existing CDB id if knwon.
             Defaults to None.
 
     Returns:
         ModelMetaData: The resulting metadata.
     """
-    model_file_name = os.path.basename(file_path)
-    cat = load_CAT(file_path)
-    version = cat.config.version.id
-    version_history = cat.config.version.history.copy()
-    # make sure it's a deep copy
-    performance = copy.deepcopy(cat.config.version.performance)
-    # in case something gets modified - nothing right now
-    changed_parts: List[str] = []
-    cdb_hash = cat.cdb.get_hash()
-    if cdb_hash in hash2mct_id:
-        mct_cdb_id = hash2mct_id[cdb_hash]
-        logger.debug("Setting MCT CDB hash for '%s' to '%s' "
-                     "based on existing models", cdb_hash, mct_cdb_id)
-    else:
-        mct_cdb_id = get_mct_cdb_id(cdb_hash)
-        logger.debug("Setting MCT CDB hash for '%s' to '%s' "
-                     "as read from the CDB", cdb_hash, mct_cdb_id)
-    stats = cat.cdb.make_stats()
     if existing_id:
         model_id = existing_id
         logger.info("Using existing UUID of '%s' - "
@@ -126,13 +209,50 @@ def create_meta(
         name=model_name,
         description=description,
         category=category,
-        version=version,
-        version_history=version_history,
-        cdb_hash=cdb_hash,
-        stats=stats,
-        performance=performance,
-        changed_parts=changed_parts,
-        model_file_name=model_file_name,
+        version=pack_data["version"],
+        version_history=pack_data["version_history"],
+        cdb_hash=pack_data["cdb_hash"],
+        stats=pack_data["stats"],
+        performance=pack_data["performance"],
+        # in case something gets modified - nothing right now
+        changed_parts=[],
+        model_file_name=pack_data["model_file_name"],
         run_id=run_id,
         mct_cdb_id=mct_cdb_id,
     )
+
+
+def create_meta(
+    file_path: str,
+    model_name: str,
+    description: str,
+    category: str,
+    run_id: str,
+    hash2mct_id: dict,
+    existing_id: Optional[str] = None
+) -> ModelMetaData:
+    """Create model metadata.
+
+    This will method load the model and read the data from the model
+    and create a metadata object.
+
+    The idea is that we then don't have to load the entire model
+    every time we want to know something about it.
+
+    Args:
+        file_path (str): The path to the model .zip
+        model_name (str): The (short) name of the model
+        description (str): The model description
+        category (str): The category of the model (e.g ontology)
+        run_id (str): The internal run ID
+        hash2mct_id (dict): The dictionary of CDB hashes mapped to MCT CDB ids
+        existing_id (Optional[str], optional): The existing CDB id if knwon.
+            Defaults to None.
+
+    Returns:
+        ModelMetaData: The resulting metadata.
+    """
+    pack_data = read_pack_data(file_path)
+    mct_cdb_id = get_mct_cdb_id_for_hash(pack_data["cdb_hash"], hash2mct_id)
+    return meta_from_pack_data(pack_data, model_name, description, category,
+                               run_id, mct_cdb_id, existing_id)
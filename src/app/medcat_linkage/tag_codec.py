@@ -0,0 +1,113 @@
+from typing import Any, Dict, Optional
+
+import ast
+import base64
+import json
+import logging
+import zlib
+
+
+logger = logging.getLogger(__name__)
+
+# the tag that holds the version of the encoding of the other tags
+CODEC_TAG = "tag_codec"
+CODEC_VERSION = "1"
+
+# the longest value MLflow allows for registered model tags
+MAX_TAG_LENGTH = 5000
+
+# prefixes for (non-string) values
+_JSON_PREFIX = "j1:"
+_COMPRESSED_PREFIX = "z1:"
+# the value was too large to save (even when compressed)
+_OMITTED = "x1:"
+# what values that were too large used to be replaced with
+_LEGACY_OMITTED = "N/A"
+
+# the (string) values that used to be saved for None
+_LEGACY_NONE = "None"
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def encode_value(value: Any, max_length: int = MAX_TAG_LENGTH) -> str:
+    """Encode a (non-string) value for a registry tag.
+
+    The value is saved as compact JSON. If that's too long, it's
+    compressed. If even that's too long, it's omitted.
+
+    Args:
+        value (Any): The (JSON serialisable) value.
+        max_length (int): The maximum length of the tag value.
+
+    Returns:
+        str: The encoded value.
+    """
+    encoded = _JSON_PREFIX + _compact_json(value)
+    if len(encoded) <= max_length:
+        return encoded
+    compressed = zlib.compress(encoded[len(_JSON_PREFIX):].encode("utf-8"),
+                               9)
+    encoded = (_COMPRESSED_PREFIX
+               + base64.b64encode(compressed).decode("ascii"))
+    if len(encoded) <= max_length:
+        return encoded
+    logger.warning("Omitting tag value of length %d (%d when compressed)",
+                   len(_compact_json(value)), len(encoded))
+    return _OMITTED
+
+
+def is_omitted(value: str) -> bool:
+    return value in (_OMITTED, _LEGACY_OMITTED)
+
+
+def decode_value(value: str) -> Any:
+    """Decode a (non-string) value from a registry tag.
+
+    Values saved before the codec was used (i.e as Python reprs) are
+    decoded as literals (they're not evaluated).
+
+    Args:
+        value (str): The encoded value.
+
+    Raises:
+        ValueError: If the value was omitted or can't be decoded.
+
+    Returns:
+        Any: The decoded value.
+    """
+    if value.startswith(_JSON_PREFIX):
+        return json.loads(value[len(_JSON_PREFIX):])
+    if value.startswith(_COMPRESSED_PREFIX):
+        compressed = base64.b64decode(value[len(_COMPRESSED_PREFIX):])
+        return json.loads(zlib.decompress(compressed))
+    if is_omitted(value):
+        raise ValueError("The value was omitted")
+    # legacy - a Python repr
+    try:
+        return ast.literal_eval(value)
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f"Unable to decode tag value: {value[:100]}") from e
+
+
+def encode_optional(value: Optional[str]) -> str:
+    # NOTE: MLflow doesn't allow None for tag values
+    return "" if value is None else value
+
+
+def decode_optional(value: str) -> Optional[str]:
+    return None if value in ("", _LEGACY_NONE) else value
+
+
+def is_current(tags: Dict[str, str]) -> bool:
+    """Check whether the tags were encoded with the current codec.
+
+    Args:
+        tags (Dict[str, str]): The registry tags.
+
+    Returns:
+        bool: Whether the tags are current.
+    """
+    return tags.get(CODEC_TAG) == CODEC_VERSION
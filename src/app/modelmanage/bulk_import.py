@@ -0,0 +1,104 @@
+from typing import List, Optional
+
+import csv
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class PackToImport:
+    file_path: str
+    experiment_name: str
+    model_name: str
+    description: str
+
+
+def _get_default_description(file_path: str) -> str:
+    return f"Imported from {os.path.basename(file_path)}"
+
+
+def _get_default_model_name(file_path: str) -> str:
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def _check_within(root: Optional[str], file_path: str, entry: str) -> str:
+    if root is None:
+        return file_path
+    base_path = os.path.realpath(root)
+    path = os.path.realpath(file_path)
+    if os.path.commonpath([base_path, path]) != base_path:
+        raise ValueError(f"Not within the import path: {entry}")
+    return path
+
+
+def _read_directory(dir_path: str, experiment_name: Optional[str],
+                    root: Optional[str]) -> List[PackToImport]:
+    if not experiment_name:
+        raise ValueError("An experiment is needed to import a directory")
+    file_names = sorted(fn for fn in os.listdir(dir_path)
+                        if fn.endswith(".zip"))
+    # NOTE: a (symlinked) pack could still point outside the root
+    return [PackToImport(_check_within(root, os.path.join(dir_path, fn), fn),
+                         experiment_name,
+                         _get_default_model_name(fn),
+                         _get_default_description(fn))
+            for fn in file_names]
+
+
+def _read_manifest(manifest_path: str, experiment_name: Optional[str],
+                   root: Optional[str]) -> List[PackToImport]:
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    packs = []
+    with open(manifest_path, newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or "file" not in reader.fieldnames:
+            raise ValueError(f"The manifest needs (at least) a 'file' "
+                             f"column - found {reader.fieldnames}")
+        for line_nr, row in enumerate(reader, start=2):
+            file_path = _check_within(
+                root, os.path.join(base_dir, row["file"]), row["file"])
+            pack_experiment = row.get("experiment") or experiment_name
+            if not pack_experiment:
+                raise ValueError(f"No experiment for line {line_nr} of "
+                                 f"the manifest ({row['file']})")
+            packs.append(PackToImport(
+                file_path, pack_experiment,
+                row.get("model_name") or _get_default_model_name(file_path),
+                (row.get("description")
+                 or _get_default_description(file_path))))
+    return packs
+
+
+def find_packs(path: str, experiment_name: Optional[str] = None,
+               root: Optional[str] = None) -> List[PackToImport]:
+    """Find the model packs to import.
+
+    The path is either a directory of model packs (all imported into the
+    same experiment) or a CSV manifest with the columns:
+    file, experiment, model_name, description
+
+    Only the file column is required. The file paths are relative to the
+    manifest, the experiment defaults to the one specified, the model name
+    defaults to the file name (without .zip).
+
+    If a root is specified, every pack (after resolving symlinks) needs to
+    be within it.
+
+    Args:
+        path (str): The directory or manifest.
+        experiment_name (Optional[str]): The (default) experiment.
+        root (Optional[str]): The directory the packs need to be in
+            (if specified).
+
+    Raises:
+        ValueError: If the path doesn't exist, an experiment is missing or
+            a pack is outside the root.
+
+    Returns:
+        List[PackToImport]: The packs to import.
+    """
+    if os.path.isdir(path):
+        return _read_directory(path, experiment_name, root)
+    if os.path.isfile(path):
+        return _read_manifest(path, experiment_name, root)
+    raise ValueError(f"No such directory or manifest: {path}")
@@ -0,0 +1,64 @@
+from typing import Dict
+
+import logging
+
+from ..main.models import db, ExperimentModelCount
+
+
+logger = logging.getLogger(__name__)
+
+
+def has_model_counts() -> bool:
+    return ExperimentModelCount.query.first() is not None
+
+
+def get_model_counts() -> Dict[str, int]:
+    """Get the (cached) number of models in each experiment.
+
+    Returns:
+        Dict[str, int]: The number of models for each experiment name.
+    """
+    return {row.experiment_name: row.nr_of_models
+            for row in ExperimentModelCount.query}
+
+
+def change_model_count(experiment_name: str, change: int) -> None:
+    """Change the number of models in an experiment.
+
+    Args:
+        experiment_name (str): The experiment name.
+        change (int): The change in the number of models.
+    """
+    updated = ExperimentModelCount.query.filter_by(
+        experiment_name=experiment_name).update(
+        {ExperimentModelCount.nr_of_models:
+         ExperimentModelCount.nr_of_models + change})
+    if not updated:
+        db.session.add(ExperimentModelCount(experiment_name=experiment_name,
+                                            nr_of_models=max(change, 0)))
+    db.session.commit()
+
+
+def remove_model_count(experiment_name: str) -> None:
+    """Remove the model count of a (deleted) experiment.
+
+    Args:
+        experiment_name (str): The experiment name.
+    """
+    ExperimentModelCount.query.filter_by(
+        experiment_name=experiment_name).delete()
+    db.session.commit()
+
+
+def rebuild_model_counts(counts: Dict[str, int]) -> None:
+    """Rebuild all the model counts.
+
+    Args:
+        counts (Dict[str, int]): The number of models for each experiment.
+    """
+    ExperimentModelCount.query.delete()
+    db.session.add_all([
+        ExperimentModelCount(experiment_name=name, nr_of_models=count)
+        for name, count in counts.items()])
+    db.session.commit()
+    logger.info("Rebuilt model counts for %d experiments", len(counts))
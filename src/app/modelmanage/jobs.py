@@ -0,0 +1,167 @@
+from typing import Any, Callable, List, Optional
+
+from datetime import datetime
+import logging
+import threading
+from uuid import uuid4
+
+from flask import Flask
+
+from ..main.models import db, BackgroundJob, BackgroundJobResult
+
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+def _get_results(job_id: str) -> List[dict]:
+    return [{"item": result.item, "error": result.error}
+            for result in BackgroundJobResult.query.filter_by(
+                job_id=job_id).order_by(BackgroundJobResult.id)]
+
+
+def _as_dict(job: BackgroundJob, with_results: bool = True) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "total": job.total,
+        "nr_done": job.nr_done,
+        "nr_failed": job.nr_failed,
+        "results": _get_results(job.id) if with_results else None,
+        "error": job.error,
+        "started": job.started.isoformat(sep=" ", timespec="seconds"),
+        "finished": (job.finished.isoformat(sep=" ", timespec="seconds")
+                     if job.finished else None),
+    }
+
+
+def create_job(kind: str, total: int) -> str:
+    """Create a (running) background job.
+
+    Args:
+        kind (str): The kind of job (e.g bulk-import).
+        total (int): The number of items to process.
+
+    Returns:
+        str: The job ID.
+    """
+    job = BackgroundJob(id=uuid4().hex, kind=kind, status=RUNNING,
+                        total=total, nr_done=0, nr_failed=0,
+                        started=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def set_total(job_id: str, total: int) -> None:
+    """Set the number of items to process (once it's known).
+
+    Args:
+        job_id (str): The job ID.
+        total (int): The number of items to process.
+    """
+    job: BackgroundJob = db.session.get(BackgroundJob, job_id)
+    job.total = total
+    db.session.commit()
+
+
+def record_result(job_id: str, item: str,
+                  error: Optional[str] = None) -> None:
+    """Record the result of processing an item.
+
+    Args:
+        job_id (str): The job ID.
+        item (str): The item processed.
+        error (Optional[str]): The issue with the item (if there was one).
+    """
+    # NOTE: only the new result is written (along with the counts)
+    db.session.add(BackgroundJobResult(job_id=job_id, item=item,
+                                       error=error))
+    BackgroundJob.query.filter_by(id=job_id).update({
+        BackgroundJob.nr_done: BackgroundJob.nr_done + 1,
+        BackgroundJob.nr_failed: (BackgroundJob.nr_failed
+                                  + int(error is not None)),
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def finish_job(job_id: str, error: Optional[str] = None) -> None:
+    """Mark a job as finished (or failed).
+
+    Args:
+        job_id (str): The job ID.
+        error (Optional[str]): The reason the job failed (if it did).
+    """
+    job: BackgroundJob = db.session.get(BackgroundJob, job_id)
+    job.status = FAILED if error is not None else FINISHED
+    job.error = error
+    job.finished = datetime.now()
+    db.session.commit()
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Get the progress of a job.
+
+    Args:
+        job_id (str): The job ID.
+
+    Returns:
+        Optional[dict]: The job (if found).
+    """
+    job: Optional[BackgroundJob] = db.session.get(BackgroundJob, job_id)
+    return _as_dict(job) if job is not None else None
+
+
+def get_recent_jobs(kind: Optional[str] = None,
+                    limit: int = 10) -> List[dict]:
+    """Get the most recently started jobs (without their results).
+
+    Args:
+        kind (Optional[str]): The kind of jobs to get. Defaults to all.
+        limit (int): The maximum number of jobs.
+
+    Returns:
+        List[dict]: The jobs (most recent first).
+    """
+    query = BackgroundJob.query
+    if kind is not None:
+        query = query.filter_by(kind=kind)
+    return [_as_dict(job, with_results=False) for job in
+            query.order_by(BackgroundJob.started.desc()).limit(limit)]
+
+
+def start_job(app: Flask, job_id: str, func: Callable[..., Any],
+              *args: Any) -> threading.Thread:
+    """Run a job in a background thread (within the app context).
+
+    The job is marked finished once the function returns or failed
+    if it raises.
+
+    Args:
+        app (Flask): The app.
+        job_id (str): The job ID.
+        func (Callable[..., Any]): The function that does the work.
+        *args (Any): The arguments for the function.
+
+    Returns:
+        threading.Thread: The (started) thread.
+    """
+    def _run() -> None:
+        with app.app_context():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error("Background job %s failed", job_id, exc_info=e)
+                db.session.rollback()
+                finish_job(job_id, str(e))
+            else:
+                finish_job(job_id)
+
+    thread = threading.Thread(target=_run, name=f"job-{job_id}",
+                              daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,311 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from ..main.models import db, LineageNode, LineageClosure, LineageModel
+from ..main.utils import build_nodes
+
+
+logger = logging.getLogger(__name__)
+
+# same as anytree's (default) ContStyle
+_VERTICAL = "│   "
+_CONT = "├── "
+_END = "└── "
+_BLANK = "    "
+
+
+def _get_next_order() -> int:
+    cur_max = db.session.query(func.max(LineageNode.order)).scalar()
+    return 0 if cur_max is None else cur_max + 1
+
+
+def _ensure_node(version: str, category: str) -> LineageNode:
+    node = db.session.get(LineageNode, version)
+    if node is None:
+        node = LineageNode(version=version, category=category,
+                           order=_get_next_order())
+        db.session.add(node)
+        db.session.add(LineageClosure(ancestor=version, descendant=version,
+                                      depth=0))
+        db.session.flush()
+    return node
+
+
+def _ensure_model(version: str, model_id: str, model_name: str) -> None:
+    model = LineageModel.query.filter_by(model_id=model_id).first()
+    if model is None:
+        db.session.add(LineageModel(model_id=model_id, version=version,
+                                    model_name=model_name))
+    else:
+        model.version, model.model_name = version, model_name
+    db.session.flush()
+
+
+def _has_parent(version: str) -> bool:
+    return LineageClosure.query.filter_by(
+        descendant=version, depth=1).first() is not None
+
+
+def _is_ancestor(ancestor: str, descendant: str) -> bool:
+    return LineageClosure.query.filter_by(
+        ancestor=ancestor, descendant=descendant).first() is not None
+
+
+def _link(parent: str, child: str) -> None:
+    if _has_parent(child):
+        # keep the existing parent (same as main.utils.build_nodes)
+        return
+    if _is_ancestor(child, parent):
+        logger.warning("Not linking '%s' to '%s' - it would create a cycle",
+                       child, parent)
+        return
+    ancestors = LineageClosure.query.filter_by(descendant=parent).all()
+    descendants = LineageClosure.query.filter_by(ancestor=child).all()
+    db.session.add_all([
+        LineageClosure(ancestor=anc.ancestor, descendant=desc.descendant,
+                       depth=anc.depth + desc.depth + 1)
+        for anc in ancestors for desc in descendants])
+    db.session.flush()
+
+
+def _add_lineage(version: str, version_history: List[str],
+                 category: str, model_id: str, model_name: str) -> None:
+    parents = [ver for ver in version_history if ver and ver != version]
+    _ensure_node(version, category)
+    _ensure_model(version, model_id, model_name)
+    for parent in parents:
+        _ensure_node(parent, category)
+    # link to the closest parent first
+    if parents:
+        _link(parents[-1], version)
+    for parent, child in zip(parents[:-1], parents[1:]):
+        _link(parent, child)
+
+
+def add_model_lineage(version: str, version_history: List[str],
+                      category: str, model_id: str, model_name: str) -> None:
+    """Add a (newly registered) model to the lineage graph.
+
+    Args:
+        version (str): The model version.
+        version_history (List[str]): The version history of the model
+            (closest parent last).
+        category (str): The model category.
+        model_id (str): The model ID.
+        model_name (str): The model name.
+    """
+    _add_lineage(version, version_history, category, model_id, model_name)
+    db.session.commit()
+
+
+def rename_model_lineage(model_id: str, new_name: str) -> None:
+    """Change the name of a model in the lineage graph.
+
+    Args:
+        model_id (str): The model ID.
+        new_name (str): The new model name.
+    """
+    LineageModel.query.filter_by(model_id=model_id).update(
+        {LineageModel.model_name: new_name})
+    db.session.commit()
+
+
+def _has_models(version: str) -> bool:
+    return LineageModel.query.filter_by(version=version).first() is not None
+
+
+def remove_model_lineage(model_id: str) -> None:
+    """Remove a (deleted) model from the lineage graph.
+
+    The node of its version is kept as long as it has descendants or
+    other models (with the same version). Nodes without either are
+    removed (along with their ancestors that are left without either).
+
+    Args:
+        model_id (str): The model ID.
+    """
+    model: Optional[LineageModel] = LineageModel.query.filter_by(
+        model_id=model_id).first()
+    if model is None:
+        return
+    db.session.delete(model)
+    db.session.flush()
+    node: Optional[LineageNode] = db.session.get(LineageNode, model.version)
+    while node is not None and not _has_models(node.version):
+        has_children = LineageClosure.query.filter_by(
+            ancestor=node.version, depth=1).first() is not None
+        if has_children:
+            break
+        parent = LineageClosure.query.filter_by(
+            descendant=node.version, depth=1).first()
+        LineageClosure.query.filter_by(descendant=node.version).delete()
+        db.session.delete(node)
+        db.session.flush()
+        node = (db.session.get(LineageNode, parent.ancestor)
+                if parent else None)
+    db.session.commit()
+
+
+def rebuild_lineage(data: Dict[str, Tuple[List[str], str]],
+                    models: Dict[str, Tuple[str, str]]) -> None:
+    """Rebuild the entire lineage graph.
+
+    The data is in the same format as for main.utils.build_nodes.
+
+    Args:
+        data (Dict[str, Tuple[List[str], str]]): The version history and
+            category of each registered model version.
+        models (Dict[str, Tuple[str, str]]): The version and name
+            of each registered model (by model ID).
+    """
+    LineageModel.query.delete()
+    LineageClosure.query.delete()
+    LineageNode.query.delete()
+    nodes = build_nodes(data)
+    db.session.add_all([
+        LineageModel(model_id=model_id, version=version,
+                     model_name=model_name)
+        for model_id, (version, model_name) in models.items()])
+    for order, (version, node) in enumerate(nodes.items()):
+        db.session.add(LineageNode(version=version, category=node.category,
+                                   order=order))
+        db.session.add_all([
+            LineageClosure(ancestor=anc.name, descendant=version,
+                           depth=node.depth - anc.depth)
+            for anc in node.path])
+    db.session.commit()
+    logger.info("Rebuilt lineage graph with %d nodes", len(nodes))
+
+
+def has_lineage() -> bool:
+    # NOTE: every node belongs to some registered model's lineage
+    #       (graphs kept before the models had their own table have none)
+    return LineageModel.query.first() is not None
+
+
+def get_ancestors(version: str) -> List[str]:
+    """Get the ancestors of a version.
+
+    Args:
+        version (str): The version.
+
+    Returns:
+        List[str]: The ancestors (root first, closest parent last).
+    """
+    rows = LineageClosure.query.filter(
+        LineageClosure.descendant == version,
+        LineageClosure.depth > 0).order_by(LineageClosure.depth.desc()).all()
+    return [row.ancestor for row in rows]
+
+
+def get_descendants(version: str) -> List[str]:
+    """Get the descendants of a version.
+
+    Args:
+        version (str): The version.
+
+    Returns:
+        List[str]: The descendants (closest first).
+    """
+    rows = LineageClosure.query.filter(
+        LineageClosure.ancestor == version,
+        LineageClosure.depth > 0).order_by(LineageClosure.depth).all()
+    return [row.descendant for row in rows]
+
+
+def get_registered_models(versions: Optional[List[str]] = None
+                          ) -> Dict[str, Tuple[str, str]]:
+    """Get the registered model ID and name for versions in one query.
+
+    Args:
+        versions (Optional[List[str]]): The versions to look up.
+            If None, all registered versions are returned.
+
+    Returns:
+        Dict[str, Tuple[str, str]]: The model ID and name for each
+            version with a registered model (the first one registered
+            if there are several).
+    """
+    query = db.session.query(LineageModel.version, LineageModel.model_id,
+                             LineageModel.model_name)
+    if versions is not None:
+        query = query.filter(LineageModel.version.in_(versions))
+    registered: Dict[str, Tuple[str, str]] = {}
+    # NOTE: the first registered model of a version is the one shown
+    for version, model_id, model_name in query.order_by(LineageModel.id):
+        registered.setdefault(version, (model_id, model_name))
+    return registered
+
+
+def get_roots_by_category() -> Dict[str, List[str]]:
+    """Get the root versions of all the lineage trees per category.
+
+    Returns:
+        Dict[str, List[str]]: The root versions for each category.
+    """
+    parent = aliased(LineageClosure)
+    roots = db.session.query(LineageNode).outerjoin(
+        parent, (parent.descendant == LineageNode.version)
+        & (parent.depth == 1)
+    ).filter(parent.ancestor.is_(None)).order_by(LineageNode.order).all()
+    out: Dict[str, List[str]] = {}
+    for root in roots:
+        out.setdefault(root.category, []).append(root.version)
+    return out
+
+
+def _render(root: str, children: Dict[str, List[str]]
+            ) -> Iterable[Tuple[str, str]]:
+    # NOTE: iterative (depth first, in order) since the lineage
+    #       chains can be longer than the recursion limit
+    # (version, prefix of its children, its own prefix)
+    stack: List[Tuple[str, str, str]] = [(root, '', '')]
+    while stack:
+        version, child_prefix, own_prefix = stack.pop()
+        yield own_prefix, version
+        kids = children.get(version, [])
+        for nr in reversed(range(len(kids))):
+            is_last = nr == len(kids) - 1
+            stack.append((kids[nr],
+                          child_prefix + (_BLANK if is_last else _VERTICAL),
+                          child_prefix + (_END if is_last else _CONT)))
+
+
+def get_all_trees_from_lineage(
+    model_link_func: Callable[[str], str],
+    model_descr_func: Callable[[str], str],
+) -> List[Tuple[List[Tuple[str, str, str, str]], str]]:
+    """Get all tree representations with links to corresponding models.
+
+    The output is in the same format as for main.utils.get_all_trees.
+
+    Args:
+        model_link_func (Callable[[str], str]):
+            Function to generate the link from model version.
+        model_descr_func (Callable[[str], str]):
+            Function to get the model description from model version.
+
+    Returns:
+        List[Tuple[List[Tuple[str, str, str, str]], str]]: All trees with
+            links to corresponding models alongside their respective
+            categories.
+    """
+    edges = db.session.query(LineageClosure.ancestor,
+                             LineageClosure.descendant).join(
+        LineageNode, LineageNode.version == LineageClosure.descendant
+    ).filter(LineageClosure.depth == 1).order_by(LineageNode.order).all()
+    children: Dict[str, List[str]] = {}
+    for parent, child in edges:
+        children.setdefault(parent, []).append(child)
+    trees: List[Tuple[List[Tuple[str, str, str, str]], str]] = []
+    for category, roots in get_roots_by_category().items():
+        for root in roots:
+            tree_repr = [(pre, model_descr_func(version), version,
+                          model_link_func(version))
+                         for pre, version in _render(root, children)]
+            trees.append((tree_repr, category))
+    return trees
@@ -0,0 +1,192 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import logging
+
+from sqlalchemy import func
+
+from ..main.models import db, ModelMetaDataRecord, ModelMetaDataSource
+from ..medcat_linkage.metadata import ModelMetaData
+
+
+logger = logging.getLogger(__name__)
+
+
+def _to_meta(record: ModelMetaDataRecord) -> ModelMetaData:
+    return ModelMetaData(**{key: getattr(record, key)
+                            for key in ModelMetaData.get_keys()})
+
+
+def _set_values(record: ModelMetaDataRecord, meta: ModelMetaData) -> None:
+    for key, value in meta.as_dict().items():
+        if key != "id":
+            setattr(record, key, value)
+
+
+def save_metadata(meta: ModelMetaData, registered_name: str) -> None:
+    """Save (add or update) the metadata of a model.
+
+    Args:
+        meta (ModelMetaData): The model metadata.
+        registered_name (str): The name the model is registered under.
+    """
+    record = db.session.get(ModelMetaDataRecord, meta.id)
+    if record is None:
+        record = ModelMetaDataRecord(id=meta.id)
+        db.session.add(record)
+    record.registered_name = registered_name
+    _set_values(record, meta)
+    db.session.commit()
+
+
+def import_metadata(metas: Iterable[Tuple[ModelMetaData, str]]) -> int:
+    """Import the metadata of models that aren't saved yet.
+
+    All the models are imported in one transaction.
+
+    Args:
+        metas (Iterable[Tuple[ModelMetaData, str]]): The model metadata
+            and the name each model is registered under.
+
+    Returns:
+        int: The number of models imported.
+    """
+    existing = {model_id for model_id, in
+                db.session.query(ModelMetaDataRecord.id)}
+    nr_of_models = 0
+    for meta, registered_name in metas:
+        if meta.id in existing:
+            continue
+        record = ModelMetaDataRecord(id=meta.id,
+                                     registered_name=registered_name)
+        _set_values(record, meta)
+        db.session.add(record)
+        existing.add(meta.id)
+        nr_of_models += 1
+    db.session.commit()
+    return nr_of_models
+
+
+def delete_metadata(model_id: str) -> None:
+    """Delete the metadata of a (deleted) model.
+
+    Args:
+        model_id (str): The model ID.
+    """
+    ModelMetaDataRecord.query.filter_by(id=model_id).delete()
+    ModelMetaDataSource.query.filter_by(model_id=model_id).delete()
+    db.session.commit()
+
+
+def has_metadata() -> bool:
+    return ModelMetaDataRecord.query.first() is not None
+
+
+def get_metadata(model_id: str) -> Optional[ModelMetaData]:
+    record = db.session.get(ModelMetaDataRecord, model_id)
+    return _to_meta(record) if record else None
+
+
+def get_metadata_by_version(version: str) -> Optional[ModelMetaData]:
+    record = ModelMetaDataRecord.query.filter_by(version=version).first()
+    return _to_meta(record) if record else None
+
+
+def get_metadata_by_registered_name(registered_name: str
+                                    ) -> Optional[ModelMetaData]:
+    record = ModelMetaDataRecord.query.filter_by(
+        registered_name=registered_name).first()
+    return _to_meta(record) if record else None
+
+
+def get_metadata_by_file_name(model_file_name: str
+                              ) -> Optional[ModelMetaData]:
+    record = ModelMetaDataRecord.query.filter_by(
+        model_file_name=model_file_name).first()
+    return _to_meta(record) if record else None
+
+
+def count_file_references(model_file_name: str) -> int:
+    """Count the models that use a model pack file.
+
+    Args:
+        model_file_name (str): The file name.
+
+    Returns:
+        int: The number of models.
+    """
+    return ModelMetaDataRecord.query.filter_by(
+        model_file_name=model_file_name).count()
+
+
+def get_registered_name(model_id: str) -> Optional[str]:
+    return db.session.query(ModelMetaDataRecord.registered_name).filter_by(
+        id=model_id).scalar()
+
+
+def get_all_metadata(category: Optional[str] = None) -> List[ModelMetaData]:
+    """Get the metadata of all the models.
+
+    Args:
+        category (Optional[str]): The category to filter by.
+
+    Returns:
+        List[ModelMetaData]: The model metadata (ordered by registered name).
+    """
+    query = ModelMetaDataRecord.query
+    if category is not None:
+        query = query.filter_by(category=category)
+    return [_to_meta(record) for record in
+            query.order_by(ModelMetaDataRecord.registered_name)]
+
+
+def get_hash2mct_id() -> dict:
+    """Get the known MCT CDB IDs for each CDB hash.
+
+    Returns:
+        dict: The MCT CDB ID for each CDB hash.
+    """
+    rows = db.session.query(ModelMetaDataRecord.cdb_hash,
+                            ModelMetaDataRecord.mct_cdb_id).filter(
+        ModelMetaDataRecord.mct_cdb_id.isnot(None))
+    return {cdb_hash: mct_cdb_id for cdb_hash, mct_cdb_id in rows}
+
+
+def get_model_count_per_category() -> Dict[str, int]:
+    """Count the models in each category (in one query).
+
+    Returns:
+        Dict[str, int]: The number of models in each category.
+    """
+    rows = db.session.query(ModelMetaDataRecord.category,
+                            func.count(ModelMetaDataRecord.id)).group_by(
+        ModelMetaDataRecord.category)
+    return {category: count for category, count in rows}
+
+
+def save_metadata_source(model_id: str, pack_hash: Optional[str],
+                         metadata_version: int) -> None:
+    """Record what the metadata of a model was calculated from.
+
+    Args:
+        model_id (str): The model ID.
+        pack_hash (Optional[str]): The content hash of the model pack.
+        metadata_version (int): The metadata version.
+    """
+    source = db.session.get(ModelMetaDataSource, model_id)
+    if source is None:
+        source = ModelMetaDataSource(model_id=model_id)
+        db.session.add(source)
+    source.pack_hash = pack_hash
+    source.metadata_version = metadata_version
+    db.session.commit()
+
+
+def get_metadata_sources() -> Dict[str, Tuple[Optional[str], int]]:
+    """Get what the metadata of each model was calculated from.
+
+    Returns:
+        Dict[str, Tuple[Optional[str], int]]: The pack hash and metadata
+            version for each model ID (where known).
+    """
+    return {source.model_id: (source.pack_hash, source.metadata_version)
+            for source in ModelMetaDataSource.query}
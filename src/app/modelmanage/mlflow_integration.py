@@ -1,19 +1,65 @@
 import os
-from typing import Optional, Callable, List, Tuple, Dict
+from typing import Optional, Callable, List, Tuple, Dict, Iterator, Set, Any
 import shutil
 import re
+import json
+import base64
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures import as_completed
+from multiprocessing import get_context
+from uuid import uuid4
+from datetime import datetime
 
 import logging
 
 from mlflow import MlflowClient, MlflowException
-from mlflow.entities import Experiment
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from mlflow.entities import LifecycleStage, Param
+from sqlalchemy import func
 from mlflow.entities.model_registry import RegisteredModel
 
-from ..medcat_linkage.metadata import ModelMetaData, create_meta
-from ..medcat_linkage.medcat_integration import get_cui_counts_for_model
-from ..main.utils import build_nodes, get_all_trees, NoSuchModelExcepton
-
-from ..main.envs import STORAGE_PATH
+from ..medcat_linkage.metadata import ModelMetaData, create_meta, copy_meta
+from ..medcat_linkage.metadata import (
+    read_pack_data, meta_from_pack_data, get_mct_cdb_id_for_hash,
+    METADATA_VERSION
+)
+from ..medcat_linkage.tag_codec import decode_optional, is_current
+from ..medcat_linkage.medcat_integration import (
+    get_cui_counts_for_model, estimate_load_memory
+)
+from ..medcat_linkage.extraction import get_extraction_cache
+from ..main.utils import NoSuchModelExcepton, StaleMetadataException
+from ..main.utils import MemoryBudget, AdmissionController
+from ..main.utils import get_admission_controller
+from ..main.models import db
+from ..main.metrics import TimedProxy, MLFLOW_CALL_DURATION
+from .lineage import (
+    has_lineage, rebuild_lineage, add_model_lineage, remove_model_lineage,
+    rename_model_lineage, get_ancestors, get_registered_models,
+    get_all_trees_from_lineage
+)
+from .search import (
+    has_search_index, rebuild_search_index, index_model, remove_model,
+    search_models
+)
+from .metadata_store import (
+    has_metadata, import_metadata, save_metadata, delete_metadata,
+    get_metadata, get_metadata_by_version, get_metadata_by_registered_name,
+    get_registered_name, get_all_metadata, get_hash2mct_id,
+    get_model_count_per_category, get_metadata_by_file_name,
+    count_file_references, save_metadata_source, get_metadata_sources
+)
+from .packs import record_pack, remove_pack, get_pack_file_name, get_pack
+from .packs import get_pack_hashes, get_pack_size
+from .uploads import get_file_hash
+from .bulk_import import PackToImport
+from .experiment_counts import (
+    has_model_counts, get_model_counts, change_model_count,
+    remove_model_count, rebuild_model_counts
+)
+
+from ..main.envs import STORAGE_PATH, RECALC_MEMORY_MB
 
 # Configure MLflow
 from ..main.envs import MEDCATMLFLOW_DB_URI
@@ -24,10 +70,30 @@ MLFLOW_CLIENT: MlflowClient = None
 
 logger = logging.getLogger(__name__)
 
+# the maximum number of runs MLflow returns at once
+_MAX_RUNS_PAGE_SIZE = 50000
+# the number of models registered between updating the model counts
+_IMPORT_BATCH_SIZE = 50
+
 
 def setup_mlflow():
     global MLFLOW_CLIENT
-    MLFLOW_CLIENT = MlflowClient(tracking_uri=MEDCATMLFLOW_DB_URI)
+    # NOTE: the calls are timed for the metrics
+    MLFLOW_CLIENT = TimedProxy(  # type: ignore
+        MlflowClient(tracking_uri=MEDCATMLFLOW_DB_URI), MLFLOW_CALL_DURATION)
+
+
+def dispose_connections() -> None:
+    """Close the pooled database connections of the registry.
+
+    This needs to be done before forking so that the workers
+    don't share the connections.
+    """
+    for store in (MLFLOW_CLIENT._tracking_client.store,
+                  MLFLOW_CLIENT._get_registry_client().store):
+        engine = getattr(store, "engine", None)
+        if engine is not None:
+            engine.dispose()
 
 
 def has_experiment(name: str) -> bool:
@@ -40,21 +106,161 @@ def create_mlflow_experiment(name: str, description: str) -> str:
     return exp
 
 
-def _get_exp_run_ids(exp: Experiment) -> List[str]:
-    return [run.info.run_id
-            for run in MLFLOW_CLIENT.search_runs([exp.experiment_id, ])]
+def _count_runs_with_search(experiment_ids: List[str]) -> Dict[str, int]:
+    counts = dict.fromkeys(experiment_ids, 0)
+    page_token = None
+    while True:
+        runs = MLFLOW_CLIENT.search_runs(experiment_ids,
+                                         max_results=_MAX_RUNS_PAGE_SIZE,
+                                         page_token=page_token)
+        for run in runs:
+            counts[run.info.experiment_id] += 1
+        page_token = runs.token
+        if not page_token:
+            return counts
+
+
+def _get_sql_tracking_store() -> Optional[Any]:
+    """Get the SQL tracking store of the client (if it has one).
+
+    The runs can only be counted in the database with MLflow's SQL
+    tracking store. The client doesn't expose its store and the SQL
+    models aren't part of MLflow's public API, so this is None (i.e
+    the runs are counted through the search) for any other store or
+    if these can't be found (e.g in another version of MLflow).
+
+    Returns:
+        Optional[Any]: The SqlAlchemyStore, or None.
+    """
+    try:
+        from mlflow.store.tracking.sqlalchemy_store import SqlAlchemyStore
+    except ImportError:
+        return None
+    tracking_client = getattr(MLFLOW_CLIENT, "_tracking_client", None)
+    store = getattr(tracking_client, "store", None)
+    if (not isinstance(store, SqlAlchemyStore)
+            or not hasattr(store, "ManagedSessionMaker")):
+        return None
+    return store
+
+
+def _count_runs_in_db(store: Any, experiment_ids: List[str]
+                      ) -> Dict[str, int]:
+    from mlflow.store.tracking.dbmodels.models import SqlRun
+    counts = dict.fromkeys(experiment_ids, 0)
+    with store.ManagedSessionMaker() as session:
+        rows = session.query(
+            SqlRun.experiment_id, func.count(SqlRun.run_uuid)
+        ).filter(
+            SqlRun.experiment_id.in_([int(exp_id)
+                                      for exp_id in experiment_ids]),
+            SqlRun.lifecycle_stage == LifecycleStage.ACTIVE,
+        ).group_by(SqlRun.experiment_id).all()
+    counts.update((str(exp_id), count) for exp_id, count in rows)
+    return counts
+
+
+def get_experiment_run_counts(experiment_ids: List[str]) -> Dict[str, int]:
+    """Count the (active) runs of the experiments.
+
+    With a database backed tracking store, this is a single aggregate
+    query. Otherwise (or if that fails), the runs are counted through
+    the (paginated) search.
+
+    Args:
+        experiment_ids (List[str]): The experiment IDs.
+
+    Returns:
+        Dict[str, int]: The number of runs for each experiment ID.
+    """
+    if not experiment_ids:
+        return {}
+    store = _get_sql_tracking_store()
+    if store is None:
+        return _count_runs_with_search(experiment_ids)
+    try:
+        return _count_runs_in_db(store, experiment_ids)
+    except (ImportError, AttributeError, SQLAlchemyError) as e:
+        # i.e MLflow's SQL models have changed
+        logger.warning("Could not count the runs in the database, "
+                       "searching for them instead", exc_info=e)
+        return _count_runs_with_search(experiment_ids)
+
+
+def _build_if_empty(what: str, is_built: Callable[[], bool],
+                    build: Callable[[], Any]) -> None:
+    """Build the app's own copy of some registry data if it's empty.
+
+    This is for models registered before the app kept the data.
+
+    Another worker may be building the same data at the same time, in
+    which case the rows conflict (IntegrityError). That is only the case
+    if the data has been built once this transaction is rolled back.
+    Any other conflict is raised.
+
+    Args:
+        what (str): What is built (for the logs).
+        is_built (Callable[[], bool]): Checks whether it has been built.
+        build (Callable[[], Any]): Builds (and commits) it.
+    """
+    if is_built():
+        return
+    logger.info("No %s found - building it", what)
+    try:
+        build()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_built():
+            raise
+        logger.info("The %s was built by another worker at the same time",
+                    what, exc_info=e)
+
+
+def _rebuild_model_counts() -> None:
+    # the model counts are built from the metadata
+    _ensure_metadata_store()
+    rebuild_model_counts(get_model_count_per_category())
+
+
+def _ensure_model_counts() -> None:
+    _build_if_empty("model counts", has_model_counts, _rebuild_model_counts)
+
+
+def _change_model_count(experiment_name: str, change: int) -> None:
+    try:
+        if has_model_counts():
+            change_model_count(experiment_name, change)
+        else:
+            # NOTE: the rebuilt counts already include the change
+            _ensure_model_counts()
+    except SQLAlchemyError as e:
+        logger.warning("Unable to update the model count of experiment '%s'",
+                       experiment_name, exc_info=e)
+        db.session.rollback()
 
 
 def get_all_experiment_names() -> List[str]:
-    return [el[0] for el in get_all_experiments()]
+    return [str(exp.name) for exp in MLFLOW_CLIENT.search_experiments()]
 
 
-def get_all_experiments() -> List[Tuple[str, str, int]]:
+def get_all_experiments() -> List[Tuple[str, str, int, int]]:
+    """Get the experiments along with their model and run counts.
+
+    Returns:
+        List[Tuple[str, str, int, int]]: The name, description, number of
+            models and number of runs of each experiment.
+    """
+    experiments = MLFLOW_CLIENT.search_experiments()
+    run_counts = get_experiment_run_counts(
+        [exp.experiment_id for exp in experiments])
+    _ensure_model_counts()
+    model_counts = get_model_counts()
     return [(str(exp.name), str(exp.tags.get('description',
                                              "Old experiment with no "
                                              "description")),
-             len(_get_exp_run_ids(exp)))
-            for exp in MLFLOW_CLIENT.search_experiments()]
+             model_counts.get(exp.name, 0),
+             run_counts[exp.experiment_id])
+            for exp in experiments]
 
 
 def get_experiment_by_name(name: str) -> Dict[str, str]:
@@ -77,67 +283,178 @@ def update_experiment_description(name: str, new_description: str) -> None:
 def delete_experiment(name: str) -> None:
     exp = MLFLOW_CLIENT.get_experiment_by_name(name)
     MLFLOW_CLIENT.delete_experiment(exp.experiment_id)
+    try:
+        remove_model_count(name)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to remove the model count of experiment '%s'",
+                       name, exc_info=e)
+        db.session.rollback()
 
 
 def _get_experiment_id(experiment_name: str) -> str:
     return MLFLOW_CLIENT.get_experiment_by_name(experiment_name).experiment_id
 
 
-def _mlflow_pre_meta(experiment_name: str, file_path: str,
+def _mlflow_pre_meta(experiment_name: str, pack_hash: str,
                      model_description: str) -> str:
     experiment_id = _get_experiment_id(experiment_name)
     run = MLFLOW_CLIENT.create_run(experiment_id=experiment_id)
     run_id = run.info.run_id
-    MLFLOW_CLIENT.log_artifact(run_id, file_path)
-    MLFLOW_CLIENT.log_param(run_id, "model_description", model_description)
+    # NOTE: the pack isn't copied to the artifact store
+    #       the model version references the file in the storage instead
+    MLFLOW_CLIENT.log_batch(run_id, params=[
+        Param("pack_hash", pack_hash),
+        Param("model_description", model_description)])
     return run_id
 
 
 def _perform_upload(file_path: str, model_name: str,
                     model_description: str, category: str, run_id: str):
-    meta = create_meta(file_path, model_name=model_name,
-                       description=model_description,
-                       category=category,
-                       run_id=run_id,
-                       hash2mct_id=get_existing_hash2mctid())
-    MLFLOW_CLIENT.create_registered_model(model_name,
-                                          tags=meta.as_dict(),
-                                          description=model_description)
-    # Get the artifact URI for the logged file
-    artifact_uri = "runs:/{}/{}".format(run_id, file_path)
+    existing = _get_pack_meta(os.path.basename(file_path))
+    if existing is not None:
+        # the same pack was uploaded before - no need to load it again
+        logger.info("Reusing the metadata of model '%s' (%s) for model '%s'",
+                    existing.name, existing.id, model_name)
+        meta = copy_meta(existing, model_name=model_name,
+                         description=model_description,
+                         category=category, run_id=run_id)
+    else:
+        meta = create_meta(file_path, model_name=model_name,
+                           description=model_description,
+                           category=category,
+                           run_id=run_id,
+                           hash2mct_id=get_existing_hash2mctid())
+    _register_model(meta, file_path)
+    _change_model_count(category, 1)
+
+
+def _register_model(meta: ModelMetaData, file_path: str) -> None:
+    MLFLOW_CLIENT.create_registered_model(meta.name,
+                                          tags=meta.as_tags(),
+                                          description=meta.description)
     # Create a model version associated with the registered model and file
-    MLFLOW_CLIENT.create_model_version(model_name, artifact_uri)
+    MLFLOW_CLIENT.create_model_version(meta.name, file_path,
+                                       run_id=meta.run_id)
+    _save_metadata(meta, meta.name)
+    _add_to_lineage(meta)
+    _add_to_search_index(meta)
 
 
-def _cleanup_upload(file_path: str, run_id: str):
-    # do cleanup on disk
-    os.remove(file_path)
+def _get_pack_meta(model_file_name: str) -> Optional[ModelMetaData]:
+    _ensure_metadata_store()
+    return get_metadata_by_file_name(model_file_name)
+
+
+def get_pack_cdb_hash(file_path: str) -> Optional[str]:
+    """Get the (recorded) CDB hash of a stored model pack.
+
+    Args:
+        file_path (str): The path of the model pack.
+
+    Returns:
+        Optional[str]: The CDB hash, or None if the pack isn't stored
+            or its metadata isn't available (e.g outside the app context).
+    """
+    if (os.path.dirname(os.path.abspath(file_path))
+            != os.path.abspath(STORAGE_PATH)):
+        return None
+    try:
+        meta = get_metadata_by_file_name(os.path.basename(file_path))
+    except RuntimeError:
+        # outside the app context
+        return None
+    except SQLAlchemyError as e:
+        logger.warning("Unable to look up the CDB hash of '%s'", file_path,
+                       exc_info=e)
+        db.session.rollback()
+        return None
+    return meta.cdb_hash if meta is not None else None
+
+
+def _release_pack(model_file_name: str) -> None:
+    # remove the pack (and its extracted folder) unless
+    # some other model still uses it
+    _ensure_metadata_store()
+    nr_of_references = count_file_references(model_file_name)
+    if nr_of_references:
+        logger.info("Keeping model pack '%s' - still used by %d models",
+                    model_file_name, nr_of_references)
+        return
+    file_path = os.path.join(STORAGE_PATH, model_file_name)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    get_extraction_cache().remove(file_path)
     if file_path.endswith('.zip'):
+        # extracted next to the pack before the extraction cache
         folder_path = file_path[:-4]
         if os.path.exists(folder_path):
             shutil.rmtree(folder_path)
+    try:
+        remove_pack(model_file_name)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to remove the record of model pack '%s'",
+                       model_file_name, exc_info=e)
+        db.session.rollback()
+
+
+def _cleanup_upload(file_path: str, run_id: str):
+    # do cleanup on disk
+    _release_pack(os.path.basename(file_path))
     # delete MLFLOW stuff
     MLFLOW_CLIENT.delete_run(run_id)
 
 
+def _store_pack(file_saver: Callable[[str], None],
+                pack_hash: Optional[str]) -> Tuple[str, str]:
+    if pack_hash is None:
+        # not hashed while uploading - save it to find out the hash
+        temp_path = os.path.join(STORAGE_PATH,
+                                 f".upload-{uuid4().hex}.part")
+        file_saver(temp_path)
+        pack_hash = get_file_hash(temp_path)
+        file_saver = partial(os.replace, temp_path)
+    else:
+        temp_path = None
+    file_path = os.path.join(STORAGE_PATH, get_pack_file_name(pack_hash))
+    try:
+        if os.path.exists(file_path):
+            logger.info("Model pack '%s' already stored", file_path)
+        else:
+            file_saver(file_path)
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+    return file_path, pack_hash
+
+
 def attempt_upload(file_name: str, file_saver: Callable[[str], None],
                    experiment_name: str,
                    model_name: str,
                    model_description: str,
-                   overwrite: bool):
+                   pack_hash: Optional[str] = None):
+    """Store and register a model pack.
+
+    The pack is stored under its content hash. If the same pack has
+    already been stored, the existing file and its metadata are reused.
+
+    Args:
+        file_name (str): The (uploaded) file name.
+        file_saver (Callable[[str], None]): Saves the pack to a path.
+        experiment_name (str): The experiment (category) name.
+        model_name (str): The (short) name of the model.
+        model_description (str): The model description.
+        pack_hash (Optional[str]): The content hash of the pack if known.
+
+    Returns:
+        Optional[str]: The issue with the upload (if there was one).
+    """
     if not has_experiment(experiment_name):
         return f'Experiment not found: {experiment_name}'
 
     # Save the uploaded file to the desired location
-    file_path = os.path.join(STORAGE_PATH, file_name)
+    file_path, pack_hash = _store_pack(file_saver, pack_hash)
 
-    if os.path.exists(file_path) and not overwrite:
-        return f"File already exists: {file_name}"
-
-    # save file
-    file_saver(file_path)
-
-    run_id = _mlflow_pre_meta(experiment_name, file_path, model_description)
+    run_id = _mlflow_pre_meta(experiment_name, pack_hash, model_description)
 
     try:
         _perform_upload(file_path, model_name, model_description,
@@ -147,6 +464,184 @@ def attempt_upload(file_name: str, file_saver: Callable[[str], None],
                      exc_info=e)
         _cleanup_upload(file_path, run_id)
         return f"Unable to store model {file_name}: {e}"
+    _record_pack(file_path, pack_hash)
+
+
+def _record_pack(file_path: str, pack_hash: str) -> None:
+    try:
+        record_pack(os.path.basename(file_path), pack_hash,
+                    os.path.getsize(file_path))
+    except SQLAlchemyError as e:
+        logger.warning("Unable to record model pack '%s'", file_path,
+                       exc_info=e)
+        db.session.rollback()
+
+
+def _copy_file(src_path: str, dst_path: str) -> None:
+    shutil.copyfile(src_path, dst_path)
+
+
+def _check_pack_to_import(pack: PackToImport,
+                          model_names: Set[str]) -> Optional[str]:
+    if not has_experiment(pack.experiment_name):
+        return f'Experiment not found: {pack.experiment_name}'
+    if not os.path.isfile(pack.file_path):
+        return f'No such model pack: {pack.file_path}'
+    if (pack.model_name in model_names
+            or get_metadata_by_registered_name(pack.model_name)):
+        return f'Model already exists: {pack.model_name}'
+    return None
+
+
+def _read_packs_data(file_paths: List[str], max_workers: int,
+                     budget: Optional[MemoryBudget] = None
+                     ) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    pack_data: Dict[str, dict] = {}
+    issues: Dict[str, str] = {}
+    if not file_paths:
+        return pack_data, issues
+    # NOTE: spawned so that the workers don't inherit the app's
+    #       threads, locks or DB connections
+    # NOTE: the worker processes use the memory of the same machine, so
+    #       they count towards this process' admission budget as well
+    budgets: List[AdmissionController] = [get_admission_controller()]
+    if budget is not None:
+        budgets.insert(0, budget)
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=get_context("spawn")) as executor:
+        futures = {}
+        for file_path in file_paths:
+            # wait for the memory to be available before submitting
+            estimate = estimate_load_memory(file_path)
+            for cur_budget in budgets:
+                cur_budget.acquire(estimate, must_wait=True)
+            future = executor.submit(read_pack_data, file_path)
+            future.add_done_callback(
+                partial(_release_memory, budgets, estimate))
+            futures[future] = file_path
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                pack_data[file_path] = future.result()
+            except Exception as e:
+                logger.error("Unable to read model pack %s", file_path,
+                             exc_info=e)
+                issues[file_path] = f"Unable to read model pack: {e}"
+    return pack_data, issues
+
+
+def _release_memory(budgets: List[AdmissionController], nr_of_bytes: int,
+                    future: Future) -> None:
+    for budget in budgets:
+        budget.release(nr_of_bytes)
+
+
+def _resolve_mct_cdb_ids(pack_data: Dict[str, dict]) -> dict:
+    # looked up once for each distinct CDB hash
+    hash2mct_id = get_existing_hash2mctid()
+    for cdb_hash in sorted({data["cdb_hash"] for data in pack_data.values()}):
+        hash2mct_id[cdb_hash] = get_mct_cdb_id_for_hash(cdb_hash,
+                                                        hash2mct_id)
+    return hash2mct_id
+
+
+def _import_pack(pack: PackToImport, file_path: str, pack_hash: str,
+                 existing: Optional[ModelMetaData],
+                 pack_data: Optional[dict], hash2mct_id: dict
+                 ) -> Optional[str]:
+    run_id = _mlflow_pre_meta(pack.experiment_name, pack_hash,
+                              pack.description)
+    try:
+        if existing is not None:
+            meta = copy_meta(existing, model_name=pack.model_name,
+                             description=pack.description,
+                             category=pack.experiment_name, run_id=run_id)
+        elif pack_data is not None:
+            meta = meta_from_pack_data(
+                pack_data, pack.model_name, pack.description,
+                pack.experiment_name, run_id,
+                hash2mct_id[pack_data["cdb_hash"]])
+        else:
+            raise ValueError("The model pack was not read")
+        _register_model(meta, file_path)
+    except Exception as e:
+        logger.error("Unable to import model %s", pack.file_path,
+                     exc_info=e)
+        _cleanup_upload(file_path, run_id)
+        return f"Unable to store model {pack.file_path}: {e}"
+    _record_pack(file_path, pack_hash)
+    return None
+
+
+def bulk_import_packs(
+    packs: List[PackToImport],
+    on_result: Callable[[PackToImport, Optional[str]], None],
+    max_workers: int = 1,
+    batch_size: int = _IMPORT_BATCH_SIZE,
+) -> int:
+    """Store and register a number of model packs.
+
+    The packs are first stored (under their content hash). The metadata of
+    the new packs is then read in a process pool, the MCT CDB id is looked
+    up once for each distinct CDB hash and the models are registered in
+    batches. Issues with a pack don't stop the others from being imported.
+
+    Args:
+        packs (List[PackToImport]): The packs to import.
+        on_result (Callable[[PackToImport, Optional[str]], None]): Called
+            once for each pack with the issue (if there was one).
+        max_workers (int): The number of processes to read packs with.
+        batch_size (int): The number of models to register per batch.
+
+    Returns:
+        int: The number of models imported.
+    """
+    _ensure_metadata_store()
+    stored: List[Tuple[PackToImport, str, str]] = []
+    model_names: Set[str] = set()
+    for pack in packs:
+        issue = _check_pack_to_import(pack, model_names)
+        if issue is None:
+            try:
+                file_path, pack_hash = _store_pack(
+                    partial(_copy_file, pack.file_path), None)
+            except OSError as e:
+                issue = f"Unable to store model {pack.file_path}: {e}"
+        if issue is not None:
+            on_result(pack, issue)
+            continue
+        model_names.add(pack.model_name)
+        stored.append((pack, file_path, pack_hash))
+    # the metadata of packs that were stored before is reused
+    existing = {file_path: _get_pack_meta(os.path.basename(file_path))
+                for _, file_path, _ in stored}
+    to_read = sorted({file_path for file_path, meta in existing.items()
+                      if meta is None})
+    logger.info("Reading %d new model packs (of %d) with %d workers",
+                len(to_read), len(stored), max_workers)
+    pack_data, read_issues = _read_packs_data(to_read, max_workers)
+    hash2mct_id = _resolve_mct_cdb_ids(pack_data)
+    nr_imported = 0
+    for start in range(0, len(stored), batch_size):
+        new_models: Dict[str, int] = {}
+        for pack, file_path, pack_hash in stored[start:start + batch_size]:
+            issue = read_issues.get(file_path)
+            if issue is not None:
+                _release_pack(os.path.basename(file_path))
+            else:
+                issue = _import_pack(pack, file_path, pack_hash,
+                                     existing[file_path],
+                                     pack_data.get(file_path), hash2mct_id)
+            if issue is None:
+                new_models[pack.experiment_name] = new_models.get(
+                    pack.experiment_name, 0) + 1
+                nr_imported += 1
+            on_result(pack, issue)
+        for experiment_name, nr_of_models in new_models.items():
+            _change_model_count(experiment_name, nr_of_models)
+        logger.info("Imported %d of %d model packs", nr_imported,
+                    len(packs))
+    return nr_imported
 
 
 RUN_ID_PATTERN = re.compile(re.escape("runs:/") +
@@ -170,12 +665,17 @@ def update_model_info(model: RegisteredModel,
         changed = True
     if changed:
         _update_model_meta(model, meta)
+        _rename_in_lineage(meta.id, meta.name)
+        _add_to_search_index(meta)
 
 
 def _get_run_id(model: RegisteredModel,
                 run_id_pattern: re.Pattern = RUN_ID_PATTERN
                 ) -> str:
     ver = MLFLOW_CLIENT.search_model_versions(f"name='{model.name}'")[0]
+    if ver.run_id:
+        return ver.run_id
+    # older versions were registered without the run
     source = ver.source
     # e.g: runs:/5a5dad1636bf4d87bba373e10dcd99e8//app/models/smth.zip
     matched = run_id_pattern.match(source)
@@ -194,34 +694,48 @@ def get_all_models_dict() -> List[dict]:
 
 
 def get_model_from_id(model_id: str) -> Optional[ModelMetaData]:
-    return _get_meta_model_from_tag(model_id, _tag_key='id')
+    _ensure_metadata_store()
+    meta = get_metadata(model_id)
+    if meta is None:
+        # not (yet) in the metadata store
+        meta = _get_meta_model_from_tag(model_id, _tag_key='id')
+    return meta
 
 
 def get_model_from_version(version: str) -> Optional[ModelMetaData]:
-    return _get_meta_model_from_tag(version, _tag_key='version')
-
-
-def delete_mlflow_file(filename: str) -> None:
+    _ensure_metadata_store()
+    meta = get_metadata_by_version(version)
+    if meta is None:
+        # not (yet) in the metadata store
+        meta = _get_meta_model_from_tag(version, _tag_key='version')
+    return meta
 
-    file_path = os.path.join(STORAGE_PATH, filename)
 
-    # Remove the file from the filesystem
-    if os.path.exists(file_path):
-        os.remove(file_path)
+def delete_mlflow_file(model_id: str) -> None:
+    model = get_mlflow_from_id(model_id)
+    model_name = model.name
 
     # Delete the corresponding MLflow data
-    model_name = filename
-    model = MLFLOW_CLIENT.get_registered_model(model_name)
-    if model:
-        arg = "name='{}'".format(model_name)
-        model_versions = MLFLOW_CLIENT.search_model_versions(arg)
-        for version in model_versions:
-            run_id = version.run_id
-            try:
-                MLFLOW_CLIENT.delete_run(run_id)
-            except MlflowException:
-                pass
-        MLFLOW_CLIENT.delete_registered_model(model_name)
+    arg = "name='{}'".format(model_name)
+    model_versions = MLFLOW_CLIENT.search_model_versions(arg)
+    # NOTE: older versions aren't linked to the run, but the tags have it
+    run_ids = {version.run_id for version in model_versions
+               if version.run_id}
+    if 'run_id' in model.tags:
+        run_ids.add(model.tags['run_id'])
+    for run_id in run_ids:
+        try:
+            MLFLOW_CLIENT.delete_run(run_id)
+        except MlflowException:
+            pass
+    MLFLOW_CLIENT.delete_registered_model(model_name)
+    _remove_from_lineage(model_id)
+    _remove_from_search_index(model_id)
+    _delete_metadata(model_id)
+    # Remove the file from the filesystem (unless it's used by another model)
+    _release_pack(model.tags['model_file_name'])
+    if 'category' in model.tags:
+        _change_model_count(model.tags['category'], -1)
 
 
 def _get_mlflow_from_tag(value: str,
@@ -238,6 +752,13 @@ def _get_mlflow_from_tag(value: str,
 
 
 def get_mlflow_from_id(model_id: str) -> RegisteredModel:
+    registered_name = get_registered_name(model_id)
+    if registered_name is not None:
+        try:
+            return MLFLOW_CLIENT.get_registered_model(registered_name)
+        except MlflowException as e:
+            logger.warning("Model '%s' not found under its registered name "
+                           "'%s'", model_id, registered_name, exc_info=e)
     return _get_mlflow_from_tag(model_id, 'id')
 
 
@@ -247,18 +768,17 @@ def _get_meta_model_from_tag(value: str,
         model = _get_mlflow_from_tag(value, _tag_key=_tag_key)
     except NoSuchModelExcepton:
         return None
-    return ModelMetaData.from_mlflow_model(model, run_id=model.tags['run_id'])
+    return get_meta_model(model)
 
 
-def _get_hist_link(version: str) -> str:
-    model = get_model_from_version(version)
-    if model:
-        return f"/info/{model.id}"
-    return ''
+def _update_model_meta(model: RegisteredModel, meta: ModelMetaData) -> None:
+    _save_metadata(meta, model.name)
+    # keep the copy in the registry tags up to date as well
+    _set_tags(model, meta.as_tags())
 
 
-def _update_model_meta(model: RegisteredModel, meta: ModelMetaData) -> None:
-    for new_key, new_value in meta.as_dict().items():
+def _set_tags(model: RegisteredModel, tags: Dict[str, str]) -> None:
+    for new_key, new_value in tags.items():
         if new_key in model.tags and model.tags[new_key] == new_value:
             continue
         try:
@@ -271,7 +791,61 @@ def _update_model_meta(model: RegisteredModel, meta: ModelMetaData) -> None:
             MLFLOW_CLIENT.set_registered_model_tag(model.name,
                                                    new_key,
                                                    "N/A")
-    model.tags.update(meta.as_dict())
+    model.tags.update(tags)
+
+
+def _upgrade_tags(model: RegisteredModel, meta: ModelMetaData) -> None:
+    # re-encode tags saved before the tag codec was used
+    if is_current(model.tags):
+        return
+    logger.info("Upgrading the tags of model '%s'", model.name)
+    try:
+        _set_tags(model, meta.as_tags())
+    except MlflowException as e:
+        logger.warning("Unable to upgrade the tags of model '%s'",
+                       model.name, exc_info=e)
+
+
+def _recalc_meta(model: RegisteredModel, pack_data: dict,
+                 hash2mct_id: dict) -> ModelMetaData:
+    cdb_hash = pack_data["cdb_hash"]
+    return meta_from_pack_data(
+        pack_data,
+        # keep the name and description if they've been changed
+        model.tags.get('name', model.name),
+        model.tags.get('description', model.description),
+        # if no category saved, we can't re-create
+        category=model.tags['category'],
+        run_id=_get_run_id(model),
+        mct_cdb_id=get_mct_cdb_id_for_hash(cdb_hash, hash2mct_id),
+        existing_id=model.tags.get("id", None))
+
+
+def _get_pack_hash(model_file_name: str,
+                   pack_hashes: Optional[Dict[str, str]] = None
+                   ) -> Optional[str]:
+    if pack_hashes is None:
+        pack = get_pack(model_file_name)
+        pack_hashes = {model_file_name: pack.pack_hash} if pack else {}
+    if model_file_name in pack_hashes:
+        return pack_hashes[model_file_name]
+    file_path = os.path.join(STORAGE_PATH, model_file_name)
+    if not os.path.exists(file_path):
+        return None
+    # the pack was stored before the packs were recorded
+    pack_hash = get_file_hash(file_path)
+    _record_pack(file_path, pack_hash)
+    pack_hashes[model_file_name] = pack_hash
+    return pack_hash
+
+
+def _save_metadata_source(model_id: str, pack_hash: Optional[str]) -> None:
+    try:
+        save_metadata_source(model_id, pack_hash, METADATA_VERSION)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to record the metadata source of model '%s'",
+                       model_id, exc_info=e)
+        db.session.rollback()
 
 
 def recalc_model_metadata(model: RegisteredModel) -> None:
@@ -280,80 +854,548 @@ def recalc_model_metadata(model: RegisteredModel) -> None:
     else:
         cdb_hash = None
     if 'mct_cdb_id' in model.tags:
-        mct_cdb_id = model.tags['mct_cdb_id']
+        mct_cdb_id = decode_optional(model.tags['mct_cdb_id'])
     else:
         mct_cdb_id = None
-    file_path = os.path.join(STORAGE_PATH, model.tags['model_file_name'])
-    run_id = _get_run_id(model)
-    meta = create_meta(file_path, model.name,
-                       description=model.description,
-                       # if no category saved, we can't re-create
-                       category=model.tags['category'],
-                       run_id=run_id,
-                       hash2mct_id={cdb_hash: mct_cdb_id},
-                       existing_id=model.tags.get("id", None))
+    model_file_name = model.tags['model_file_name']
+    file_path = os.path.join(STORAGE_PATH, model_file_name)
+    meta = _recalc_meta(model, read_pack_data(file_path),
+                        hash2mct_id={cdb_hash: mct_cdb_id})
     _update_model_meta(model, meta)
+    _save_metadata_source(meta.id, _get_pack_hash(model_file_name))
 
 
-def get_meta_model(model: RegisteredModel) -> ModelMetaData:
+def _is_stale(model: RegisteredModel,
+              sources: Dict[str, Tuple[Optional[str], int]],
+              pack_hash: Optional[str]) -> bool:
+    try:
+        # NOTE: the run ID doesn't matter here
+        ModelMetaData.from_mlflow_model(model, run_id="")
+    except (KeyError, ValueError):
+        # old model data with not all the keys
+        return True
+    if model.tags['id'] not in sources:
+        return False
+    prev_hash, metadata_version = sources[model.tags['id']]
+    if metadata_version < METADATA_VERSION:
+        return True
+    return (pack_hash is not None and prev_hash is not None
+            and pack_hash != prev_hash)
+
+
+def find_stale_models() -> List[Tuple[RegisteredModel, Optional[str]]]:
+    """Find the models with stale metadata (in one pass over the registry).
+
+    The metadata is stale if it's incomplete, if it was calculated with
+    an older metadata version or if the model pack has changed since.
+    Models whose metadata source isn't known yet are recorded as
+    up to date.
+
+    Returns:
+        List[Tuple[RegisteredModel, Optional[str]]]: The stale models and
+            the current hashes of their packs.
+    """
+    sources = get_metadata_sources()
+    pack_hashes = get_pack_hashes()
+    stale = []
+    for model in _iter_registered_models():
+        if 'model_file_name' not in model.tags:
+            logger.warning("Unable to check the metadata of model '%s' - "
+                           "no model file", model.name)
+            continue
+        pack_hash = _get_pack_hash(model.tags['model_file_name'],
+                                   pack_hashes)
+        if _is_stale(model, sources, pack_hash):
+            stale.append((model, pack_hash))
+        elif model.tags['id'] not in sources:
+            _save_metadata_source(model.tags['id'], pack_hash)
+    logger.info("Found %d models with stale metadata", len(stale))
+    return stale
+
+
+def recalc_models_metadata(
+    models: List[Tuple[RegisteredModel, Optional[str]]],
+    on_result: Callable[[str, Optional[str]], None],
+    max_workers: int = 1,
+    memory_budget_bytes: int = RECALC_MEMORY_MB * 1024 * 1024,
+) -> int:
+    """Recalculate the metadata of a number of models.
+
+    Each distinct pack is read once, in a process pool. A pack is only
+    submitted once the (estimated) memory it needs is within the budget.
+    Issues with a model don't stop the others from being recalculated.
+
+    Args:
+        models (List[Tuple[RegisteredModel, Optional[str]]]): The models
+            and the hashes of their packs (see find_stale_models).
+        on_result (Callable[[str, Optional[str]], None]): Called once for
+            each model (name) with the issue (if there was one).
+        max_workers (int): The number of processes to read packs with.
+        memory_budget_bytes (int): The memory budget for reading packs.
+
+    Returns:
+        int: The number of models recalculated.
+    """
+    file_paths = sorted({
+        os.path.join(STORAGE_PATH, model.tags['model_file_name'])
+        for model, _ in models})
+    pack_data, read_issues = _read_packs_data(
+        file_paths, max_workers, MemoryBudget(memory_budget_bytes))
+    hash2mct_id = _resolve_mct_cdb_ids(pack_data)
+    nr_recalculated = 0
+    for model, pack_hash in models:
+        file_path = os.path.join(STORAGE_PATH, model.tags['model_file_name'])
+        issue = read_issues.get(file_path)
+        if issue is None:
+            try:
+                meta = _recalc_meta(model, pack_data[file_path], hash2mct_id)
+                _update_model_meta(model, meta)
+            except Exception as e:
+                logger.error("Unable to recalculate the metadata of model "
+                             "'%s'", model.name, exc_info=e)
+                issue = f"Unable to recalculate metadata: {e}"
+            else:
+                _save_metadata_source(meta.id, pack_hash)
+                nr_recalculated += 1
+        on_result(model.name, issue)
+    logger.info("Recalculated the metadata of %d of %d models",
+                nr_recalculated, len(models))
+    return nr_recalculated
+
+
+def _get_meta_from_tags(model: RegisteredModel) -> ModelMetaData:
     run_id = _get_run_id(model)
     try:
         meta = ModelMetaData.from_mlflow_model(model, run_id=run_id)
     except KeyError as e:  # old model data with not all the keys
-        logger.warning("Recalculating meta - not everything was saved on disk"
-                       " exception: %e", e)
-        recalc_model_metadata(model)
-        meta = ModelMetaData.from_mlflow_model(model, run_id=run_id)
+        # NOTE: never recalculated here since that would load the model
+        #       (within a page view) - see recalc_models_metadata
+        logger.warning("The metadata of model '%s' is incomplete "
+                       "(missing %s)", model.name, e)
+        raise StaleMetadataException(model.name) from e
+    _upgrade_tags(model, meta)
     return meta
 
 
-def get_history(meta_in: ModelMetaData) -> List[Tuple[str, Optional[dict]]]:
-    versions = meta_in.version_history
-    history = []
-    for version in versions:
-        if not version:
+def get_meta_model(model: RegisteredModel) -> ModelMetaData:
+    _ensure_metadata_store()
+    meta = get_metadata(model.tags['id']) if 'id' in model.tags else None
+    if meta is None:
+        # not (yet) in the metadata store
+        meta = _get_meta_from_tags(model)
+        _save_metadata(meta, model.name)
+    return meta
+
+
+def _save_metadata(meta: ModelMetaData, registered_name: str) -> None:
+    try:
+        save_metadata(meta, registered_name)
+    except SQLAlchemyError as e:
+        # NOTE: the registry tags still have the data
+        logger.warning("Unable to save the metadata of model '%s' (%s)",
+                       meta.name, meta.id, exc_info=e)
+        db.session.rollback()
+
+
+def _delete_metadata(model_id: str) -> None:
+    try:
+        delete_metadata(model_id)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to delete the metadata of model '%s'",
+                       model_id, exc_info=e)
+        db.session.rollback()
+
+
+def _iter_tag_metadata() -> Iterator[Tuple[ModelMetaData, str]]:
+    for model in _iter_registered_models():
+        try:
+            meta = ModelMetaData.from_mlflow_model(
+                model, run_id=model.tags['run_id'])
+        except (KeyError, ValueError) as e:
+            # these get sorted out when they're first used
+            logger.warning("Unable to import the metadata of model '%s' "
+                           "from its tags", model.name, exc_info=e)
             continue
-        _get_meta_model_from_tag
-        meta = get_model_from_version(version)
-        meta_dict = meta.as_dict() if meta else None
-        history.append((version, meta_dict))
-    return history
+        _upgrade_tags(model, meta)
+        yield meta, model.name
 
 
-def get_all_trees_with_links(
-) -> List[Tuple[List[Tuple[str, str, str, str]], str]]:
+def import_metadata_from_tags() -> int:
+    """Import the metadata of the registered models from their tags.
+
+    Models that are already in the metadata store are skipped, as are
+    models whose tags are incomplete.
+
+    Returns:
+        int: The number of models imported.
+    """
+    nr_of_models = import_metadata(_iter_tag_metadata())
+    logger.info("Imported the metadata of %d models from the registry",
+                nr_of_models)
+    return nr_of_models
+
+
+def _ensure_metadata_store() -> None:
+    # the metadata is imported from the registry (tags)
+    _build_if_empty("metadata", has_metadata, import_metadata_from_tags)
+
+
+def _get_lineage_data() -> Tuple[Dict[str, Tuple[List[str], str]],
+                                 Dict[str, Tuple[str, str]]]:
     data: Dict[str, Tuple[List[str], str]] = {}
+    models: Dict[str, Tuple[str, str]] = {}
     for saved_meta in get_all_model_metadata():
-        if saved_meta:
+        # NOTE: models without a version can't be in the lineage graph
+        if saved_meta and saved_meta.version:
             version = saved_meta.version
             # remove empty versions
             versions = [ver for ver in saved_meta.version_history if ver]
             data[version] = (versions, saved_meta.category)
-    nodes = build_nodes(data).values()
-    # Pass the _get_hist_link function as the model_link_func parameter
-    return get_all_trees(nodes, _get_hist_link, get_model_name_from_version)
+            models[saved_meta.id] = (version, saved_meta.name)
+    return data, models
+
+
+def _ensure_lineage() -> None:
+    # the lineage graph is built from the (saved) metadata
+    _build_if_empty("lineage graph", has_lineage,
+                    lambda: rebuild_lineage(*_get_lineage_data()))
+
+
+def _add_to_lineage(meta: ModelMetaData) -> None:
+    if not meta.version:
+        logger.warning("Not adding model '%s' to the lineage graph - "
+                       "no version", meta.name)
+        return
+    try:
+        _ensure_lineage()
+        add_model_lineage(meta.version,
+                          [ver for ver in meta.version_history if ver],
+                          meta.category, meta.id, meta.name)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to add model '%s' (%s) to the lineage graph",
+                       meta.name, meta.version, exc_info=e)
+        db.session.rollback()
+
+
+def _rename_in_lineage(model_id: str, new_name: str) -> None:
+    try:
+        rename_model_lineage(model_id, new_name)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to rename model '%s' in the lineage graph",
+                       model_id, exc_info=e)
+        db.session.rollback()
+
+
+def _remove_from_lineage(model_id: str) -> None:
+    try:
+        _ensure_lineage()
+        remove_model_lineage(model_id)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to remove model '%s' from the lineage graph",
+                       model_id, exc_info=e)
+        db.session.rollback()
+
+
+def _rebuild_search_index() -> None:
+    # the search index is built from the (app's) registered models
+    rebuild_search_index(_get_model_summary(model)
+                         for model in _iter_registered_models()
+                         if _is_app_model(model))
+
+
+def _ensure_search_index() -> None:
+    _build_if_empty("search index", has_search_index, _rebuild_search_index)
+
+
+def _add_to_search_index(meta: ModelMetaData) -> None:
+    try:
+        _ensure_search_index()
+        index_model(meta.id, meta.name, meta.description, meta.category,
+                    meta.version, meta.run_id)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to add model '%s' (%s) to the search index",
+                       meta.name, meta.id, exc_info=e)
+        db.session.rollback()
+
+
+def _remove_from_search_index(model_id: str) -> None:
+    try:
+        remove_model(model_id)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to remove model '%s' from the search index",
+                       model_id, exc_info=e)
+        db.session.rollback()
+
+
+def search_model_summaries(query: str, category: Optional[str] = None,
+                           limit: int = 20) -> List[dict]:
+    """Search the registered models.
+
+    The name, description, category and version are searched.
+
+    Args:
+        query (str): The search query.
+        category (Optional[str]): The category to search in.
+        limit (int): The maximum number of results. Defaults to 20.
+
+    Returns:
+        List[dict]: The matching models (best matches first).
+    """
+    _ensure_search_index()
+    return search_models(query, category, limit)
+
+
+def get_history(meta_in: ModelMetaData) -> List[Tuple[str, Optional[dict]]]:
+    """Get the version history of a model.
+
+    All the versions are resolved with one lookup in the lineage graph
+    and only the model ID and name are returned for registered versions.
+
+    Args:
+        meta_in (ModelMetaData): The model.
+
+    Returns:
+        List[Tuple[str, Optional[dict]]]: The version and the registered
+            model's ID and name (or None if not registered) for each
+            version in the history.
+    """
+    _ensure_lineage()
+    versions = get_ancestors(meta_in.version)
+    if not versions:
+        # not in the lineage graph - fall back to the saved history
+        versions = [ver for ver in meta_in.version_history if ver]
+    registered = get_registered_models(versions)
+    history: List[Tuple[str, Optional[dict]]] = []
+    for version in versions:
+        if version in registered:
+            model_id, model_name = registered[version]
+            history.append((version, {"id": model_id, "name": model_name,
+                                      "version": version}))
+        else:
+            history.append((version, None))
+    return history
+
+
+def get_all_trees_with_links(
+) -> List[Tuple[List[Tuple[str, str, str, str]], str]]:
+    _ensure_lineage()
+    registered = get_registered_models()
+
+    def _get_link(version: str) -> str:
+        if version in registered:
+            return f"/info/{registered[version][0]}"
+        return ''
+
+    def _get_name(version: str) -> str:
+        if version in registered:
+            return registered[version][1]
+        return version
+
+    return get_all_trees_from_lineage(_get_link, _get_name)
 
 
 def get_existing_hash2mctid() -> dict:
-    out = {}
-    for saved_meta in get_all_model_metadata():
-        if saved_meta.mct_cdb_id:
-            out[saved_meta.cdb_hash] = saved_meta.mct_cdb_id
-    return out
+    _ensure_metadata_store()
+    return get_hash2mct_id()
+
+
+def _iter_registered_models(filter_string: Optional[str] = None
+                            ) -> Iterator[RegisteredModel]:
+    # go through all the pages
+    # (by default, MLflow only returns the first 100 models)
+    page_token = None
+    while True:
+        models = MLFLOW_CLIENT.search_registered_models(
+            filter_string, max_results=_MAX_PAGE_SIZE, page_token=page_token)
+        yield from models
+        page_token = models.token
+        if not page_token:
+            return
 
 
 def get_all_model_metadata() -> List[ModelMetaData]:
-    return [get_meta_model(model) for model
-            in MLFLOW_CLIENT.search_registered_models()]
+    _ensure_metadata_store()
+    return get_all_metadata()
+
+
+# the maximum number of registered models MLflow returns at once
+_MAX_PAGE_SIZE = 1000
+
+# the (small) values shown in model listings
+SUMMARY_KEYS = ("id", "name", "description", "category", "version",
+                "cdb_hash", "model_file_name", "run_id")
+
+# sort key -> MLflow order_by key
+# NOTE: the registry can only sort by name and last update time
+SORT_KEYS = {
+    "name": "name",
+    "updated": "last_updated_timestamp",
+}
+
+
+def _is_app_model(model: RegisteredModel) -> bool:
+    # NOTE: the registry may have models that weren't registered
+    #       through the app (i.e without its tags)
+    return bool(model.tags.get("id"))
+
+
+def _get_model_summary(model: RegisteredModel) -> dict:
+    # NOTE: only reads the (small) tags as is
+    #       so nothing needs to be decoded
+    summary = {key: model.tags.get(key) for key in SUMMARY_KEYS}
+    if summary["version"] is not None:
+        summary["version"] = decode_optional(summary["version"])
+    if not summary["name"]:
+        summary["name"] = model.name
+    summary["created"] = _format_timestamp(model.creation_timestamp)
+    return summary
+
+
+def _format_timestamp(timestamp_ms: Optional[int]) -> Optional[str]:
+    if timestamp_ms is None:
+        return None
+    return datetime.fromtimestamp(timestamp_ms / 1000).isoformat(
+        sep=" ", timespec="seconds")
+
+
+def _quote(value: str) -> str:
+    return value.replace("'", "\\'")
+
+
+def _as_str(token) -> str:
+    return token.decode("utf-8") if isinstance(token, bytes) else token
+
+
+def _encode_page_token(mlflow_token: Optional[str], skip: int) -> str:
+    raw = json.dumps({"token": mlflow_token, "skip": skip})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8")
+
+
+def _decode_page_token(page_token: Optional[str]
+                       ) -> Tuple[Optional[str], int]:
+    if not page_token:
+        return None, 0
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(page_token))
+        return raw["token"], int(raw["skip"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {page_token}") from e
+
+
+def list_model_summaries(category: Optional[str] = None,
+                         name_prefix: Optional[str] = None,
+                         cdb_hash: Optional[str] = None,
+                         created_after: Optional[datetime] = None,
+                         created_before: Optional[datetime] = None,
+                         sort: str = "name",
+                         descending: bool = False,
+                         page_size: int = 25,
+                         page_token: Optional[str] = None,
+                         ) -> Tuple[List[dict], Optional[str]]:
+    """List the summaries of the registered models one page at a time.
+
+    The filtering (apart from the creation date) and sorting is done
+    by the registry. Only the small (summary) values are included, so
+    the big dicts (i.e stats and performance) are never decoded. Models
+    that weren't registered through the app are skipped.
+
+    Args:
+        category (Optional[str]): The category to filter by.
+        name_prefix (Optional[str]): The name prefix to filter by.
+        cdb_hash (Optional[str]): The CDB hash to filter by.
+        created_after (Optional[datetime]): The earliest creation time.
+        created_before (Optional[datetime]): The latest creation time.
+        sort (str): The sort key (see SORT_KEYS). Defaults to "name".
+        descending (bool): Whether to sort in descending order.
+        page_size (int): The (maximum) number of models. Defaults to 25.
+        page_token (Optional[str]): The token for the page to get.
+
+    Raises:
+        ValueError: If the sort key, page size or page token is invalid.
+
+    Returns:
+        Tuple[List[dict], Optional[str]]: The model summaries and the token
+            for the next page (or None if this was the last page).
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    if not 0 < page_size <= _MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid page size: {page_size}")
+    filters = []
+    if category:
+        filters.append(f"tag.category = '{_quote(category)}'")
+    if name_prefix:
+        # NOTE: MLflow's LIKE has no escape character, so any wildcards
+        #       (% and _) in the prefix match more - the prefix itself
+        #       is checked below
+        filters.append(f"name LIKE '{_quote(name_prefix)}%'")
+    if cdb_hash:
+        filters.append(f"tag.cdb_hash = '{_quote(cdb_hash)}'")
+    filter_string = " AND ".join(filters) or None
+    # NOTE: ties are ordered by name by the registry
+    order_by = [f"{SORT_KEYS[sort]} {'DESC' if descending else 'ASC'}"]
+    after_ms = created_after.timestamp() * 1000 if created_after else None
+    before_ms = created_before.timestamp() * 1000 if created_before else None
+
+    mlflow_token, skip = _decode_page_token(page_token)
+    summaries: List[dict] = []
+    while True:
+        models = MLFLOW_CLIENT.search_registered_models(
+            filter_string, max_results=page_size, order_by=order_by,
+            page_token=mlflow_token)
+        for nr, model in enumerate(models):
+            if nr < skip or not _is_app_model(model):
+                continue
+            if name_prefix and not model.name.startswith(name_prefix):
+                continue
+            created = model.creation_timestamp
+            if ((after_ms is not None and created < after_ms)
+                    or (before_ms is not None and created > before_ms)):
+                continue
+            if len(summaries) == page_size:
+                # page full - continue from this model next time
+                return summaries, _encode_page_token(mlflow_token, nr)
+            summaries.append(_get_model_summary(model))
+        if not models.token:
+            return summaries, None
+        # NOTE: the (SQL) store returns the token as bytes
+        mlflow_token, skip = _as_str(models.token), 0
 
 
 def get_model_from_file_name(model_file: str) -> Optional[ModelMetaData]:
+    _ensure_metadata_store()
+    meta = get_metadata_by_registered_name(model_file)
+    if meta is not None:
+        return meta
     model = MLFLOW_CLIENT.get_registered_model(model_file)
     if model:
         return get_meta_model(model)
     return None
 
 
+def get_recent_models(category: str, limit: int) -> List[ModelMetaData]:
+    """Get the most recently registered models of a category.
+
+    Args:
+        category (str): The category (experiment) name.
+        limit (int): The maximum number of models.
+
+    Returns:
+        List[ModelMetaData]: The models (newest first).
+    """
+    # NOTE: the registry can't sort by creation time
+    models = sorted(
+        _iter_registered_models(f"tag.category = '{_quote(category)}'"),
+        key=lambda model: model.creation_timestamp, reverse=True)
+    metas = []
+    for model in models[:limit]:
+        try:
+            metas.append(get_meta_model(model))
+        except StaleMetadataException as e:
+            logger.warning("Skipping recent model: %s", e)
+    return metas
+
+
 def get_model_name_from_version(version: str) -> str:
     model = get_model_from_version(version)
     if not model:
@@ -361,6 +1403,29 @@ def get_model_name_from_version(version: str) -> str:
     return model.name
 
 
+def get_model_memory_estimate(model: ModelMetaData) -> int:
+    """Estimate the memory needed to load a model.
+
+    The estimate is based on the size of the pack recorded at upload.
+
+    Args:
+        model (ModelMetaData): The model.
+
+    Returns:
+        int: The estimated number of bytes.
+    """
+    try:
+        pack_size = get_pack_size(model.model_file_name)
+    except SQLAlchemyError as e:
+        logger.warning("Unable to get the recorded size of model pack '%s'",
+                       model.model_file_name, exc_info=e)
+        db.session.rollback()
+        pack_size = None
+    return estimate_load_memory(
+        os.path.join(STORAGE_PATH, model.model_file_name), model.cdb_hash,
+        pack_size)
+
+
 def get_model_cui_counts(model_ids: List[str], cuis: List[str]) -> dict:
     out = {}
     for model_id in model_ids:
@@ -370,7 +1435,9 @@ def get_model_cui_counts(model_ids: List[str], cuis: List[str]) -> dict:
                            model_id, "model CUI counts")
             continue
         file_path = os.path.join(STORAGE_PATH, model_meta.model_file_name)
-        model_result = get_cui_counts_for_model(file_path, cuis)
+        with get_admission_controller().admit(
+                get_model_memory_estimate(model_meta)):
+            model_result = get_cui_counts_for_model(file_path, cuis)
         out[model_meta.name] = model_result
     return out
 
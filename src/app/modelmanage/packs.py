@@ -0,0 +1,73 @@
+from typing import Dict, Optional
+
+import logging
+
+from ..main.models import db, ModelPack
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_pack_file_name(pack_hash: str) -> str:
+    """Get the (content addressed) file name for a model pack.
+
+    Args:
+        pack_hash (str): The content hash of the pack.
+
+    Returns:
+        str: The file name.
+    """
+    return f"{pack_hash}.zip"
+
+
+def record_pack(file_name: str, pack_hash: str, size: int) -> None:
+    """Record (or update) a model pack in the storage.
+
+    Args:
+        file_name (str): The file name (within the model storage).
+        pack_hash (str): The content hash of the file.
+        size (int): The file size in bytes.
+    """
+    pack = ModelPack.query.filter_by(file_name=file_name).first()
+    if pack is None:
+        pack = ModelPack(file_name=file_name)
+        db.session.add(pack)
+    pack.pack_hash = pack_hash
+    pack.size = size
+    db.session.commit()
+
+
+def remove_pack(file_name: str) -> None:
+    """Remove the record of a (deleted) model pack.
+
+    Args:
+        file_name (str): The file name (within the model storage).
+    """
+    ModelPack.query.filter_by(file_name=file_name).delete()
+    db.session.commit()
+
+
+def get_pack(file_name: str) -> Optional[ModelPack]:
+    return ModelPack.query.filter_by(file_name=file_name).first()
+
+
+def get_pack_size(file_name: str) -> Optional[int]:
+    """Get the (recorded) size of a model pack.
+
+    Args:
+        file_name (str): The file name (within the model storage).
+
+    Returns:
+        Optional[int]: The size in bytes (if the pack is recorded).
+    """
+    return db.session.query(ModelPack.size).filter_by(
+        file_name=file_name).scalar()
+
+
+def get_pack_hashes() -> Dict[str, str]:
+    """Get the content hash of each (recorded) model pack.
+
+    Returns:
+        Dict[str, str]: The content hash for each file name.
+    """
+    return dict(db.session.query(ModelPack.file_name, ModelPack.pack_hash))
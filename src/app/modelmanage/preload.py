@@ -0,0 +1,65 @@
+from typing import Optional
+
+import gc
+import logging
+import os
+
+from flask import Flask
+from mlflow import MlflowException
+
+from ..main.envs import PINNED_MODELS, STORAGE_PATH
+from ..main.models import db
+from ..medcat_linkage.metadata import ModelMetaData
+from ..medcat_linkage.medcat_integration import pin_CAT, get_pinned_models
+from .mlflow_integration import (
+    get_model_from_file_name, get_model_from_id, dispose_connections
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _find_model(name_or_id: str) -> Optional[ModelMetaData]:
+    try:
+        meta = get_model_from_file_name(name_or_id)
+    except MlflowException:
+        meta = None
+    return meta if meta is not None else get_model_from_id(name_or_id)
+
+
+def preload_pinned_models(app: Flask) -> None:
+    """Load the pinned models (MEDCATMLFLOW_PINNED_MODELS).
+
+    With gunicorn's --preload this happens in the master process before
+    the workers are forked, so that the workers share the (copy-on-write)
+    memory of the models instead of each loading their own copy.
+
+    To keep the pages shared, everything loaded is moved to the permanent
+    generation of the garbage collector (gc.freeze). Otherwise the
+    collections in each worker would write to (and thus copy) the pages
+    of every model object. Reference counting still writes to the objects
+    that are used, but the bulk of a model (i.e its arrays) is not touched.
+
+    The database connections are closed afterwards since they can't be
+    shared with the forked workers.
+
+    Args:
+        app (Flask): The app.
+    """
+    if not PINNED_MODELS:
+        return
+    with app.app_context():
+        for name_or_id in PINNED_MODELS:
+            meta = _find_model(name_or_id)
+            if meta is None:
+                logger.warning("Unable to pin model '%s' - not found",
+                               name_or_id)
+                continue
+            logger.info("Pinning model '%s' (%s)", meta.name, meta.id)
+            pin_CAT(os.path.join(STORAGE_PATH, meta.model_file_name))
+        db.engine.dispose()
+    dispose_connections()
+    gc.collect()
+    gc.freeze()
+    logger.info("Pinned %d models; froze %d objects",
+                len(get_pinned_models()), gc.get_freeze_count())
@@ -0,0 +1,221 @@
+from typing import Iterable, List, Optional
+
+import logging
+import re
+
+from flask import Flask
+from sqlalchemy import or_, text
+from sqlalchemy.exc import OperationalError
+
+from ..main.models import db, ModelSearchEntry
+
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "model_search_fts"
+
+_ENTRY_TABLE = ModelSearchEntry.__tablename__
+_COLUMNS = ("name", "description", "category", "version")
+_COLUMN_LIST = ", ".join(_COLUMNS)
+_NEW_VALUES = ", ".join(f"new.{col}" for col in _COLUMNS)
+_OLD_VALUES = ", ".join(f"old.{col}" for col in _COLUMNS)
+
+# the (external content) FTS5 index and the triggers that keep it in sync
+_FTS_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_COLUMN_LIST}, content='{_ENTRY_TABLE}', content_rowid='id',
+        tokenize='unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON {_ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMN_LIST})
+        VALUES (new.id, {_NEW_VALUES});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON {_ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMN_LIST})
+        VALUES ('delete', old.id, {_OLD_VALUES});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE ON {_ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMN_LIST})
+        VALUES ('delete', old.id, {_OLD_VALUES});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMN_LIST})
+        VALUES (new.id, {_NEW_VALUES});
+        END""",
+]
+
+# the column weights for ranking (name, description, category, version)
+_BM25_WEIGHTS = "10.0, 1.0, 2.0, 5.0"
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+def _has_fts() -> bool:
+    if db.engine.dialect.name != "sqlite":
+        return False
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+        {"name": FTS_TABLE}).first() is not None
+
+
+def setup_search_index(app: Flask) -> None:
+    """Set up the full-text search index.
+
+    On SQLite (with FTS5), this creates the FTS5 index and its triggers.
+    On other databases (or without FTS5) the search falls back to
+    (unranked) pattern matching.
+
+    Args:
+        app (Flask): The app.
+    """
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            logger.info("Not using FTS5 for model search on '%s'",
+                        db.engine.dialect.name)
+            return
+        existed = _has_fts()
+        try:
+            for statement in _FTS_SETUP:
+                db.session.execute(text(statement))
+            if not existed:
+                # index the entries that already exist
+                db.session.execute(text(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                    "VALUES ('rebuild')"))
+            db.session.commit()
+        except OperationalError as e:
+            logger.warning("Unable to set up FTS5 for model search - "
+                           "falling back to pattern matching", exc_info=e)
+            db.session.rollback()
+
+
+def _set_values(entry: ModelSearchEntry, name: str,
+                description: Optional[str], category: Optional[str],
+                version: Optional[str], run_id: Optional[str]) -> None:
+    entry.name = name
+    entry.description = description
+    entry.category = category
+    entry.version = version
+    entry.run_id = run_id
+
+
+def index_model(model_id: str, name: str, description: Optional[str],
+                category: Optional[str], version: Optional[str],
+                run_id: Optional[str] = None) -> None:
+    """Add (or update) a model in the search index.
+
+    Args:
+        model_id (str): The model ID.
+        name (str): The model name.
+        description (Optional[str]): The model description.
+        category (Optional[str]): The model category.
+        version (Optional[str]): The model version.
+        run_id (Optional[str]): The run ID of the model.
+    """
+    entry = ModelSearchEntry.query.filter_by(model_id=model_id).first()
+    if entry is None:
+        entry = ModelSearchEntry(model_id=model_id)
+        db.session.add(entry)
+    _set_values(entry, name, description, category, version, run_id)
+    db.session.commit()
+
+
+def remove_model(model_id: str) -> None:
+    """Remove a (deleted) model from the search index.
+
+    Args:
+        model_id (str): The model ID.
+    """
+    ModelSearchEntry.query.filter_by(model_id=model_id).delete()
+    db.session.commit()
+
+
+def rebuild_search_index(models: Iterable[dict]) -> None:
+    """Rebuild the entire search index.
+
+    Args:
+        models (Iterable[dict]): The model summaries (see
+            mlflow_integration.list_model_summaries).
+    """
+    ModelSearchEntry.query.delete()
+    nr_of_models = 0
+    for model in models:
+        entry = ModelSearchEntry(model_id=model["id"])
+        _set_values(entry, model["name"], model["description"],
+                    model["category"], model["version"], model["run_id"])
+        db.session.add(entry)
+        nr_of_models += 1
+    db.session.commit()
+    logger.info("Rebuilt model search index with %d models", nr_of_models)
+
+
+def has_search_index() -> bool:
+    return ModelSearchEntry.query.first() is not None
+
+
+def _get_terms(query: str) -> List[str]:
+    return _TERM_PATTERN.findall(query.lower())
+
+
+def _as_dict(entry: ModelSearchEntry) -> dict:
+    return {"id": entry.model_id, "name": entry.name,
+            "description": entry.description, "category": entry.category,
+            "version": entry.version, "run_id": entry.run_id}
+
+
+def _search_fts(terms: List[str], category: Optional[str],
+                limit: int) -> List[ModelSearchEntry]:
+    # every term needs to match (as a prefix)
+    match = " ".join(f'"{term}"*' for term in terms)
+    sql = (f"SELECT {_ENTRY_TABLE}.id FROM {FTS_TABLE} "
+           f"JOIN {_ENTRY_TABLE} ON {_ENTRY_TABLE}.id = {FTS_TABLE}.rowid "
+           f"WHERE {FTS_TABLE} MATCH :match "
+           f"AND (:category IS NULL OR {_ENTRY_TABLE}.category = :category) "
+           f"ORDER BY bm25({FTS_TABLE}, {_BM25_WEIGHTS}) LIMIT :limit")
+    params = {"match": match, "category": category or None, "limit": limit}
+    rows = db.session.execute(text(sql), params).all()
+    ids = [row[0] for row in rows]
+    entries = {entry.id: entry for entry in
+               ModelSearchEntry.query.filter(ModelSearchEntry.id.in_(ids))}
+    # keep the ranked order
+    return [entries[row_id] for row_id in ids if row_id in entries]
+
+
+def _search_like(terms: List[str], category: Optional[str],
+                 limit: int) -> List[ModelSearchEntry]:
+    query = ModelSearchEntry.query
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(or_(*(
+            getattr(ModelSearchEntry, col).ilike(pattern)
+            for col in _COLUMNS)))
+    if category:
+        query = query.filter_by(category=category)
+    return query.order_by(ModelSearchEntry.name).limit(limit).all()
+
+
+def search_models(query: str, category: Optional[str] = None,
+                  limit: int = 20) -> List[dict]:
+    """Search the models by name, description, category and version.
+
+    With FTS5, each word of the query is matched as a word prefix and the
+    results are ranked (matches in the name first). Otherwise, each word
+    needs to be contained in one of the values and the results are
+    ordered by name.
+
+    Args:
+        query (str): The search query.
+        category (Optional[str]): The category to search in.
+        limit (int): The maximum number of results. Defaults to 20.
+
+    Returns:
+        List[dict]: The matching models (best matches first).
+    """
+    terms = _get_terms(query)
+    if not terms:
+        return []
+    if _has_fts():
+        entries = _search_fts(terms, category, limit)
+    else:
+        entries = _search_like(terms, category, limit)
+    return [_as_dict(entry) for entry in entries]
@@ -0,0 +1,110 @@
+from typing import IO, Dict, Optional, Tuple, cast
+
+import hashlib
+import os
+import tempfile
+
+import logging
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.formparser import parse_form_data
+
+
+logger = logging.getLogger(__name__)
+
+# the chunk size for hashing files that are already on disk
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class HashingFile:
+    """A temporary file that hashes everything that's written to it.
+
+    This is used for streaming an upload to disk (in chunks) so that it
+    can then be moved to its final location without another copy.
+    The file is created in the target directory so that the move is
+    just a rename.
+
+    Args:
+        dir_path (str): The directory to create the file in.
+    """
+
+    def __init__(self, dir_path: str) -> None:
+        self._file = tempfile.NamedTemporaryFile(
+            dir=dir_path, prefix=".upload-", suffix=".part", delete=False)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    @property
+    def path(self) -> str:
+        return self._file.name
+
+    @property
+    def content_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name: str):
+        # seek, read, etc
+        return getattr(self._file, name)
+
+    def move_to(self, file_path: str) -> None:
+        """Move the (finished) file to its final location.
+
+        Args:
+            file_path (str): The final file path.
+        """
+        self._file.close()
+        os.replace(self.path, file_path)
+
+    def discard(self) -> None:
+        """Remove the file (unless it was moved)."""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def parse_streamed_upload(environ: dict, dir_path: str
+                          ) -> Tuple[MultiDict, Dict[str, Tuple[str,
+                                                                HashingFile]]]:
+    """Parse a multipart upload, streaming the files straight to disk.
+
+    The files are hashed as they're written. The caller should either
+    move or discard each of the files.
+
+    Args:
+        environ (dict): The WSGI environment of the request.
+        dir_path (str): The directory to write the files in.
+
+    Returns:
+        Tuple[MultiDict, Dict[str, Tuple[str, HashingFile]]]: The form
+            values and the file name and file for each file field.
+    """
+    def stream_factory(total_content_length: Optional[int],
+                       content_type: Optional[str],
+                       filename: Optional[str],
+                       content_length: Optional[int] = None) -> IO[bytes]:
+        return cast(IO[bytes], HashingFile(dir_path))
+
+    _, form, files = parse_form_data(environ, stream_factory=stream_factory)
+    return form, {field: (storage.filename, cast(HashingFile, storage.stream))
+                  for field, storage in files.items()}
+
+
+def get_file_hash(file_path: str) -> str:
+    """Get the content hash of a file (that's already on disk).
+
+    Args:
+        file_path (str): The file path.
+
+    Returns:
+        str: The (hex) SHA-256 of the file.
+    """
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
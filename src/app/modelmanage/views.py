@@ -1,36 +1,179 @@
 from flask import Blueprint, render_template, request, send_file, jsonify
-from flask import redirect, url_for
+from flask import redirect, url_for, abort, current_app
 
+from datetime import datetime
+from functools import partial
+from typing import List, Optional, Tuple
 import os
 
+import click
+
 from .mlflow_integration import (
-    attempt_upload, get_all_models_dict, delete_mlflow_file,
+    attempt_upload, list_model_summaries, delete_mlflow_file,
     get_history, get_all_experiment_names, recalc_model_metadata,
     get_all_trees_with_links, has_experiment, create_mlflow_experiment,
     delete_experiment, get_all_experiments, get_model_from_id,
     get_mlflow_from_id, get_experiment_by_name, update_experiment_description,
-    update_model_info
+    update_model_info, search_model_summaries, import_metadata_from_tags,
+    bulk_import_packs, find_stale_models, recalc_models_metadata, SORT_KEYS
 )
 
-from ..main.envs import STORAGE_PATH
+from .bulk_import import PackToImport, find_packs
+from .jobs import create_job, record_result, start_job, get_job
+from .jobs import get_recent_jobs, set_total
+from .uploads import parse_streamed_upload
+from ..main.envs import STORAGE_PATH, IMPORT_PATH, IMPORT_WORKERS
+from ..main.envs import RECALC_WORKERS
+from ..main.utils import StaleMetadataException, get_admission_controller
+from ..medcat_linkage.medcat_integration import estimate_load_memory
+from ..performance.warmer import warm_up_model
 
 
 models_bp = Blueprint('modelmanage', __name__)
 
 
+@models_bp.cli.command("import-metadata")
+def import_metadata():
+    """Import the model metadata from the registry tags."""
+    nr_of_models = import_metadata_from_tags()
+    click.echo(f"Imported the metadata of {nr_of_models} models")
+
+
+@models_bp.cli.command("bulk-import")
+@click.argument("path")
+@click.option("--experiment", default=None,
+              help="The experiment (for packs without one in the manifest)")
+@click.option("--workers", default=IMPORT_WORKERS, show_default=True,
+              help="The number of processes reading the packs")
+def bulk_import(path: str, experiment: Optional[str], workers: int):
+    """Import a directory or (CSV) manifest of model packs."""
+    try:
+        packs = find_packs(path, experiment)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    click.echo(f"Importing {len(packs)} model packs")
+
+    def _report(pack: PackToImport, issue: Optional[str]) -> None:
+        if issue is None:
+            click.echo(f"Imported {pack.file_path} as {pack.model_name}")
+        else:
+            click.echo(f"FAILED {pack.file_path}: {issue}", err=True)
+
+    nr_imported = bulk_import_packs(packs, _report, max_workers=workers)
+    click.echo(f"Imported {nr_imported} of {len(packs)} model packs")
+
+
+@models_bp.cli.command("recalc-metadata")
+@click.option("--workers", default=RECALC_WORKERS, show_default=True,
+              help="The number of processes reading the packs")
+def recalc_metadata(workers: int):
+    """Recalculate the stale model metadata."""
+    stale = find_stale_models()
+    click.echo(f"Recalculating the metadata of {len(stale)} models")
+
+    def _report(model_name: str, issue: Optional[str]) -> None:
+        if issue is None:
+            click.echo(f"Recalculated {model_name}")
+        else:
+            click.echo(f"FAILED {model_name}: {issue}", err=True)
+
+    nr_of_models = recalc_models_metadata(stale, _report,
+                                          max_workers=workers)
+    click.echo(f"Recalculated the metadata of {nr_of_models} of "
+               f"{len(stale)} models")
+
+
+def _run_recalc(job_id: str) -> None:
+    stale = find_stale_models()
+    set_total(job_id, len(stale))
+    recalc_models_metadata(
+        stale, partial(record_result, job_id), max_workers=RECALC_WORKERS)
+
+
+@models_bp.app_errorhandler(StaleMetadataException)
+def stale_metadata(e: StaleMetadataException):
+    return render_template("modelmanage/stale_metadata.html",
+                           model_name=e.model_name), 409
+
+
+def _run_bulk_import(job_id: str, packs: List[PackToImport]) -> None:
+    def _record(pack: PackToImport, issue: Optional[str]) -> None:
+        record_result(job_id, f"{pack.file_path} ({pack.model_name})",
+                      issue)
+        if issue is None:
+            warm_up_model(pack.model_name)
+
+    bulk_import_packs(packs, _record, max_workers=IMPORT_WORKERS)
+
+
+def _get_import_path(rel_path: str) -> str:
+    base_path = os.path.realpath(IMPORT_PATH)
+    path = os.path.realpath(os.path.join(base_path, rel_path))
+    if os.path.commonpath([base_path, path]) != base_path:
+        abort(400, f"Not within the import path: {rel_path}")
+    return path
+
+
+@models_bp.route("/bulk_import", methods=["GET", "POST"])
+def bulk_import_files():
+    if request.method == "POST":
+        path = _get_import_path(request.form.get("path", ""))
+        try:
+            packs = find_packs(path, request.form.get("experiment") or None,
+                               root=IMPORT_PATH)
+        except ValueError as e:
+            abort(400, str(e))
+        job_id = create_job("bulk-import", len(packs))
+        start_job(current_app._get_current_object(),  # type: ignore
+                  job_id, _run_bulk_import, job_id, packs)
+        return redirect(url_for("modelmanage.show_job", job_id=job_id))
+    return render_template("modelmanage/bulk_import.html",
+                           import_path=IMPORT_PATH,
+                           experiment_names=get_all_experiment_names(),
+                           jobs=get_recent_jobs("bulk-import"))
+
+
+@models_bp.route("/jobs/<job_id>")
+def show_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404, f"No such job: {job_id}")
+    return render_template("modelmanage/job.html", job=job)
+
+
+@models_bp.route("/api/jobs/<job_id>")
+def job_progress(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404, f"No such job: {job_id}")
+    return jsonify(job)
+
+
 # Endpoint to handle file uploads
 @models_bp.route("/upload", methods=["GET", "POST"])
 def upload_file():
     if request.method == "POST":
-        file = request.files['file']
-        issues = attempt_upload(file.filename,
-                                file.save,
-                                request.form.get("experiment"),
-                                request.form.get("model_name"),
-                                request.form.get("model_description"),
-                                request.form.get("overwrite") == "1")
+        # NOTE: the pack is streamed to disk (and hashed) while parsing
+        form, files = parse_streamed_upload(request.environ, STORAGE_PATH)
+        try:
+            if 'file' not in files:
+                abort(400, "No file provided")
+            file_name, file = files['file']
+            # NOTE: the model is loaded to read its metadata
+            with get_admission_controller().admit(
+                    estimate_load_memory(file.path)):
+                issues = attempt_upload(file_name,
+                                        file.move_to,
+                                        form.get("experiment"),
+                                        form.get("model_name"),
+                                        form.get("model_description"),
+                                        pack_hash=file.content_hash)
+        finally:
+            for _, file in files.values():
+                file.discard()
         if issues:
             return issues
+        warm_up_model(form.get("model_name"))
         return redirect(url_for("modelmanage.browse_files"))
     else:
         experiment_names = get_all_experiment_names()
@@ -38,20 +181,95 @@ def upload_file():
                                experiment_names=experiment_names)
 
 
+def _parse_date(value: str, end_of_day: bool = False) -> datetime:
+    date = datetime.strptime(value, "%Y-%m-%d")
+    if end_of_day:
+        date = date.replace(hour=23, minute=59, second=59)
+    return date
+
+
+def _get_listing_filters(args) -> dict:
+    return {
+        "category": args.get("category", ""),
+        "name_prefix": args.get("name_prefix", ""),
+        "cdb_hash": args.get("cdb_hash", ""),
+        "created_after": args.get("created_after", ""),
+        "created_before": args.get("created_before", ""),
+        "sort": args.get("sort", "name"),
+        "order": args.get("order", "asc"),
+        "page_size": args.get("page_size", "25"),
+    }
+
+
+def _list_models(filters: dict, page_token: Optional[str]
+                 ) -> Tuple[List[dict], Optional[str]]:
+    try:
+        return list_model_summaries(
+            category=filters["category"] or None,
+            name_prefix=filters["name_prefix"] or None,
+            cdb_hash=filters["cdb_hash"] or None,
+            created_after=(_parse_date(filters["created_after"])
+                           if filters["created_after"] else None),
+            created_before=(_parse_date(filters["created_before"], True)
+                            if filters["created_before"] else None),
+            sort=filters["sort"],
+            descending=filters["order"] == "desc",
+            page_size=int(filters["page_size"]),
+            page_token=page_token)
+    except ValueError as e:
+        abort(400, str(e))
+
+
+def _get_search_limit(args) -> int:
+    try:
+        return int(args.get("limit", "20"))
+    except ValueError:
+        abort(400, f"Invalid limit: {args.get('limit')}")
+
+
 @models_bp.route("/files")
 def browse_files():
-    files_with_info = get_all_models_dict()
+    filters = _get_listing_filters(request.args)
+    search_query = request.args.get("q", "")
+    if search_query:
+        files = search_model_summaries(search_query,
+                                       filters["category"] or None,
+                                       _get_search_limit(request.args))
+        next_page_token = None
+    else:
+        files, next_page_token = _list_models(
+            filters, request.args.get("page_token"))
     return render_template("modelmanage/browse_files.html",
-                           files=files_with_info)
+                           files=files, filters=filters,
+                           search_query=search_query,
+                           next_page_token=next_page_token,
+                           sort_keys=list(SORT_KEYS),
+                           categories=get_all_experiment_names())
+
+
+@models_bp.route("/api/models")
+def list_models():
+    filters = _get_listing_filters(request.args)
+    models, next_page_token = _list_models(filters,
+                                           request.args.get("page_token"))
+    return jsonify({"models": models, "next_page_token": next_page_token})
+
+
+@models_bp.route("/api/search")
+def search_models():
+    category = request.args.get("category") or None
+    results = search_model_summaries(request.args.get("q", ""), category,
+                                     _get_search_limit(request.args))
+    return jsonify({"results": results})
 
 
 @models_bp.route("/delete_file", methods=["POST"])
 def delete_file():
-    filename = request.form.get("file_id")
-    if not filename:
+    file_id = request.form.get("file_id")
+    if not file_id:
         return jsonify({"error": "File ID not provided"}), 400
 
-    delete_mlflow_file(filename)
+    delete_mlflow_file(file_id)
     return redirect(url_for("modelmanage.browse_files"))
 
 
@@ -79,6 +297,17 @@ def edit_model_info(file_id):
     return render_template('modelmanage/edit_model_info.html', model=model)
 
 
+@models_bp.route("/recalculate_metadata", methods=["GET", "POST"])
+def recalculate_stale_metadata():
+    if request.method == "POST":
+        job_id = create_job("recalc-metadata", 0)
+        start_job(current_app._get_current_object(),  # type: ignore
+                  job_id, _run_recalc, job_id)
+        return redirect(url_for("modelmanage.show_job", job_id=job_id))
+    return render_template("modelmanage/recalculate_metadata.html",
+                           jobs=get_recent_jobs("recalc-metadata"))
+
+
 @models_bp.route("/recalculate_metadata/<file_id>")
 def recalculate_metadata(file_id):
     model = get_mlflow_from_id(file_id)
@@ -98,7 +327,9 @@ def show_file_history(file_id):
 def download_file(file_id):
     model = get_model_from_id(file_id)
     full_path = os.path.join(STORAGE_PATH, model.model_file_name)
-    return send_file(full_path, as_attachment=True)
+    # NOTE: the pack is stored under its content hash
+    return send_file(full_path, as_attachment=True,
+                     download_name=f"{model.name}.zip")
 
 
 @models_bp.route("/all_trees")
@@ -1,3 +1,4 @@
+from typing import Dict, List, Tuple
 import logging
 
 import sqlalchemy.exc
@@ -6,6 +7,9 @@ from ..medcat_linkage.medcat_integration import PerDatasetPerformanceResult
 from ..medcat_linkage.medcat_integration import remap_to_perf_results
 from ..medcat_linkage.medcat_integration import remap_from_perf_results
 from ..main.models import ModelDatasetPerformanceResult, db
+from ..main.metrics import record_cache_lookups
+
+_CACHE_NAME = "performance"
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +24,46 @@ def get_cached(model_id: str, ds_id: str) -> PerDatasetPerformanceResult:
         raise ValueError(f"No model cached for model '{model_id}' "
                          "and dataset '{ds_id}'") from e
     if not perf_res:
+        record_cache_lookups(_CACHE_NAME, 0, 1)
         logger.info("Did not find performance results in cache for model '%s'"
                     " and datset '%s'", model_id, ds_id)
         raise ValueError(f"No model cached for model '{model_id}' "
                          "and dataset '{ds_id}'")
+    record_cache_lookups(_CACHE_NAME, 1)
     logger.info("Found performance results in cache for model '%s'"
                 " and datset '%s'", model_id, ds_id)
     return remap_to_perf_results(perf_res.to_dict())
 
 
+def get_all_cached(model_ids: List[str], ds_ids: List[str]
+                   ) -> Dict[Tuple[str, str], PerDatasetPerformanceResult]:
+    """Get all the cached results for the models and datasets in one go.
+
+    Args:
+        model_ids (List[str]): The model IDs.
+        ds_ids (List[str]): The dataset IDs.
+
+    Returns:
+        Dict[Tuple[str, str], PerDatasetPerformanceResult]: The cached
+            results for each (model ID, dataset ID) pair that was found.
+    """
+    try:
+        found = ModelDatasetPerformanceResult.query.filter(
+            ModelDatasetPerformanceResult.model_id.in_(model_ids),
+            ModelDatasetPerformanceResult.dataset_id.in_(ds_ids)).all()
+    except sqlalchemy.exc.OperationalError as e:
+        logger.warning("Unable to read performance results cache",
+                       exc_info=e)
+        return {}
+    record_cache_lookups(_CACHE_NAME, len(found),
+                         len(model_ids) * len(ds_ids) - len(found))
+    logger.info("Found %d cached performance results for %d models and "
+                "%d datasets", len(found), len(model_ids), len(ds_ids))
+    return {(perf_res.model_id, perf_res.dataset_id):
+            remap_to_perf_results(perf_res.to_dict())
+            for perf_res in found}
+
+
 def add_to_cache(model_id: str, ds_id: str,
                  perf: PerDatasetPerformanceResult) -> None:
     mapping = remap_from_perf_results(perf)
@@ -1,17 +1,21 @@
-from typing import Callable, Optional, List, Tuple
+from typing import Callable, Optional, List, Tuple, Iterator, NamedTuple
 import os
 
 import logging
 
 from ..main.envs import STORAGE_PATH
 from ..main.models import db as flask_db, TestDataset
+from ..main.utils import get_admission_controller
+from ..main.metrics import EVALUATION_DURATION
 
 from ..medcat_linkage.medcat_integration import (
     get_model_performance_with_dataset as calc_performance,
     AllModelPerformanceResults, PerDatasetPerformanceResult
 )
 from ..medcat_linkage.metadata import ModelMetaData
-from .cache import get_cached, add_to_cache as _add_to_cache
+from ..modelmanage.mlflow_integration import get_model_memory_estimate
+from .cache import get_cached, get_all_cached
+from .cache import add_to_cache as _add_to_cache
 
 DATASET_PATH = os.path.join(STORAGE_PATH, "test_datasets")
 
@@ -91,22 +95,82 @@ def _get_or_calculate(model_id: str,
     else:
         result = None
     if result is None:
-        result = calc_performance(full_model_path, dataset_file_path)
+        with EVALUATION_DURATION.time():
+            result = calc_performance(full_model_path, dataset_file_path)
         _add_to_cache(model_id, dataset_id, result)
     return result
 
 
+class PerformanceUpdate(NamedTuple):
+    model: ModelMetaData
+    dataset_name: str
+    result: PerDatasetPerformanceResult
+    from_cache: bool
+
+
+def iter_performance(
+    models: List[ModelMetaData], datset_names: List[str],
+    force_recalc: bool = False,
+) -> Iterator[PerformanceUpdate]:
+    """Iterate over the performance of each model-dataset pair.
+
+    All the results available in the cache are yielded first
+    (in one go) and only then are the rest of the pairs calculated.
+    Each calculation needs to be admitted by the admission controller
+    (i.e it may wait for memory or be rejected).
+
+    Args:
+        models (List[ModelMetaData]): The models.
+        datset_names (List[str]): The datasets.
+        force_recalc (bool, optional): Whether to recalculate even if
+            cached results are available. Defaults to False.
+
+    Raises:
+        AdmissionRejectedException: If a calculation is rejected.
+
+    Yields:
+        PerformanceUpdate: The model, dataset (base) name, its result and
+            whether or not the result came from the cache.
+    """
+    if force_recalc:
+        cached = {}
+    else:
+        cached = get_all_cached([model.id for model in models],
+                                datset_names)
+    to_calculate = []
+    for model in models:
+        for dataset_name in datset_names:
+            dataset_file_basename = os.path.basename(dataset_name)
+            result = cached.get((model.id, dataset_name))
+            if result is None:
+                to_calculate.append((model, dataset_name))
+                continue
+            yield PerformanceUpdate(model, dataset_file_basename,
+                                    result, True)
+    for model, dataset_name in to_calculate:
+        dataset_file_basename = os.path.basename(dataset_name)
+        with get_admission_controller().admit(
+                get_model_memory_estimate(model)):
+            result = _get_or_calculate(model.id, model.model_file_name,
+                                       dataset_name,
+                                       force_recalc=force_recalc)
+        yield PerformanceUpdate(model, dataset_file_basename, result, False)
+
+
 def find_or_load_performance(
     models: List[ModelMetaData], datset_names: List[str],
     force_recalc: bool = False,
 ) -> AllModelPerformanceResults:
+    updates = {(update.model.id, update.dataset_name): update.result
+               for update in iter_performance(models, datset_names,
+                                              force_recalc=force_recalc)}
     all_results = {}
+    # keep the order of the models and datasets
     for model in models:
         model_results = {}
         for dataset_name in datset_names:
             dataset_file_basename = os.path.basename(dataset_name)
-            result = _get_or_calculate(model.id, model.model_file_name,
-                                       dataset_name, force_recalc=force_recalc)
-            model_results[dataset_file_basename] = result
+            model_results[dataset_file_basename] = updates[
+                (model.id, dataset_file_basename)]
         all_results[model.name] = model_results
     return all_results
@@ -1,92 +1,398 @@
-from typing import Dict, Iterable, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 # to set matplotlib backend
 from . import imgutils  # noqa
 from matplotlib.figure import Figure
+from matplotlib.axes import Axes
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 
-from matplotlib import pyplot as plt
 from io import BytesIO
 import base64
+import hashlib
+import json
+import math
 
 from ..medcat_linkage.medcat_integration import AllModelPerformanceResults
+from ..main.utils import ExpiringCache
+from ..main.metrics import PLOT_RENDER_DURATION
+from ..main.envs import PLOT_CACHE_SECONDS, PLOT_CACHE_SIZE
+from ..main.envs import PLOT_FULL_MAX_CUIS, PLOT_DOWNSAMPLE_MAX_CUIS
+from ..main.envs import PLOT_MAX_POINTS, PLOT_TOP_K
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def _get_buffers_from_fig(title, x, cuis, fig, legend=[], ylabel="Score"):
-    plt.figure(fig)
-    plt.xlabel("CUI")
-    plt.xticks(x, cuis, rotation=90)  # Assuming keys are CUIs
-    plt.ylabel(ylabel)
-    plt.legend(legend)
-    plt.title(title)
+# rendered (base64) images keyed by the hash of the input data and options
+_RENDER_CACHE = ExpiringCache(PLOT_CACHE_SECONDS, max_items=PLOT_CACHE_SIZE,
+                              name="plots")
+
+_DEFAULT_FIGSIZE = (10, 6)
+
+# the maximum number of x tick labels drawn on a graph
+_MAX_TICKS = 50
+
+PLOT_MODE_AUTO = "auto"
+PLOT_MODE_FULL = "full"
+PLOT_MODE_DOWNSAMPLED = "downsampled"
+PLOT_MODE_TOPK = "topk"
+PLOT_MODE_HISTOGRAM = "histogram"
+
+PLOT_MODES = (PLOT_MODE_AUTO, PLOT_MODE_FULL, PLOT_MODE_DOWNSAMPLED,
+              PLOT_MODE_TOPK, PLOT_MODE_HISTOGRAM)
+
+_METRICS = (("prec", "Precision"), ("recall", "Recall"), ("f1", "F1"))
+
+
+class PlotSeries(TypedDict):
+    name: str
+    values: List[float]
+
+
+class PlotSpec(TypedDict):
+    """The description of a single graph.
+
+    This is all that's needed to draw the graph, either on the server
+    side (with matplotlib) or in the browser.
+    """
+    title: str
+    mode: str
+    kind: str  # "line" or "bar"
+    xlabel: str
+    ylabel: str
+    labels: List[str]
+    series: List[PlotSeries]
+
+
+def _get_cache_key(kind: str, data: Any, options: dict) -> str:
+    # NOTE: keys are not sorted since the order of models/CUIs
+    #       defines the order in the plot (and the legend)
+    raw = json.dumps([kind, data, options], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def choose_plot_mode(nr_of_cuis: int, nr_of_models: int) -> str:
+    """Choose the plot mode based on the number of CUIs and models.
+
+    Args:
+        nr_of_cuis (int): The number of CUIs to plot.
+        nr_of_models (int): The number of models compared.
+
+    Returns:
+        str: The plot mode.
+    """
+    if nr_of_cuis <= PLOT_FULL_MAX_CUIS:
+        return PLOT_MODE_FULL
+    if nr_of_cuis <= PLOT_DOWNSAMPLE_MAX_CUIS:
+        return PLOT_MODE_DOWNSAMPLED
+    if nr_of_models > 1:
+        return PLOT_MODE_HISTOGRAM
+    return PLOT_MODE_TOPK
+
+
+def _get_all_cuis(per_model: Dict[str, Dict[str, Dict[str, float]]]
+                  ) -> List[str]:
+    # ordered union of all CUIs
+    cuis: Dict[str, None] = {}
+    for perf_data in per_model.values():
+        for cui in perf_data["f1"]:
+            cuis[cui] = None
+    return list(cuis)
+
+
+def _get_values(per_cui: Dict[str, float], cuis: List[str]) -> List[float]:
+    return [float(per_cui.get(cui, math.nan)) for cui in cuis]
+
+
+def _mean(values: List[float]) -> float:
+    present = [val for val in values if not math.isnan(val)]
+    if not present:
+        return math.nan
+    return sum(present) / len(present)
+
+
+def _full_spec(per_model: Dict[str, Dict[str, Dict[str, float]]],
+               cuis: List[str]) -> Tuple[List[str], List[PlotSeries]]:
+    series: List[PlotSeries] = []
+    for model_name, perf_data in per_model.items():
+        for metric, metric_name in _METRICS:
+            series.append({"name": f"{model_name} {metric_name}",
+                           "values": _get_values(perf_data[metric], cuis)})
+    return cuis, series
+
+
+def _downsampled_spec(per_model: Dict[str, Dict[str, Dict[str, float]]],
+                      cuis: List[str], max_points: int
+                      ) -> Tuple[List[str], List[PlotSeries]]:
+    bucket_size = max(1, math.ceil(len(cuis) / max_points))
+    buckets = [cuis[start:start + bucket_size]
+               for start in range(0, len(cuis), bucket_size)]
+    labels = [bucket[0] if len(bucket) == 1
+              else f"{bucket[0]}..{bucket[-1]}" for bucket in buckets]
+    series: List[PlotSeries] = []
+    for model_name, perf_data in per_model.items():
+        for metric, metric_name in _METRICS:
+            values = [_mean(_get_values(perf_data[metric], bucket))
+                      for bucket in buckets]
+            series.append({"name": f"{model_name} {metric_name} "
+                                   f"(mean of {bucket_size})",
+                           "values": values})
+    return labels, series
+
+
+def _get_f1_deltas(per_model: Dict[str, Dict[str, Dict[str, float]]],
+                   cuis: List[str]) -> Dict[str, List[float]]:
+    """Get the F1 differences of each model compared to the first one."""
+    models = list(per_model)
+    base = _get_values(per_model[models[0]]["f1"], cuis)
+    out = {}
+    for model_name in models[1:]:
+        cur = _get_values(per_model[model_name]["f1"], cuis)
+        out[f"{model_name} - {models[0]}"] = [
+            val - base_val for val, base_val in zip(cur, base)]
+    return out
+
+
+def _topk_spec(per_model: Dict[str, Dict[str, Dict[str, float]]],
+               cuis: List[str], top_k: int
+               ) -> Tuple[List[str], List[PlotSeries]]:
+    deltas = _get_f1_deltas(per_model, cuis)
+    if deltas:
+        # ranked by the change in F1 of the last model
+        # compared to the first one
+        ranking = list(deltas.values())[-1]
+    else:
+        ranking = _get_values(list(per_model.values())[0]["f1"], cuis)
+    ranked = sorted((val, cui) for val, cui in zip(ranking, cuis)
+                    if not math.isnan(val))
+    worst = [cui for _, cui in ranked[:top_k]]
+    best = [cui for _, cui in ranked[-top_k:] if cui not in worst]
+    selected = worst + best
+    series: List[PlotSeries] = [
+        {"name": f"{model_name} F1",
+         "values": _get_values(perf_data["f1"], selected)}
+        for model_name, perf_data in per_model.items()]
+    return selected, series
+
+
+def _histogram_spec(per_model: Dict[str, Dict[str, Dict[str, float]]],
+                    cuis: List[str], nr_of_bins: int = 20
+                    ) -> Tuple[List[str], List[PlotSeries]]:
+    deltas = _get_f1_deltas(per_model, cuis)
+    if deltas:
+        low, high = -1.0, 1.0
+    else:
+        # only one model - distribution of F1 values
+        low, high = 0.0, 1.0
+        deltas = {f"{model_name} F1": _get_values(perf_data["f1"], cuis)
+                  for model_name, perf_data in per_model.items()}
+    width = (high - low) / nr_of_bins
+    labels = [f"{low + width * nr:.2f}" for nr in range(nr_of_bins)]
+    series: List[PlotSeries] = []
+    for name, values in deltas.items():
+        counts = [0.0] * nr_of_bins
+        for val in values:
+            if math.isnan(val):
+                continue
+            index = min(int((val - low) / width), nr_of_bins - 1)
+            counts[max(index, 0)] += 1
+        series.append({"name": name, "values": counts})
+    return labels, series
+
+
+def get_dataset_plot_spec(dataset_name: str,
+                          per_model: Dict[str, Dict[str, Dict[str, float]]],
+                          mode: str = PLOT_MODE_AUTO,
+                          top_k: int = PLOT_TOP_K,
+                          max_points: int = PLOT_MAX_POINTS,
+                          ) -> PlotSpec:
+    """Get the plot specification for a dataset.
+
+    Args:
+        dataset_name (str): The name of the dataset.
+        per_model (Dict[str, Dict[str, Dict[str, float]]]): The per CUI
+            precision, recall and F1 ("prec", "recall", "f1") per model.
+        mode (str, optional): The plot mode. Defaults to "auto".
+        top_k (int, optional): The number of worst and best CUIs to show
+            in the "topk" mode. Defaults to PLOT_TOP_K.
+        max_points (int, optional): The maximum number of points in the
+            "downsampled" mode. Defaults to PLOT_MAX_POINTS.
+
+    Raises:
+        ValueError: If the mode is not known.
+
+    Returns:
+        PlotSpec: The plot specification.
+    """
+    cuis = _get_all_cuis(per_model)
+    if mode == PLOT_MODE_AUTO:
+        mode = choose_plot_mode(len(cuis), len(per_model))
+    title = f"Performance Comparison for {dataset_name}"
+    kind, xlabel, ylabel = "line", "CUI", "Score"
+    if mode == PLOT_MODE_FULL:
+        labels, series = _full_spec(per_model, cuis)
+    elif mode == PLOT_MODE_DOWNSAMPLED:
+        labels, series = _downsampled_spec(per_model, cuis, max_points)
+    elif mode == PLOT_MODE_TOPK:
+        kind = "bar"
+        labels, series = _topk_spec(per_model, cuis, top_k)
+        title += f" ({top_k} worst and best CUIs out of {len(cuis)})"
+    elif mode == PLOT_MODE_HISTOGRAM:
+        kind, ylabel = "bar", "Number of CUIs"
+        labels, series = _histogram_spec(per_model, cuis)
+        xlabel = "F1 difference" if len(per_model) > 1 else "F1"
+        title += f" ({len(cuis)} CUIs)"
+    else:
+        raise ValueError(f"Unknown plot mode: {mode}")
+    return {"title": title, "mode": mode, "kind": kind, "xlabel": xlabel,
+            "ylabel": ylabel, "labels": labels, "series": series}
+
+
+def _new_figure(figsize: Tuple[float, float] = _DEFAULT_FIGSIZE) -> Figure:
+    # NOTE: a standalone Figure is not registered with pyplot
+    #       so there is no global state to share between threads
+    fig = Figure(figsize=figsize)
+    fig.add_subplot()
+    return fig
+
+
+def _set_ticks(ax: Axes, labels: List[str]) -> None:
+    # only show a limited number of tick labels
+    # so that the tick layout stays cheap and readable
+    step = max(1, math.ceil(len(labels) / _MAX_TICKS))
+    locs = list(range(0, len(labels), step))
+    ax.set_xticks(locs)
+    ax.set_xticklabels([labels[loc] for loc in locs], rotation=90)
+
+
+def _draw_spec(spec: PlotSpec,
+               figsize: Tuple[float, float] = _DEFAULT_FIGSIZE) -> Figure:
+    fig = _new_figure(figsize)
+    ax = fig.axes[0]
+    x = range(len(spec["labels"]))
+    nr_of_series = max(len(spec["series"]), 1)
+    for nr, series in enumerate(spec["series"]):
+        if spec["kind"] == "bar":
+            width = 0.8 / nr_of_series
+            offset = (nr - (nr_of_series - 1) / 2) * width
+            ax.bar([loc + offset for loc in x], series["values"],
+                   width=width, label=series["name"])
+        else:
+            ax.plot(x, series["values"], label=series["name"])
+    ax.set_xlabel(spec["xlabel"])
+    _set_ticks(ax, spec["labels"])
+    ax.set_ylabel(spec["ylabel"])
+    ax.legend()
+    ax.set_title(spec["title"])
+    fig.tight_layout()
+    return fig
+
+
+def _get_buffers_from_fig(fig: Figure) -> str:
     canvas = FigureCanvas(fig)
     buffer = BytesIO()
     canvas.print_png(buffer)
     buffer.seek(0)
-    plot_data = base64.b64encode(buffer.read()).decode("utf-8")
-    plt.close()
-    return plot_data
+    return base64.b64encode(buffer.read()).decode("utf-8")
 
 
-def _get_buffers(x: Iterable[int], cuis: List[str],
-                 per_ds_figures: Dict[str, Figure]) -> Dict[str, str]:
-    graph_buffers = {}  # To store the paths to the saved graphs
-    for dataset_name, fig in per_ds_figures.items():
-        title = f"Performance Comparison for {dataset_name}"
-        model_plot = _get_buffers_from_fig(title, x, cuis, fig)
-        graph_buffers[dataset_name] = model_plot
-    return graph_buffers
+def _render_spec(spec: PlotSpec) -> str:
+    return _get_buffers_from_fig(_draw_spec(spec))
+
+
+def _get_or_render(spec: PlotSpec) -> str:
+    key = _get_cache_key("spec", spec, {"figsize": _DEFAULT_FIGSIZE})
+    cached = _RENDER_CACHE.get(key)
+    if cached is not None:
+        logger.debug("Using cached graph for '%s'", spec["title"])
+        return cached
+    with PLOT_RENDER_DURATION.time():
+        plot_data = _render_spec(spec)
+    _RENDER_CACHE.set(key, plot_data)
+    return plot_data
 
 
-def _plot_model_count_train(fig: Figure, model_data: Dict[str, int]
-                            ) -> Tuple[Iterable[int], List[str]]:
-    plt.figure(fig)
-    cuis = list(model_data.keys())
-    values = [model_data[cui] for cui in cuis]
-    plt.plot(cuis, values)
-    locs = range(len(cuis))
-    return locs, cuis
+def get_cui_count_train_spec(data: Dict[str, Dict[str, int]],
+                             totals: List[int]) -> PlotSpec:
+    cuis: List[str] = []
+    series: List[PlotSeries] = []
+    for (model_name, model_data), total in zip(data.items(), totals):
+        cuis = list(model_data.keys())
+        series.append({"name": f"{model_name} ({total})",
+                       "values": [float(model_data[cui]) for cui in cuis]})
+    return {"title": "Count train", "mode": PLOT_MODE_FULL, "kind": "line",
+            "xlabel": "CUI", "ylabel": "Count", "labels": cuis,
+            "series": series}
 
 
 def get_buffer_for_cui_count_train(data: Dict[str, Dict[str, int]],
                                    totals: List[int],
                                    ) -> str:
-    fig = plt.figure()
-    for model_data in data.values():
-        locs, cuis = _plot_model_count_train(fig, model_data)
-    legend = [f"{key} ({total})" for key, total in zip(data.keys(), totals)]
-    return _get_buffers_from_fig("Count train", locs, cuis, fig,
-                                 legend=legend, ylabel="Count")
+    return _get_or_render(get_cui_count_train_spec(data, totals))
 
 
-def get_buffers(performance_results: AllModelPerformanceResults
-                ) -> Dict[str, str]:
-    model1 = performance_results[list(performance_results.keys())[0]]
-    ds1 = model1[list(model1.keys())[0]]
-    cuis = list(ds1["F1 for each CUI"].keys())
-    x_vals = range(len(cuis))
+_PerModelPlotted = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def get_per_dataset_plotted(performance_results: AllModelPerformanceResults
+                            ) -> Dict[str, _PerModelPlotted]:
+    """Get the plotted parts of the performance results for each dataset.
+
+    Only the parts that end up on the graphs are kept
+    (i.e not the examples which can be huge).
 
-    # Create and save performance graphs for each dataset
-    per_ds_figures: Dict[str, Figure] = {}
+    Args:
+        performance_results (AllModelPerformanceResults): The results.
+
+    Returns:
+        Dict[str, _PerModelPlotted]: The per CUI precision, recall and F1
+            per model for each dataset.
+    """
+    per_ds: Dict[str, _PerModelPlotted] = {}
     for model_name, model_performances in performance_results.items():
         for dataset_name, perf_data in model_performances.items():
-            precision = perf_data.get("Precision for each CUI", {})
-            recall = perf_data.get("Recall for each CUI", {})
-            f1 = perf_data.get("F1 for each CUI", {})
-            if dataset_name in per_ds_figures:
-                fig = per_ds_figures[dataset_name]
-                plt.figure(fig)
-            else:
-                fig = plt.figure(figsize=(10, 6))
-                per_ds_figures[dataset_name] = fig
-            x = range(len(precision))
-            plt.plot(x, list(precision.values()),
-                     label=f"{model_name} Precision")
-            plt.plot(x, list(recall.values()), label=f"{model_name} Recall")
-            plt.plot(x, list(f1.values()), label=f"{model_name} F1")
-
-    return _get_buffers(x_vals, cuis, per_ds_figures)
+            per_ds.setdefault(dataset_name, {})[model_name] = {
+                "prec": dict(perf_data.get("Precision for each CUI", {})),
+                "recall": dict(perf_data.get("Recall for each CUI", {})),
+                "f1": dict(perf_data.get("F1 for each CUI", {})),
+            }
+    return per_ds
+
+
+def get_buffers(performance_results: AllModelPerformanceResults,
+                mode: str = PLOT_MODE_AUTO,
+                top_k: Optional[int] = None,
+                ) -> Dict[str, str]:
+    graph_buffers = {}
+    for dataset_name, per_model in get_per_dataset_plotted(
+            performance_results).items():
+        spec = get_dataset_plot_spec(dataset_name, per_model, mode=mode,
+                                     top_k=top_k or PLOT_TOP_K)
+        graph_buffers[dataset_name] = _get_or_render(spec)
+    return graph_buffers
+
+
+def get_json_safe_spec(spec: PlotSpec) -> dict:
+    """Get a copy of the plot spec that can be sent as JSON.
+
+    Missing values (NaN) are not valid JSON so they are replaced
+    with None (null).
+
+    Args:
+        spec (PlotSpec): The plot spec.
+
+    Returns:
+        dict: The JSON safe plot spec.
+    """
+    out = dict(spec)
+    out["series"] = [
+        {"name": series["name"],
+         "values": [None if math.isnan(val) else val
+                    for val in series["values"]]}
+        for series in spec["series"]]
+    return out
+
+
+def get_png_for_spec(spec: PlotSpec) -> bytes:
+    return base64.b64decode(_get_or_render(spec))
@@ -1,18 +1,27 @@
-from flask import Blueprint, render_template, request
-from flask import redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, abort
+from flask import redirect, url_for, Response, stream_with_context
 
+from typing import List, Tuple, Iterator
+import os
+import json
 import logging
 
 from ..modelmanage.mlflow_integration import (
     get_all_experiment_names,
-    get_all_model_metadata,
     get_model_from_id,
     get_model_cui_counts,
     get_model_total_count,
 )
 from .datasets import get_test_datasets, upload_test_dataset
 from .datasets import delete_test_dataset, find_or_load_performance
-from .imaging import get_buffers, get_buffer_for_cui_count_train
+from .datasets import iter_performance
+from .warmer import warm_up_dataset
+from .imaging import get_per_dataset_plotted, get_dataset_plot_spec
+from .imaging import get_cui_count_train_spec, get_json_safe_spec
+from .imaging import get_png_for_spec, PLOT_MODES, PLOT_MODE_AUTO
+from ..medcat_linkage.metadata import ModelMetaData
+from ..medcat_linkage.medcat_integration import AllModelPerformanceResults
+from ..medcat_linkage.medcat_integration import PerDatasetPerformanceResult
 
 
 perf_bp = Blueprint("performance", __name__)
@@ -49,6 +58,7 @@ def upload_dataset():
         )
         if issues:
             return issues
+        warm_up_dataset(dataset_name)
         return redirect("/manage_datasets")
 
     return render_template("performance/upload_dataset.html",
@@ -57,75 +67,186 @@ def upload_dataset():
 
 @perf_bp.route("/show_performance", methods=["GET"])
 def show_performance():
-    available_models = [md.as_dict() for md in get_all_model_metadata()]
+    # NOTE: the models are listed by the page (per category)
     available_datasets = get_test_datasets()
     available_categories = get_all_experiment_names()
     return render_template(
         "performance/show_performance.html",
-        available_models=available_models,
         available_datasets=available_datasets,
         available_categories=available_categories,
+        plot_modes=PLOT_MODES,
     )
 
 
+def _get_plot_options(args) -> Tuple[str, bool]:
+    plot_mode = args.get("plot_mode", PLOT_MODE_AUTO)
+    if plot_mode not in PLOT_MODES:
+        abort(400, f"Unknown plot mode: {plot_mode}")
+    force_recalc = args.get("recalc_performance") == "1"
+    return plot_mode, force_recalc
+
+
 @perf_bp.route("/calculate_performance", methods=["POST"])
 def calculate_performance():
     selected_model_ids = request.form.getlist("selected_models")
     selected_dataset_ids = request.form.getlist("selected_datasets")
-    force_recalc = request.form.get("recalc_performance")
+    plot_mode, force_recalc = _get_plot_options(request.form)
     if not selected_model_ids or not selected_dataset_ids:
         # TODO - add message about missing stuff
         return show_performance()
 
     models = [get_model_from_id(model_id) for model_id in selected_model_ids]
+    # NOTE: the performance itself is fetched by the page
+    #       (one dataset at a time) through the data endpoint
+    datasets = [(ds_id, os.path.basename(ds_id))
+                for ds_id in selected_dataset_ids]
+    return render_template(
+        "performance/performance_result.html",
+        model_ids=[model.id for model in models if model],
+        datasets=datasets,
+        plot_mode=plot_mode,
+        force_recalc=force_recalc,
+    )
+
 
-    logger.info("Getting performance of %d models over %d datasets",
-                len(models), len(selected_dataset_ids))
-    performance_results = find_or_load_performance(models,
-                                                   selected_dataset_ids,
+def _get_models(model_ids: List[str]) -> List[ModelMetaData]:
+    # NOTE: the models that can't be found (e.g deleted since) are skipped
+    models = [model for model in map(get_model_from_id, model_ids)
+              if model]
+    if not models:
+        abort(404, "None of the selected models were found")
+    return models
+
+
+def _get_dataset_performance(args) -> Tuple[str, AllModelPerformanceResults,
+                                            str]:
+    model_ids = args.getlist("selected_models")
+    dataset_id = args.get("dataset")
+    plot_mode, force_recalc = _get_plot_options(args)
+    if not model_ids or not dataset_id:
+        abort(400, "Need to specify both models and a dataset")
+    models = _get_models(model_ids)
+    logger.info("Getting performance of %d models over dataset %s",
+                len(models), dataset_id)
+    performance_results = find_or_load_performance(models, [dataset_id],
                                                    force_recalc=force_recalc)
+    return os.path.basename(dataset_id), performance_results, plot_mode
+
+
+@perf_bp.route("/api/performance_data", methods=["GET"])
+def performance_data():
+    ds_name, performance_results, plot_mode = _get_dataset_performance(
+        request.args)
+    summary = {model_name: _get_summary(perf[ds_name])
+               for model_name, perf in performance_results.items()}
+    per_model = get_per_dataset_plotted(performance_results)[ds_name]
+    spec = get_dataset_plot_spec(ds_name, per_model, mode=plot_mode)
+    return jsonify({"dataset": ds_name, "summary": summary,
+                    "plot": get_json_safe_spec(spec)})
+
+
+# cache (DB) specific keys that do not describe the performance
+_NON_SUMMARY_KEYS = {"id", "model_id", "dataset_id"}
+
+
+def _get_summary(result: PerDatasetPerformanceResult) -> dict:
+    return {key: value for key, value in result.items()
+            if not isinstance(value, dict) and key not in _NON_SUMMARY_KEYS}
+
+
+def _to_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@perf_bp.route("/api/performance_stream", methods=["GET"])
+def performance_stream():
+    model_ids = request.args.getlist("selected_models")
+    dataset_ids = request.args.getlist("selected_datasets")
+    _, force_recalc = _get_plot_options(request.args)
+    if not model_ids or not dataset_ids:
+        abort(400, "Need to specify both models and datasets")
+    models = _get_models(model_ids)
+
+    def generate() -> Iterator[str]:
+        # the page needs to know how many results to expect for each dataset
+        yield _to_event("start", {"models": len(models)})
+        updates = iter_performance(models, dataset_ids,
+                                   force_recalc=force_recalc)
+        while True:
+            try:
+                update = next(updates)
+            except StopIteration:
+                break
+            except Exception as e:
+                logger.error("Issue getting performance", exc_info=e)
+                yield _to_event("failure", {"error": str(e)})
+                return
+            yield _to_event("result", {
+                "model_id": update.model.id,
+                "model_name": update.model.name,
+                "dataset": update.dataset_name,
+                "from_cache": update.from_cache,
+                "summary": _get_summary(update.result),
+            })
+        yield _to_event("done", {})
+
+    logger.info("Streaming performance of %d models over %d datasets",
+                len(models), len(dataset_ids))
+    return Response(stream_with_context(generate()),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache",
+                             # for nginx and similar proxies
+                             "X-Accel-Buffering": "no"})
+
+
+@perf_bp.route("/api/performance_plot.png", methods=["GET"])
+def performance_plot():
+    ds_name, performance_results, plot_mode = _get_dataset_performance(
+        request.args)
+    per_model = get_per_dataset_plotted(performance_results)[ds_name]
+    spec = get_dataset_plot_spec(ds_name, per_model, mode=plot_mode)
+    return Response(get_png_for_spec(spec), mimetype="image/png")
+
+
+def _read_cuis(raw_cuis: str, cuis_file) -> List[str]:
+    selected_cuis = [cui.strip() for cui in raw_cuis.split(',')]
+    if cuis_file:
+        file_contents = cuis_file.read().decode('utf-8')
+        if "," in file_contents:
+            file_cuis = file_contents.split(",")
+        else:
+            file_cuis = file_contents.split("\n")
+        selected_cuis += [cui.strip() for cui in file_cuis]
+    return [cui for cui in selected_cuis if cui]
 
-    graph_buffers = get_buffers(performance_results)
 
-    return render_template(
-        "performance/performance_result.html",
-        performance_results=performance_results,
-        graph_paths=graph_buffers,
-    )
+@perf_bp.route('/api/cui_counts', methods=['POST'])
+def cui_counts_data():
+    data = request.get_json()
+    selected_models = data.get('selected_models', [])
+    selected_cuis = data.get('cuis', [])
+    model_cuis_counts = get_model_cui_counts(selected_models,
+                                             selected_cuis)
+    total_counts = [get_model_total_count(model)
+                    for model in selected_models]
+    total_counts = [tc for tc in total_counts if tc is not None]
+    spec = get_cui_count_train_spec(model_cuis_counts, total_counts)
+    return jsonify({"plot": get_json_safe_spec(spec)})
 
 
 @perf_bp.route('/check_cuis', methods=['GET', 'POST'])
 def check_cuis():
     if request.method == 'POST':
         selected_models = request.form.getlist('selected_models')
-        selected_cuis = request.form.get('cuis').split(',')
-        selected_cuis = [cui.strip() for cui in selected_cuis]
-        if 'cuis_file' in request.files:
-            cuis_file = request.files['cuis_file']
-        else:
-            cuis_file = None
-        if cuis_file:
-            # Save the uploaded file to the 'uploads' folder
-            file_contents = cuis_file.read().decode('utf-8')
-            if "," in file_contents:
-                file_cuis = file_contents.split(",")
-            else:
-                file_cuis = file_contents.split("\n")
-            selected_cuis += [cui.strip() for cui in file_cuis if cui.strip()]
-        model_cuis_counts = get_model_cui_counts(selected_models,
-                                                 selected_cuis)
-        total_counts = [get_model_total_count(model)
-                        for model in selected_models]
-        total_counts = [tc for tc in total_counts if tc is not None]
-        buffer = get_buffer_for_cui_count_train(model_cuis_counts,
-                                                total_counts)
+        cuis_file = request.files.get('cuis_file')
+        selected_cuis = _read_cuis(request.form.get('cuis', ''), cuis_file)
+        # NOTE: the counts are fetched by the page through the data endpoint
         return render_template('performance/evaluate_cuis.html',
-                               graphs={"Train counts": buffer})
+                               selected_models=selected_models,
+                               selected_cuis=selected_cuis)
 
     available_categories = get_all_experiment_names()
 
-    available_models = [md.as_dict() for md in get_all_model_metadata()]
-
+    # NOTE: the models are listed by the page (per category)
     return render_template('performance/check_cuis.html',
-                           available_categories=available_categories,
-                           available_models=available_models)
+                           available_categories=available_categories)
@@ -0,0 +1,160 @@
+from typing import List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+import logging
+
+from flask import Flask, current_app
+
+from ..main.envs import STORAGE_PATH
+from ..main.envs import PREEVALUATE, PREEVALUATE_WORKERS
+from ..main.envs import PREEVALUATE_MEMORY_MB, PREEVALUATE_RECENT_MODELS
+from ..main.models import TestDataset
+from ..main.utils import MemoryBudget, get_admission_controller
+from ..medcat_linkage.metadata import ModelMetaData
+from ..medcat_linkage.medcat_integration import estimate_load_memory
+from ..modelmanage.mlflow_integration import (
+    get_model_from_file_name, get_recent_models
+)
+from .datasets import find_or_load_performance
+
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceWarmer:
+    """Runs the queued model-dataset evaluations in the background.
+
+    The results end up in the performance results cache so that the
+    first comparison a user asks for does not need to wait.
+    Each model evaluation reserves an estimate of the memory it needs
+    from a shared budget.
+
+    Args:
+        app (Flask): The app (for the app context in the worker threads).
+        max_workers (int): The number of concurrent evaluations.
+        memory_budget_bytes (int): The memory budget for the evaluations.
+    """
+
+    def __init__(self, app: Flask, max_workers: int,
+                 memory_budget_bytes: int) -> None:
+        self.app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="perf-warmer")
+        self._budget = MemoryBudget(memory_budget_bytes)
+        self._queued: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def queue(self, model: ModelMetaData, dataset_ids: List[str]) -> None:
+        """Queue the evaluation of a model against the datasets.
+
+        Pairs that are already queued are ignored.
+
+        Args:
+            model (ModelMetaData): The model.
+            dataset_ids (List[str]): The datasets.
+        """
+        with self._lock:
+            new_ids = [ds_id for ds_id in dataset_ids
+                       if (model.id, ds_id) not in self._queued]
+            self._queued.update((model.id, ds_id) for ds_id in new_ids)
+        if not new_ids:
+            return
+        logger.info("Queueing pre-evaluation of model '%s' (%s) against "
+                    "%d datasets", model.name, model.id, len(new_ids))
+        self._executor.submit(self._evaluate, model, new_ids)
+
+    def _get_memory_estimate(self, model: ModelMetaData) -> int:
+        # NOTE: a CDB shared with an already loaded model isn't counted
+        return estimate_load_memory(
+            os.path.join(STORAGE_PATH, model.model_file_name),
+            model.cdb_hash)
+
+    def _evaluate(self, model: ModelMetaData, dataset_ids: List[str]
+                  ) -> None:
+        estimate = self._get_memory_estimate(model)
+        self._budget.acquire(estimate)
+        try:
+            # NOTE: background work waits its turn rather than being rejected
+            with self.app.app_context(), get_admission_controller().admit(
+                    estimate, must_wait=True):
+                logger.info("Pre-evaluating model '%s' (%s) against %d "
+                            "datasets", model.name, model.id,
+                            len(dataset_ids))
+                # only calculates the ones not already in the cache
+                find_or_load_performance([model], dataset_ids)
+        except Exception as e:
+            logger.warning("Unable to pre-evaluate model '%s' (%s)",
+                           model.name, model.id, exc_info=e)
+        finally:
+            self._budget.release(estimate)
+            with self._lock:
+                self._queued.difference_update(
+                    (model.id, ds_id) for ds_id in dataset_ids)
+
+
+_WARMER: Optional[PerformanceWarmer] = None
+_WARMER_LOCK = threading.Lock()
+
+
+def _get_warmer() -> Optional[PerformanceWarmer]:
+    global _WARMER
+    if not PREEVALUATE:
+        return None
+    with _WARMER_LOCK:
+        if _WARMER is None:
+            app = current_app._get_current_object()  # type: ignore
+            _WARMER = PerformanceWarmer(app, PREEVALUATE_WORKERS,
+                                        PREEVALUATE_MEMORY_MB * 1024 * 1024)
+        return _WARMER
+
+
+def _get_category_datasets(category: str) -> List[str]:
+    datasets: List[TestDataset] = TestDataset.query.filter_by(
+        category_name=category).all()
+    return [ds.file_path for ds in datasets]
+
+
+def warm_up_model(model_name: str) -> None:
+    """Queue the evaluation of a new model against its category's datasets.
+
+    Does nothing unless pre-evaluation is enabled.
+
+    Args:
+        model_name (str): The (registered) name of the new model.
+    """
+    warmer = _get_warmer()
+    if warmer is None:
+        return
+    model = get_model_from_file_name(model_name)
+    if model is None:
+        logger.warning("Unable to pre-evaluate model '%s' - not found",
+                       model_name)
+        return
+    dataset_ids = _get_category_datasets(model.category)
+    if dataset_ids:
+        warmer.queue(model, dataset_ids)
+
+
+def warm_up_dataset(ds_name: str) -> None:
+    """Queue the evaluation of a new dataset against recent models.
+
+    The models need to be in the same category as the dataset.
+    Does nothing unless pre-evaluation is enabled.
+
+    Args:
+        ds_name (str): The dataset name.
+    """
+    warmer = _get_warmer()
+    if warmer is None:
+        return
+    dataset: Optional[TestDataset] = TestDataset.query.filter_by(
+        name=ds_name).first()
+    if dataset is None:
+        logger.warning("Unable to pre-evaluate dataset '%s' - not found",
+                       ds_name)
+        return
+    for model in get_recent_models(dataset.category_name,
+                                   PREEVALUATE_RECENT_MODELS):
+        warmer.queue(model, [dataset.file_path])
@@ -16,7 +16,20 @@ fi
 
 mkdir -p $MEDCATMLFLOW_LOGS_PATH
 
+# The gunicorn workers write their metrics into this folder
+# (so that /metrics can merge them) - it needs to be empty at startup
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/medcatmlflow_metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Load the pinned models once (before forking the workers)
+# so that the workers share their memory
+PRELOAD=""
+if [ -n "$MEDCATMLFLOW_PINNED_MODELS" ]; then
+  PRELOAD="--preload"
+fi
+
 # Run your application
 cd src
-python -m gunicorn -w $MEDCATMLFLOW_GUNICORN_WORKERS -b 0.0.0.0:5000 --timeout $MEDCATMLFLOW_GUNICORN_TIMEOUT "app:create_app()"
+python -m gunicorn -c app/gunicorn_conf.py -w $MEDCATMLFLOW_GUNICORN_WORKERS -b 0.0.0.0:5000 --timeout $MEDCATMLFLOW_GUNICORN_TIMEOUT $PRELOAD "app:create_app()"
 # python -m flask --app app.app run --host "0.0.0.0" --without-threads
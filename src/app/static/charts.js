@@ -0,0 +1,137 @@
+// Minimal in-browser chart drawing for the plot specs
+// returned by the data endpoints (see performance/imaging.py).
+
+const CHART_COLOURS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+];
+const CHART_MAX_TICKS = 50;
+
+function drawChart(canvas, spec) {
+    const ctx = canvas.getContext("2d");
+    const width = canvas.width;
+    const height = canvas.height;
+    const margin = {left: 60, right: 20, top: 40, bottom: 120};
+    const plotWidth = width - margin.left - margin.right;
+    const plotHeight = height - margin.top - margin.bottom;
+    const nrOfPoints = Math.max(spec.labels.length, 1);
+
+    let maxValue = 0;
+    spec.series.forEach(series => series.values.forEach(value => {
+        if (value !== null && value > maxValue) {
+            maxValue = value;
+        }
+    }));
+    if (maxValue <= 0) {
+        maxValue = 1;
+    }
+    const xFor = index => margin.left + plotWidth * (index + 0.5) / nrOfPoints;
+    const yFor = value => margin.top + plotHeight * (1 - value / maxValue);
+
+    ctx.clearRect(0, 0, width, height);
+    ctx.fillStyle = "#000";
+    ctx.strokeStyle = "#000";
+    ctx.font = "14px sans-serif";
+    ctx.textAlign = "center";
+    ctx.fillText(spec.title, width / 2, 20);
+
+    // axes
+    ctx.beginPath();
+    ctx.moveTo(margin.left, margin.top);
+    ctx.lineTo(margin.left, margin.top + plotHeight);
+    ctx.lineTo(margin.left + plotWidth, margin.top + plotHeight);
+    ctx.stroke();
+
+    // y ticks
+    ctx.font = "10px sans-serif";
+    ctx.textAlign = "right";
+    for (let nr = 0; nr <= 4; nr++) {
+        const value = maxValue * nr / 4;
+        ctx.fillText(value.toFixed(2), margin.left - 4, yFor(value) + 3);
+    }
+    ctx.save();
+    ctx.translate(12, margin.top + plotHeight / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.textAlign = "center";
+    ctx.fillText(spec.ylabel, 0, 0);
+    ctx.restore();
+
+    // x ticks (thinned)
+    const step = Math.max(1, Math.ceil(spec.labels.length / CHART_MAX_TICKS));
+    ctx.textAlign = "right";
+    for (let index = 0; index < spec.labels.length; index += step) {
+        ctx.save();
+        ctx.translate(xFor(index), margin.top + plotHeight + 4);
+        ctx.rotate(-Math.PI / 2);
+        ctx.fillText(spec.labels[index], 0, 3);
+        ctx.restore();
+    }
+    ctx.textAlign = "center";
+    ctx.fillText(spec.xlabel, margin.left + plotWidth / 2, height - 4);
+
+    // data
+    const nrOfSeries = Math.max(spec.series.length, 1);
+    spec.series.forEach((series, seriesNr) => {
+        const colour = CHART_COLOURS[seriesNr % CHART_COLOURS.length];
+        ctx.strokeStyle = colour;
+        ctx.fillStyle = colour;
+        if (spec.kind === "bar") {
+            const barWidth = 0.8 * plotWidth / nrOfPoints / nrOfSeries;
+            series.values.forEach((value, index) => {
+                if (value === null) {
+                    return;
+                }
+                const offset = (seriesNr - (nrOfSeries - 1) / 2) * barWidth;
+                const x = xFor(index) + offset - barWidth / 2;
+                ctx.fillRect(x, yFor(value), barWidth, yFor(0) - yFor(value));
+            });
+        } else {
+            ctx.beginPath();
+            let drawing = false;
+            series.values.forEach((value, index) => {
+                if (value === null) {
+                    drawing = false;
+                    return;
+                }
+                if (drawing) {
+                    ctx.lineTo(xFor(index), yFor(value));
+                } else {
+                    ctx.moveTo(xFor(index), yFor(value));
+                    drawing = true;
+                }
+            });
+            ctx.stroke();
+        }
+    });
+
+    // legend
+    ctx.font = "10px sans-serif";
+    ctx.textAlign = "left";
+    spec.series.forEach((series, seriesNr) => {
+        const y = margin.top + 4 + seriesNr * 14;
+        ctx.fillStyle = CHART_COLOURS[seriesNr % CHART_COLOURS.length];
+        ctx.fillRect(margin.left + plotWidth - 200, y, 10, 10);
+        ctx.fillStyle = "#000";
+        ctx.fillText(series.name, margin.left + plotWidth - 186, y + 9);
+    });
+}
+
+// The loaders are run one at a time (in the order the elements
+// become visible) so the server only ever works on one of them.
+let chartQueue = Promise.resolve();
+
+// Call the loader for each element once it becomes visible.
+function loadLazily(elements, loader) {
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) {
+                return;
+            }
+            observer.unobserve(entry.target);
+            chartQueue = chartQueue.then(() => loader(entry.target)).catch(error => {
+                entry.target.textContent = "Failed to load: " + error;
+            });
+        });
+    });
+    elements.forEach(element => observer.observe(element));
+}
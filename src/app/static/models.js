@@ -0,0 +1,50 @@
+// Loads the model picker options for a category from the
+// (paginated) model listing endpoint (see modelmanage/views.py).
+
+const MODEL_PAGE_SIZE = 200;
+
+async function fetchModels(category) {
+    const models = [];
+    let pageToken = null;
+    do {
+        const params = new URLSearchParams({category: category, page_size: MODEL_PAGE_SIZE});
+        if (pageToken) {
+            params.set("page_token", pageToken);
+        }
+        const response = await fetch("/api/models?" + params.toString());
+        if (!response.ok) {
+            throw new Error("Unable to list models: " + response.status);
+        }
+        const page = await response.json();
+        models.push(...page.models);
+        pageToken = page.next_page_token;
+    } while (pageToken);
+    return models;
+}
+
+async function loadModelOptions(container, category) {
+    container.textContent = "Loading models...";
+    let models;
+    try {
+        models = await fetchModels(category);
+    } catch (error) {
+        container.textContent = error.message;
+        return;
+    }
+    container.textContent = "";
+    if (!models.length) {
+        container.textContent = "No models in this category";
+    }
+    models.forEach(model => {
+        const label = document.createElement("label");
+        label.className = "modelOption";
+        const checkbox = document.createElement("input");
+        checkbox.type = "checkbox";
+        checkbox.name = "selected_models";
+        checkbox.value = model.id;
+        label.appendChild(checkbox);
+        label.appendChild(document.createTextNode(" " + model.name));
+        container.appendChild(label);
+        container.appendChild(document.createElement("br"));
+    });
+}
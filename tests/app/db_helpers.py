@@ -0,0 +1,25 @@
+import unittest
+
+from flask import Flask
+
+from src.app.main.models import db
+
+
+class TestCaseWithDB(unittest.TestCase):
+    """Test case with an app context and an (in-memory) app database."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.app = Flask(__name__)
+        cls.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(cls.app)
+
+    def setUp(self) -> None:
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self) -> None:
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
@@ -0,0 +1,92 @@
+from src.app.main import metrics
+from src.app.main.utils import ExpiringCache
+
+import unittest
+
+from flask import Flask
+from prometheus_client import REGISTRY
+
+
+def get_value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class Client:
+
+    def get_model(self, name: str) -> str:
+        return f"model {name}"
+
+
+class TimedProxyTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.proxy = metrics.TimedProxy(Client(),
+                                        metrics.MLFLOW_CALL_DURATION)
+
+    def test_returns_result(self):
+        self.assertEqual(self.proxy.get_model("m1"), "model m1")
+
+    def test_records_call(self):
+        before = get_value("medcatmlflow_mlflow_call_duration_seconds_count",
+                           method="get_model")
+        self.proxy.get_model("m1")
+        after = get_value("medcatmlflow_mlflow_call_duration_seconds_count",
+                          method="get_model")
+        self.assertEqual(after, before + 1)
+
+
+class CacheMetricsTests(unittest.TestCase):
+
+    def test_records_hits_and_misses(self):
+        cache = ExpiringCache(60, name="test-cache")
+        cache.get("key")
+        cache.set("key", "value")
+        cache.get("key")
+        cache.get("key")
+        self.assertEqual(get_value("medcatmlflow_cache_requests_total",
+                                   cache="test-cache", result="miss"), 1)
+        self.assertEqual(get_value("medcatmlflow_cache_requests_total",
+                                   cache="test-cache", result="hit"), 2)
+
+
+class RequestMetricsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        app = Flask(__name__)
+        metrics.setup_metrics(app)
+
+        @app.route("/things/<thing_id>")
+        def thing(thing_id):
+            return thing_id
+
+        @app.route("/metrics")
+        def get_metrics():
+            data, content_type = metrics.get_metrics()
+            return data, 200, {"Content-Type": content_type}
+        self.client = app.test_client()
+
+    def get_count(self, status: str = "200") -> float:
+        return get_value("medcatmlflow_request_duration_seconds_count",
+                         endpoint="/things/<thing_id>", method="GET",
+                         status=status)
+
+    def test_records_by_rule(self):
+        before = self.get_count()
+        self.client.get("/things/1")
+        self.client.get("/things/2")
+        self.assertEqual(self.get_count(), before + 2)
+
+    def test_records_status(self):
+        before = get_value("medcatmlflow_request_duration_seconds_count",
+                           endpoint="unmatched", method="GET", status="404")
+        self.client.get("/nothing/here")
+        self.assertEqual(get_value(
+            "medcatmlflow_request_duration_seconds_count",
+            endpoint="unmatched", method="GET", status="404"), before + 1)
+
+    def test_metrics_in_text_format(self):
+        self.client.get("/things/1")
+        resp = self.client.get("/metrics")
+        self.assertTrue(resp.content_type.startswith("text/plain"))
+        self.assertIn(b"medcatmlflow_request_duration_seconds_bucket",
+                      resp.data)
@@ -0,0 +1,80 @@
+from src.app.main import profiling
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+
+TOKEN = "secret-token"
+
+
+class ProfilingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._patches = [
+            mock.patch.object(profiling, "PROFILE_PATH",
+                              self._temp_dir.name),
+            mock.patch.object(profiling, "PROFILE_TOKEN", TOKEN),
+            mock.patch.object(profiling, "PROFILE_ALL_REQUESTS", False),
+            mock.patch.object(profiling, "PROFILE_MAX_FILES", 2),
+        ]
+        for patch in self._patches:
+            patch.start()
+        self.app = Flask(__name__)
+
+        @self.app.route("/all_trees")
+        def all_trees():
+            return "trees"
+        profiling.setup_profiling(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self) -> None:
+        for patch in self._patches:
+            patch.stop()
+        self._temp_dir.cleanup()
+
+    def test_not_profiled_without_token(self):
+        self.client.get("/all_trees")
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_not_profiled_with_wrong_token(self):
+        self.client.get("/all_trees?profile=wrong")
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_profiled_with_token(self):
+        resp = self.client.get(f"/all_trees?profile={TOKEN}")
+        self.assertEqual(resp.data, b"trees")
+        names = profiling.list_profiles()
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith("_all_trees.prof"))
+
+    def test_summary(self):
+        self.client.get(f"/all_trees?profile={TOKEN}")
+        sort_by, summary = profiling.get_profile_summary(
+            profiling.list_profiles()[0], "unknown")
+        self.assertEqual(sort_by, "cumulative")
+        self.assertIn("all_trees", summary)
+
+    def test_no_such_profile(self):
+        self.assertIsNone(profiling.get_profile_path(
+            os.path.join("..", "medcatmlflow.log")))
+
+    def test_keeps_newest(self):
+        for _ in range(3):
+            self.client.get(f"/all_trees?profile={TOKEN}")
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+
+class ProfilingDisabledTests(unittest.TestCase):
+
+    def test_no_hooks_when_disabled(self):
+        app = Flask(__name__)
+        with mock.patch.object(profiling, "PROFILE_TOKEN", None), \
+                mock.patch.object(profiling, "PROFILE_ALL_REQUESTS", False):
+            profiling.setup_profiling(app)
+        self.assertFalse(any(app.before_request_funcs.values()))
+        self.assertFalse(any(app.after_request_funcs.values()))
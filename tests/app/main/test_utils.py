@@ -1,8 +1,21 @@
 from src.app.main.utils import build_nodes, get_all_trees
+from src.app.main.utils import AdmissionController, AdmissionRejectedException
+from src.app.main.utils import ExpiringCache
+from src.app.main.utils import setup_logging, stop_logging
+from src.app.main.utils import setup_request_ids, get_request_id
+from src.app.main.utils import JsonFormatter, RequestIdFilter
+from src.app.main import utils
 
 from typing import Dict, Tuple, List
 
+from flask import Flask
+
+import json
+import logging
+import threading
+import time
 import unittest
+from unittest.mock import patch
 
 EXAMPLE_DATA: Dict[str, Tuple[List[str], str]] = {
     # group T1
@@ -156,3 +169,216 @@ class GetAllTreesTests(unittest.TestCase):
                     else:
                         # just returns name
                         self.assertEqual(description, mn)
+
+
+class AdmissionControllerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.controller = AdmissionController(10, max_queue_size=1,
+                                              timeout_seconds=0.05)
+
+    def wait_in_queue(self, nr_of_bytes: int) -> threading.Thread:
+        thread = threading.Thread(target=self.controller.acquire,
+                                  args=(nr_of_bytes,))
+        thread.start()
+        while not self.controller.queue_depth:
+            time.sleep(0.001)
+        return thread
+
+    def test_admits_within_budget(self):
+        with self.controller.admit(8):
+            self.assertEqual(self.controller.used_bytes, 8)
+        self.assertEqual(self.controller.used_bytes, 0)
+
+    def test_admits_oversized_when_empty(self):
+        with self.controller.admit(100):
+            self.assertEqual(self.controller.used_bytes, 100)
+
+    def test_rejects_after_timeout(self):
+        self.controller.acquire(8)
+        with self.assertRaises(AdmissionRejectedException):
+            self.controller.acquire(5)
+        self.assertEqual(self.controller.queue_depth, 0)
+        self.assertEqual(self.controller.nr_rejected, 1)
+
+    def test_rejects_when_queue_full(self):
+        self.controller.timeout_seconds = 1
+        self.controller.acquire(8)
+        thread = self.wait_in_queue(5)
+        with self.assertRaises(AdmissionRejectedException):
+            self.controller.acquire(5)
+        self.controller.release(8)
+        thread.join(timeout=1)
+        self.assertEqual(self.controller.used_bytes, 5)
+
+    def test_must_wait_is_not_rejected(self):
+        self.controller.acquire(8)
+        thread = threading.Thread(target=self.controller.acquire,
+                                  args=(5, True))
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(self.controller.queue_depth, 1)
+        self.controller.release(8)
+        thread.join(timeout=1)
+        self.assertEqual(self.controller.used_bytes, 5)
+
+    def test_nested_admission_not_counted_twice(self):
+        with self.controller.admit(8):
+            with self.controller.admit(8):
+                self.assertEqual(self.controller.used_bytes, 8)
+            self.assertEqual(self.controller.used_bytes, 8)
+        self.assertEqual(self.controller.used_bytes, 0)
+
+    def test_status(self):
+        self.controller.acquire(8)
+        self.assertEqual(self.controller.get_status(), {
+            "total_bytes": 10, "used_bytes": 8, "queue_depth": 0,
+            "nr_rejected": 0})
+
+
+class ExpiringCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = ExpiringCache(60)
+        self.cache.set("key", "value")
+
+    def test_gets_value(self):
+        self.assertEqual(self.cache.get("key"), "value")
+
+    def test_drops_expired(self):
+        with patch.object(time, "time", return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get("key"))
+        self.assertNotIn("key", self.cache.cache)
+
+    def test_get_waits_for_lock(self):
+        results = []
+        with self.cache._lock:
+            thread = threading.Thread(
+                target=lambda: results.append(self.cache.get("key")))
+            thread.start()
+            thread.join(0.1)
+            self.assertEqual(results, [])
+        thread.join()
+        self.assertEqual(results, ["value"])
+
+
+class _BlockingHandler(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.unblocked = threading.Event()
+        self.records: List[Tuple[str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.unblocked.wait(timeout=5)
+        self.records.append((self.format(record),
+                             threading.current_thread().name))
+
+
+class SetupLoggingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.handler = _BlockingHandler()
+        self.logger = logging.getLogger("test_setup_logging")
+        self.logger.propagate = False
+        with patch.object(utils, "_make_handlers",
+                          return_value=[self.handler]):
+            setup_logging(self.logger)
+
+    def tearDown(self) -> None:
+        self.handler.unblocked.set()
+        stop_logging(self.logger)
+
+    def test_does_not_wait_for_handlers(self):
+        start = time.perf_counter()
+        self.logger.info("Message %d", 1)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(self.handler.records, [])
+
+    def test_written_in_background(self):
+        self.logger.info("Message %d", 1)
+        self.handler.unblocked.set()
+        stop_logging(self.logger)
+        self.assertEqual(len(self.handler.records), 1)
+        message, thread_name = self.handler.records[0]
+        self.assertEqual(message, "Message 1")
+        self.assertNotEqual(thread_name, threading.current_thread().name)
+
+    def test_keeps_message_at_time_of_logging(self):
+        args = {"value": 1}
+        self.logger.info("Message %s", args)
+        args["value"] = 2
+        self.handler.unblocked.set()
+        stop_logging(self.logger)
+        self.assertEqual(self.handler.records[0][0], "Message {'value': 1}")
+
+    def test_keeps_exception(self):
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            self.logger.exception("Message")
+        self.handler.unblocked.set()
+        stop_logging(self.logger)
+        self.assertIn("ValueError: failed", self.handler.records[0][0])
+
+    def test_setup_again_replaces_handler(self):
+        old_handler = utils._LOG_HANDLER
+        with patch.object(utils, "_make_handlers",
+                          return_value=[self.handler]):
+            setup_logging(self.logger)
+        # NOTE: pytest adds its own (capturing) handlers to the loggers
+        queue_handlers = [
+            handler for handler in self.logger.handlers
+            if isinstance(handler, utils._NonBlockingQueueHandler)]
+        self.assertEqual(queue_handlers, [utils._LOG_HANDLER])
+        self.assertIsNot(utils._LOG_HANDLER, old_handler)
+        self.assertNotIn(old_handler, self.logger.handlers)
+
+
+class RequestIdTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.app = Flask(__name__)
+        setup_request_ids(cls.app)
+        cls.app.add_url_rule("/id", "id", lambda: get_request_id() or '')
+        cls.client = cls.app.test_client()
+
+    def test_generates_id(self):
+        resp = self.client.get("/id")
+        self.assertTrue(resp.text)
+        self.assertEqual(resp.headers["X-Request-ID"], resp.text)
+
+    def test_ids_differ(self):
+        self.assertNotEqual(self.client.get("/id").text,
+                            self.client.get("/id").text)
+
+    def test_uses_incoming_id(self):
+        resp = self.client.get("/id", headers={"X-Request-ID": "abc-123"})
+        self.assertEqual(resp.text, "abc-123")
+
+    def test_ignores_invalid_incoming_id(self):
+        resp = self.client.get("/id", headers={"X-Request-ID": "a b;c"})
+        self.assertNotEqual(resp.text, "a b;c")
+
+    def test_no_id_outside_request(self):
+        self.client.get("/id")
+        self.assertIsNone(get_request_id())
+
+    def test_filter_adds_id(self):
+        record = logging.LogRecord("name", logging.INFO, "path", 1, "msg",
+                                   None, None)
+        RequestIdFilter().filter(record)
+        self.assertIsNone(record.request_id)
+
+
+class JsonFormatterTests(unittest.TestCase):
+
+    def test_format(self):
+        record = logging.LogRecord("name", logging.INFO, "path", 1,
+                                   "Message %d", (1,), None)
+        record.request_id = "abc"
+        out = json.loads(JsonFormatter().format(record))
+        self.assertEqual((out["level"], out["logger"], out["message"],
+                          out["request_id"]),
+                         ("INFO", "name", "Message 1", "abc"))
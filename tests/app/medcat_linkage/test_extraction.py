@@ -0,0 +1,116 @@
+from src.app.medcat_linkage.extraction import ExtractionCache
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+FILE_SIZE = 1000
+
+
+class ExtractionCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.packs_dir = os.path.join(self._temp_dir.name, "packs")
+        self.cache_dir = os.path.join(self._temp_dir.name, "extracted")
+        os.makedirs(self.packs_dir)
+        self.cache = ExtractionCache(self.cache_dir, 2500, min_age_seconds=0)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def make_pack(self, name: str) -> str:
+        folder = os.path.join(self._temp_dir.name, name)
+        os.makedirs(folder)
+        with open(os.path.join(folder, "cdb.dat"), 'wb') as f:
+            f.write(b"0" * FILE_SIZE)
+        zip_path = shutil.make_archive(os.path.join(self.packs_dir, name),
+                                       "zip", root_dir=folder)
+        shutil.rmtree(folder)
+        return zip_path
+
+    def make_old(self, folder: str, seconds_ago: float) -> None:
+        then = time.time() - seconds_ago
+        os.utime(folder, (then, then))
+
+    def test_extracts_to_cache(self):
+        folder = self.cache.get_folder(self.make_pack("pack1"))
+        self.assertEqual(folder, os.path.join(self.cache_dir, "pack1"))
+        self.assertTrue(os.path.exists(os.path.join(folder, "cdb.dat")))
+
+    def test_does_not_extract_next_to_pack(self):
+        self.cache.get_folder(self.make_pack("pack1"))
+        self.assertEqual(os.listdir(self.packs_dir), ["pack1.zip"])
+
+    def test_leaves_no_temp_folders(self):
+        self.cache.get_folder(self.make_pack("pack1"))
+        self.assertEqual(os.listdir(self.cache_dir), ["pack1"])
+
+    def test_no_json_marker(self):
+        # MedCAT counts the .json files in the folder
+        folder = self.cache.get_folder(self.make_pack("pack1"))
+        self.assertFalse([fn for fn in os.listdir(folder)
+                          if fn.endswith(".json")])
+
+    def test_reuses_existing(self):
+        zip_path = self.make_pack("pack1")
+        folder = self.cache.get_folder(zip_path)
+        os.remove(zip_path)
+        self.assertEqual(self.cache.get_folder(zip_path), folder)
+
+    def test_folder_returned_as_is(self):
+        self.assertEqual(self.cache.get_folder(self.packs_dir),
+                         self.packs_dir)
+
+    def test_usage(self):
+        self.cache.get_folder(self.make_pack("pack1"))
+        self.assertEqual(self.cache.get_usage(), FILE_SIZE)
+
+    def test_evicts_least_recently_used(self):
+        folder1 = self.cache.get_folder(self.make_pack("pack1"))
+        folder2 = self.cache.get_folder(self.make_pack("pack2"))
+        self.make_old(folder1, 20)
+        self.make_old(folder2, 30)
+        self.cache.get_folder(self.make_pack("pack3"))
+        self.assertTrue(os.path.exists(folder1))
+        self.assertFalse(os.path.exists(folder2))
+        self.assertLessEqual(self.cache.get_usage(), self.cache.quota_bytes)
+
+    def test_keeps_recently_used(self):
+        self.cache.min_age_seconds = 60
+        folder1 = self.cache.get_folder(self.make_pack("pack1"))
+        folder2 = self.cache.get_folder(self.make_pack("pack2"))
+        folder3 = self.cache.get_folder(self.make_pack("pack3"))
+        for folder in (folder1, folder2, folder3):
+            self.assertTrue(os.path.exists(folder))
+
+    def test_keeps_the_requested_one_above_quota(self):
+        self.cache.quota_bytes = 10
+        folder = self.cache.get_folder(self.make_pack("pack1"))
+        self.assertTrue(os.path.exists(folder))
+
+    def test_replace_folder(self):
+        zip_path = self.make_pack("pack1")
+        self.cache.get_folder(zip_path)
+        new_folder = self.cache.make_temp_folder()
+        with open(os.path.join(new_folder, "new.dat"), 'w') as f:
+            f.write("new")
+        folder = self.cache.replace_folder(zip_path, new_folder)
+        self.assertEqual(os.listdir(self.cache_dir), ["pack1"])
+        self.assertIn("new.dat", os.listdir(folder))
+        self.assertNotIn("cdb.dat", os.listdir(folder))
+
+    def test_remove(self):
+        zip_path = self.make_pack("pack1")
+        folder = self.cache.get_folder(zip_path)
+        self.cache.remove(zip_path)
+        self.assertFalse(os.path.exists(folder))
+
+    def test_removes_stale_temp_folders(self):
+        temp_folder = self.cache.make_temp_folder()
+        self.make_old(temp_folder, 2 * 60 * 60)
+        self.cache.evict()
+        self.assertFalse(os.path.exists(temp_folder))
@@ -1,11 +1,15 @@
+from src.app.medcat_linkage import medcat_integration
 from src.app.medcat_linkage.medcat_integration import (
     load_CAT, get_model_performance_with_dataset,
     get_cui_counts_for_model,
 )
 
 from medcat.cat import CAT
+from medcat.config import Config
 
 import os
+import shutil
+import tempfile
 from .. import TESTS_RESOURCES_PATH
 
 
@@ -85,3 +89,120 @@ class GettingCUICountsForModelTests(TestCaseWithSpacyModel):
     def test_a(self):
         counts = get_cui_counts_for_model(TEST_MODEL_PACK_PATH, self.cuis)
         self.assertEqual(counts, self.expected_counts)
+
+
+class PinnedModelTests(TestCaseWithSpacyModel):
+
+    def tearDown(self) -> None:
+        medcat_integration._PINNED_MODELS.clear()
+
+    def test_pinned_model_is_loaded(self):
+        cat = medcat_integration.pin_CAT(TEST_MODEL_PACK_PATH)
+        self.assertIs(load_CAT(TEST_MODEL_PACK_PATH), cat)
+
+    def test_pinned_model_is_not_reloaded(self):
+        cat = medcat_integration.pin_CAT(TEST_MODEL_PACK_PATH)
+        self.assertIs(medcat_integration.pin_CAT(TEST_MODEL_PACK_PATH), cat)
+
+    def test_lists_pinned_models(self):
+        medcat_integration.pin_CAT(TEST_MODEL_PACK_PATH)
+        self.assertEqual(medcat_integration.get_pinned_models(),
+                         [TEST_MODEL_PACK_PATH])
+
+
+class SharedCDBTests(TestCaseWithSpacyModel):
+    cdb_hash = "cdb_hash_1"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls._temp_dir = tempfile.TemporaryDirectory()
+        # a pack in the newer format (i.e with a config.json)
+        cat = CAT.load_model_pack(TEST_MODEL_PACK_PATH)
+        pack_name = cat.create_model_pack(cls._temp_dir.name, "pack")
+        cls.pack1 = os.path.join(cls._temp_dir.name, pack_name)
+        cls.pack2 = os.path.join(cls._temp_dir.name, "pack2")
+        shutil.copytree(cls.pack1, cls.pack2)
+        cls.pack_zip = shutil.make_archive(cls.pack2, "zip",
+                                           root_dir=cls.pack2)
+        # the same CDB, but a different config
+        cls.pack3 = os.path.join(cls._temp_dir.name, "pack3")
+        shutil.copytree(cls.pack1, cls.pack3)
+        config_path = os.path.join(cls.pack3, "config.json")
+        config = Config.load(config_path)
+        config.linking.similarity_threshold += 0.1
+        config.save(config_path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._temp_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        medcat_integration.set_cdb_hash_lookup(lambda _: self.cdb_hash)
+
+    def tearDown(self) -> None:
+        medcat_integration.set_cdb_hash_lookup(None)
+        medcat_integration._SHARED_CDBS.clear()
+
+    def load(self, pack: str) -> CAT:
+        return medcat_integration._load_CAT_uncached(pack, share_cdb=True)
+
+    def test_shares_cdb(self):
+        cat1 = self.load(self.pack1)
+        cat2 = self.load(self.pack2)
+        self.assertIs(cat1.cdb, cat2.cdb)
+
+    def test_keeps_own_config(self):
+        cat1 = self.load(self.pack1)
+        cat2 = self.load(self.pack2)
+        self.assertIsNot(cat1.config, cat2.config)
+        self.assertTrue(cat2.config.general.spacy_model.startswith(
+            self.pack2))
+
+    def test_keeps_shared_config(self):
+        cat1 = self.load(self.pack1)
+        shared_config = cat1.cdb.config
+        self.load(self.pack2)
+        self.assertIs(cat1.cdb.config, shared_config)
+        self.assertIsNot(cat1.config, shared_config)
+
+    def test_no_sharing_with_different_config(self):
+        cat1 = self.load(self.pack1)
+        cat3 = self.load(self.pack3)
+        self.assertIsNot(cat1.cdb, cat3.cdb)
+        self.assertNotEqual(cat1.config.linking.similarity_threshold,
+                            cat3.config.linking.similarity_threshold)
+
+    def test_shared_model_works(self):
+        self.load(self.pack1)
+        cat = self.load(self.pack2)
+        perf = get_model_performance_with_dataset(
+            self.pack2, ModelPerformanceTests.dataset_path, cat=cat)
+        self.assertEqual(perf, ModelPerformanceTests.expected_performance)
+
+    def test_no_sharing_without_hash(self):
+        medcat_integration.set_cdb_hash_lookup(lambda _: None)
+        cat1 = self.load(self.pack1)
+        cat2 = self.load(self.pack2)
+        self.assertIsNot(cat1.cdb, cat2.cdb)
+
+    def test_no_sharing_with_config_in_cdb(self):
+        cat1 = self.load(TEST_MODEL_PACK_PATH)
+        cat2 = self.load(TEST_MODEL_PACK_PATH)
+        self.assertIsNot(cat1.cdb, cat2.cdb)
+
+    def test_lists_shared_cdbs(self):
+        cat = self.load(self.pack1)
+        self.assertEqual(medcat_integration.get_shared_cdb_hashes(),
+                         [self.cdb_hash])
+        del cat
+
+    def test_shared_cdb_not_counted(self):
+        unshared = medcat_integration.estimate_load_memory(self.pack_zip,
+                                                           self.cdb_hash)
+        cat = self.load(self.pack1)
+        shared = medcat_integration.estimate_load_memory(self.pack_zip,
+                                                         self.cdb_hash)
+        self.assertLess(shared, unshared)
+        del cat
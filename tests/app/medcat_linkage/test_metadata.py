@@ -1,4 +1,7 @@
-from src.app.medcat_linkage.metadata import create_meta, ModelMetaData
+from src.app.medcat_linkage.metadata import create_meta, copy_meta
+from src.app.medcat_linkage.metadata import ModelMetaData
+
+import unittest
 
 
 from .helpers import TestCaseWithSpacyModel, TEST_MODEL_PACK_PATH
@@ -15,3 +18,33 @@ class CreateMetaTests(TestCaseWithSpacyModel):
                            run_id=-1,
                            hash2mct_id=FAKE_HASH2MCT_DICT)
         self.assertIsInstance(meta, ModelMetaData)
+
+
+class CopyMetaTests(unittest.TestCase):
+    META = ModelMetaData(
+        id="ID1", name="model1", description="descr", category="cat1",
+        version="v1", version_history=["v0"], cdb_hash="hash1",
+        stats={"Number of concepts": 3}, performance={}, changed_parts=[],
+        model_file_name="abc.zip", run_id="run1", mct_cdb_id="5")
+
+    def setUp(self) -> None:
+        self.copied = copy_meta(self.META, "model2", "descr2", "cat2", "run2")
+
+    def test_has_new_id(self):
+        self.assertNotEqual(self.copied.id, self.META.id)
+
+    def test_has_new_descriptors(self):
+        self.assertEqual((self.copied.name, self.copied.description,
+                          self.copied.category, self.copied.run_id),
+                         ("model2", "descr2", "cat2", "run2"))
+
+    def test_keeps_model_values(self):
+        for key in ["version", "version_history", "cdb_hash", "stats",
+                    "model_file_name", "mct_cdb_id"]:
+            with self.subTest(key):
+                self.assertEqual(getattr(self.copied, key),
+                                 getattr(self.META, key))
+
+    def test_does_not_share_values(self):
+        self.copied.stats["changed"] = True
+        self.assertNotIn("changed", self.META.stats)
@@ -0,0 +1,96 @@
+from src.app.medcat_linkage import tag_codec
+from src.app.medcat_linkage.metadata import ModelMetaData
+
+from mlflow.entities.model_registry import RegisteredModel
+from mlflow.entities.model_registry import RegisteredModelTag
+
+import random
+import unittest
+
+
+EXAMPLE_VALUE = {"Number of concepts": 3, "nested": {"a": [1, 2.5, None]},
+                 "name": "it's \"quoted\""}
+
+
+class EncodeDecodeTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        encoded = tag_codec.encode_value(EXAMPLE_VALUE)
+        self.assertEqual(tag_codec.decode_value(encoded), EXAMPLE_VALUE)
+
+    def test_is_compact(self):
+        encoded = tag_codec.encode_value(EXAMPLE_VALUE)
+        self.assertNotIn(", ", encoded)
+        self.assertNotIn(": ", encoded.replace("it's", ""))
+
+    def test_compresses_long_values(self):
+        value = {f"key{nr}": "value" for nr in range(1000)}
+        encoded = tag_codec.encode_value(value)
+        self.assertLessEqual(len(encoded), tag_codec.MAX_TAG_LENGTH)
+        self.assertEqual(tag_codec.decode_value(encoded), value)
+
+    def test_omits_incompressible_values(self):
+        rng = random.Random(42)
+        value = [rng.random() for _ in range(2000)]
+        encoded = tag_codec.encode_value(value)
+        self.assertTrue(tag_codec.is_omitted(encoded))
+        with self.assertRaises(ValueError):
+            tag_codec.decode_value(encoded)
+
+    def test_decodes_legacy_repr(self):
+        self.assertEqual(tag_codec.decode_value(repr(EXAMPLE_VALUE)),
+                         EXAMPLE_VALUE)
+
+    def test_does_not_evaluate(self):
+        with self.assertRaises(ValueError):
+            tag_codec.decode_value("__import__('os').getcwd()")
+
+    def test_optional_round_trip(self):
+        for value in [None, "abc"]:
+            with self.subTest(value):
+                self.assertEqual(tag_codec.decode_optional(
+                    tag_codec.encode_optional(value)), value)
+
+    def test_decodes_legacy_none(self):
+        self.assertIsNone(tag_codec.decode_optional(str(None)))
+
+
+def _get_model(tags: dict) -> RegisteredModel:
+    return RegisteredModel("model1", tags=[
+        RegisteredModelTag(key, value) for key, value in tags.items()])
+
+
+class MetaTagsTests(unittest.TestCase):
+    META = ModelMetaData(
+        id="ID1", name="model1", description="descr", category="cat1",
+        version=None, version_history=["v0", "v1"], cdb_hash="hash1",
+        stats=EXAMPLE_VALUE, performance={}, changed_parts=[],
+        model_file_name="model1.zip", run_id="run1", mct_cdb_id=None)
+
+    def test_tags_are_current(self):
+        self.assertTrue(tag_codec.is_current(self.META.as_tags()))
+
+    def test_tags_are_strings(self):
+        for key, value in self.META.as_tags().items():
+            with self.subTest(key):
+                self.assertIsInstance(value, str)
+
+    def test_round_trip(self):
+        model = _get_model(self.META.as_tags())
+        self.assertEqual(ModelMetaData.from_mlflow_model(model, "run1"),
+                         self.META)
+
+    def test_legacy_tags(self):
+        # MLflow used to save the str of each value
+        model = _get_model({key: str(value) for key, value
+                            in self.META.as_dict().items()})
+        self.assertFalse(tag_codec.is_current(model.tags))
+        self.assertEqual(ModelMetaData.from_mlflow_model(model, "run1"),
+                         self.META)
+
+    def test_legacy_omitted_value(self):
+        tags = {key: str(value) for key, value
+                in self.META.as_dict().items()}
+        tags["stats"] = "N/A"
+        meta = ModelMetaData.from_mlflow_model(_get_model(tags), "run1")
+        self.assertEqual(meta.stats, {})
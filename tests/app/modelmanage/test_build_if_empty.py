@@ -0,0 +1,50 @@
+from src.app.modelmanage import mlflow_integration
+from src.app.modelmanage.experiment_counts import (
+    has_model_counts, rebuild_model_counts, get_model_counts
+)
+from src.app.main.models import db, ExperimentModelCount
+
+from unittest import mock
+
+from sqlalchemy.exc import IntegrityError
+
+from ..db_helpers import TestCaseWithDB
+
+
+def _add_conflicting_counts() -> None:
+    db.session.add_all([ExperimentModelCount(experiment_name="exp1"),
+                        ExperimentModelCount(experiment_name="exp1")])
+    db.session.commit()
+
+
+class BuildIfEmptyTests(TestCaseWithDB):
+
+    def build_counts(self, build=None) -> None:
+        mlflow_integration._build_if_empty(
+            "model counts", has_model_counts,
+            build or (lambda: rebuild_model_counts({"exp1": 2})))
+
+    def test_builds_when_empty(self):
+        self.build_counts()
+        self.assertEqual(get_model_counts(), {"exp1": 2})
+
+    def test_does_not_rebuild(self):
+        rebuild_model_counts({"exp1": 1})
+        build = mock.Mock()
+        self.build_counts(build)
+        build.assert_not_called()
+
+    def test_conflict_with_concurrent_build_is_ignored(self):
+        def build() -> None:
+            # another worker finished building first
+            rebuild_model_counts({"exp1": 1})
+            _add_conflicting_counts()
+
+        self.build_counts(build)
+        self.assertEqual(get_model_counts(), {"exp1": 1})
+
+    def test_other_conflict_is_raised(self):
+        with self.assertRaises(IntegrityError):
+            self.build_counts(_add_conflicting_counts)
+        # i.e the session was rolled back
+        self.assertFalse(has_model_counts())
@@ -0,0 +1,90 @@
+from src.app.modelmanage.bulk_import import PackToImport, find_packs
+
+import os
+import tempfile
+import unittest
+
+
+class FindPacksTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self._temp_dir.name
+        for file_name in ("b.zip", "a.zip", "notes.txt"):
+            with open(os.path.join(self.dir_path, file_name), 'w') as f:
+                f.write("pack")
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def write_manifest(self, content: str) -> str:
+        manifest_path = os.path.join(self.dir_path, "manifest.csv")
+        with open(manifest_path, 'w') as f:
+            f.write(content)
+        return manifest_path
+
+    def test_directory(self):
+        packs = find_packs(self.dir_path, "exp1")
+        self.assertEqual(packs, [
+            PackToImport(os.path.join(self.dir_path, "a.zip"), "exp1", "a",
+                         "Imported from a.zip"),
+            PackToImport(os.path.join(self.dir_path, "b.zip"), "exp1", "b",
+                         "Imported from b.zip"),
+        ])
+
+    def test_directory_needs_experiment(self):
+        with self.assertRaises(ValueError):
+            find_packs(self.dir_path)
+
+    def test_manifest(self):
+        manifest_path = self.write_manifest(
+            "file,experiment,model_name,description\n"
+            "a.zip,exp2,model_a,The first\n"
+            "b.zip,,,\n")
+        packs = find_packs(manifest_path, "exp1")
+        self.assertEqual(packs, [
+            PackToImport(os.path.join(self.dir_path, "a.zip"), "exp2",
+                         "model_a", "The first"),
+            PackToImport(os.path.join(self.dir_path, "b.zip"), "exp1", "b",
+                         "Imported from b.zip"),
+        ])
+
+    def test_manifest_needs_experiment(self):
+        manifest_path = self.write_manifest("file\na.zip\n")
+        with self.assertRaises(ValueError):
+            find_packs(manifest_path)
+
+    def test_manifest_needs_file_column(self):
+        manifest_path = self.write_manifest("path\na.zip\n")
+        with self.assertRaises(ValueError):
+            find_packs(manifest_path, "exp1")
+
+    def test_manifest_within_root(self):
+        manifest_path = self.write_manifest("file\na.zip\n")
+        packs = find_packs(manifest_path, "exp1", root=self.dir_path)
+        self.assertEqual(
+            [pack.file_path for pack in packs],
+            [os.path.realpath(os.path.join(self.dir_path, "a.zip"))])
+
+    def test_manifest_entry_outside_root(self):
+        with tempfile.TemporaryDirectory() as other_dir:
+            outside_path = os.path.join(other_dir, "outside.zip")
+            rel_path = os.path.relpath(outside_path, self.dir_path)
+            for entry in (rel_path, outside_path):
+                with self.subTest(entry=entry):
+                    manifest_path = self.write_manifest(f"file\n{entry}\n")
+                    with self.assertRaises(ValueError):
+                        find_packs(manifest_path, "exp1", root=self.dir_path)
+
+    def test_directory_symlink_outside_root(self):
+        with tempfile.TemporaryDirectory() as other_dir:
+            outside_path = os.path.join(other_dir, "outside.zip")
+            with open(outside_path, 'w') as f:
+                f.write("pack")
+            os.symlink(outside_path, os.path.join(self.dir_path, "c.zip"))
+            with self.assertRaises(ValueError):
+                find_packs(self.dir_path, "exp1", root=self.dir_path)
+
+    def test_missing_path(self):
+        with self.assertRaises(ValueError):
+            find_packs(os.path.join(self.dir_path, "nope"), "exp1")
@@ -0,0 +1,108 @@
+from src.app.modelmanage import experiment_counts
+from src.app.modelmanage import mlflow_integration
+
+from typing import Any, Dict
+from types import SimpleNamespace
+from unittest import mock
+import os
+import tempfile
+import unittest
+
+from mlflow import MlflowClient
+
+from ..db_helpers import TestCaseWithDB
+
+
+class ModelCountTests(TestCaseWithDB):
+    COUNTS = {"exp1": 2, "exp2": 0}
+
+    def setUp(self) -> None:
+        super().setUp()
+        experiment_counts.rebuild_model_counts(self.COUNTS)
+
+    def test_has_counts(self):
+        self.assertTrue(experiment_counts.has_model_counts())
+
+    def test_gets_counts(self):
+        self.assertEqual(experiment_counts.get_model_counts(), self.COUNTS)
+
+    def test_increments(self):
+        experiment_counts.change_model_count("exp1", 1)
+        self.assertEqual(experiment_counts.get_model_counts()["exp1"], 3)
+
+    def test_decrements(self):
+        experiment_counts.change_model_count("exp1", -1)
+        self.assertEqual(experiment_counts.get_model_counts()["exp1"], 1)
+
+    def test_adds_new_experiment(self):
+        experiment_counts.change_model_count("exp3", 1)
+        self.assertEqual(experiment_counts.get_model_counts()["exp3"], 1)
+
+    def test_removes(self):
+        experiment_counts.remove_model_count("exp1")
+        self.assertNotIn("exp1", experiment_counts.get_model_counts())
+
+    def test_rebuild_replaces(self):
+        experiment_counts.rebuild_model_counts({"exp3": 5})
+        self.assertEqual(experiment_counts.get_model_counts(), {"exp3": 5})
+
+
+class SearchOnlyClient:
+    """A client without (access to) a SQL tracking store."""
+
+    def __init__(self, client: MlflowClient, store: Any = None) -> None:
+        self.search_runs = client.search_runs
+        if store is not None:
+            self._tracking_client = SimpleNamespace(store=store)
+
+
+class ExperimentRunCountTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(cls._temp_dir.name, "mlflow.db")
+        cls.client = MlflowClient(tracking_uri=f"sqlite:///{db_path}")
+        cls.exp_ids = [cls.client.create_experiment(name)
+                       for name in ("exp1", "exp2", "exp3")]
+        for exp_id, nr_of_runs in zip(cls.exp_ids, (3, 1, 0)):
+            for _ in range(nr_of_runs):
+                cls.client.create_run(exp_id)
+        # deleted runs aren't counted
+        cls.client.delete_run(
+            cls.client.create_run(cls.exp_ids[1]).info.run_id)
+        cls.expected = dict(zip(cls.exp_ids, (3, 1, 0)))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._temp_dir.cleanup()
+
+    def get_counts(self, client: Any) -> Dict[str, int]:
+        with mock.patch.object(mlflow_integration, "MLFLOW_CLIENT", client):
+            return mlflow_integration.get_experiment_run_counts(self.exp_ids)
+
+    def test_counts_in_db(self):
+        with mock.patch.object(mlflow_integration,
+                               "_count_runs_with_search") as search:
+            counts = self.get_counts(self.client)
+        self.assertEqual(counts, self.expected)
+        search.assert_not_called()
+
+    def test_counts_with_search_with_other_store(self):
+        client = SearchOnlyClient(self.client, store=object())
+        self.assertEqual(self.get_counts(client), self.expected)
+
+    def test_counts_with_search_without_store(self):
+        self.assertEqual(self.get_counts(SearchOnlyClient(self.client)),
+                         self.expected)
+
+    def test_counts_with_search_if_db_count_fails(self):
+        with mock.patch.object(mlflow_integration, "_count_runs_in_db",
+                               side_effect=AttributeError("no such column")):
+            counts = self.get_counts(self.client)
+        self.assertEqual(counts, self.expected)
+
+    def test_search_counts_all_pages(self):
+        client = SearchOnlyClient(self.client)
+        with mock.patch.object(mlflow_integration, "_MAX_RUNS_PAGE_SIZE", 1):
+            self.assertEqual(self.get_counts(client), self.expected)
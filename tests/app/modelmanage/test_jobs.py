@@ -0,0 +1,75 @@
+from src.app.modelmanage import jobs
+
+from ..db_helpers import TestCaseWithDB
+
+
+class JobProgressTests(TestCaseWithDB):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.job_id = jobs.create_job("bulk-import", 3)
+
+    def test_created_running(self):
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["status"], jobs.RUNNING)
+        self.assertEqual(job["total"], 3)
+        self.assertEqual(job["nr_done"], 0)
+
+    def test_records_results(self):
+        jobs.record_result(self.job_id, "pack1")
+        jobs.record_result(self.job_id, "pack2", "Broken")
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["nr_done"], 2)
+        self.assertEqual(job["nr_failed"], 1)
+        self.assertEqual(job["results"], [
+            {"item": "pack1", "error": None},
+            {"item": "pack2", "error": "Broken"},
+        ])
+
+    def test_keeps_results_in_order(self):
+        items = [f"pack{nr}" for nr in range(20)]
+        for item in items:
+            jobs.record_result(self.job_id, item)
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["nr_done"], len(items))
+        self.assertEqual([result["item"] for result in job["results"]],
+                         items)
+
+    def test_recent_jobs_have_no_results(self):
+        jobs.record_result(self.job_id, "pack1")
+        self.assertIsNone(jobs.get_recent_jobs()[0]["results"])
+
+    def test_finish(self):
+        jobs.finish_job(self.job_id)
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["status"], jobs.FINISHED)
+        self.assertIsNotNone(job["finished"])
+
+    def test_fail(self):
+        jobs.finish_job(self.job_id, "Out of disk")
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["status"], jobs.FAILED)
+        self.assertEqual(job["error"], "Out of disk")
+
+    def test_no_such_job(self):
+        self.assertIsNone(jobs.get_job("nope"))
+
+    def test_recent_jobs(self):
+        other_id = jobs.create_job("other", 1)
+        self.assertEqual([job["id"] for job in
+                          jobs.get_recent_jobs("bulk-import")],
+                         [self.job_id])
+        self.assertEqual({job["id"] for job in jobs.get_recent_jobs()},
+                         {self.job_id, other_id})
+
+    def test_start_job(self):
+        thread = jobs.start_job(self.app, self.job_id, jobs.record_result,
+                                self.job_id, "pack1")
+        thread.join()
+        job = jobs.get_job(self.job_id)
+        self.assertEqual(job["status"], jobs.FINISHED)
+        self.assertEqual(job["nr_done"], 1)
+
+    def test_set_total(self):
+        jobs.set_total(self.job_id, 5)
+        self.assertEqual(jobs.get_job(self.job_id)["total"], 5)
@@ -0,0 +1,154 @@
+from src.app.modelmanage import lineage
+from src.app.main.utils import build_nodes, get_all_trees
+
+import sys
+import unittest
+
+from ..db_helpers import TestCaseWithDB
+from ..main.test_utils import EXAMPLE_DATA, EXPECTED_TREE_KEYS
+
+
+def _link(version: str) -> str:
+    return f"ML: {version}" if version in EXAMPLE_DATA else ''
+
+
+def _descr(version: str) -> str:
+    return f"MD: {version}" if version in EXAMPLE_DATA else version
+
+
+EXAMPLE_MODELS = {version: (f"id-{version}", f"name-{version}")
+                  for version in EXAMPLE_DATA}
+# the same by model ID (as the lineage graph is rebuilt)
+EXAMPLE_MODEL_VERSIONS = {model_id: (version, model_name)
+                          for version, (model_id, model_name)
+                          in EXAMPLE_MODELS.items()}
+
+
+def _sorted_trees(trees):
+    return sorted(trees, key=lambda tree: tree[1])
+
+
+class LineageRebuildTests(TestCaseWithDB):
+
+    def setUp(self) -> None:
+        super().setUp()
+        lineage.rebuild_lineage(EXAMPLE_DATA, EXAMPLE_MODEL_VERSIONS)
+
+    def test_has_lineage(self):
+        self.assertTrue(lineage.has_lineage())
+
+    def test_same_trees_as_anytree(self):
+        expected = get_all_trees(build_nodes(EXAMPLE_DATA).values(),
+                                 _link, _descr)
+        got = lineage.get_all_trees_from_lineage(_link, _descr)
+        self.assertEqual(_sorted_trees(got), _sorted_trees(expected))
+
+    def test_ancestors(self):
+        self.assertEqual(lineage.get_ancestors("T2-v5"),
+                         ["T2-v1", "T2-v2", "T2-v3", "T2-v4"])
+
+    def test_root_has_no_ancestors(self):
+        self.assertEqual(lineage.get_ancestors("T1-v1"), [])
+
+    def test_descendants(self):
+        self.assertEqual(lineage.get_descendants("T1-v1"),
+                         ["T1-v2", "T1-v3"])
+
+    def test_registered_models(self):
+        self.assertEqual(lineage.get_registered_models(), EXAMPLE_MODELS)
+
+    def test_registered_models_for_versions(self):
+        versions = ["T2-v1", "T2-v4", "T2-v5"]
+        self.assertEqual(lineage.get_registered_models(versions),
+                         {version: EXAMPLE_MODELS[version]
+                          for version in ["T2-v4", "T2-v5"]})
+
+    def test_roots_by_category(self):
+        self.assertEqual(lineage.get_roots_by_category(),
+                         {"T1": ["T1-v1"], "T2": ["T2-v1"]})
+
+
+class LineageIncrementalTests(TestCaseWithDB):
+
+    def setUp(self) -> None:
+        super().setUp()
+        for version, (history, category) in EXAMPLE_DATA.items():
+            lineage.add_model_lineage(version, history, category,
+                                      *EXAMPLE_MODELS[version])
+
+    def test_same_as_rebuilt(self):
+        incremental = lineage.get_all_trees_from_lineage(_link, _descr)
+        lineage.rebuild_lineage(EXAMPLE_DATA, EXAMPLE_MODEL_VERSIONS)
+        rebuilt = lineage.get_all_trees_from_lineage(_link, _descr)
+        self.assertEqual(_sorted_trees(incremental), _sorted_trees(rebuilt))
+
+    def test_has_all_versions(self):
+        versions = {version
+                    for tree, _ in lineage.get_all_trees_from_lineage(
+                        _link, _descr)
+                    for _, _, version, _ in tree}
+        self.assertEqual(versions, EXPECTED_TREE_KEYS)
+
+    def test_adding_again_changes_nothing(self):
+        before = lineage.get_all_trees_from_lineage(_link, _descr)
+        lineage.add_model_lineage("T2-v5", *EXAMPLE_DATA["T2-v5"],
+                                  *EXAMPLE_MODELS["T2-v5"])
+        after = lineage.get_all_trees_from_lineage(_link, _descr)
+        self.assertEqual(before, after)
+
+    def test_removing_leaf_removes_unreferenced_parents(self):
+        lineage.add_model_lineage("T3-v2", ["T3-v1"], "T3", "id-T3", "T3")
+        lineage.remove_model_lineage("id-T3")
+        self.assertNotIn("T3", lineage.get_roots_by_category())
+
+    def test_removing_inner_keeps_node(self):
+        lineage.remove_model_lineage("id-T2-v4")
+        self.assertIn("T2-v4", lineage.get_ancestors("T2-v5"))
+        self.assertNotIn("T2-v4", lineage.get_registered_models())
+
+    def test_removing_copy_keeps_model(self):
+        # i.e a copy of a model with the same version
+        lineage.add_model_lineage("T2-v5", *EXAMPLE_DATA["T2-v5"],
+                                  "id-copy", "copy")
+        lineage.remove_model_lineage("id-T2-v5")
+        self.assertEqual(lineage.get_registered_models(["T2-v5"]),
+                         {"T2-v5": ("id-copy", "copy")})
+        self.assertIn("T2-v5", lineage.get_descendants("T2-v1"))
+
+    def test_removing_both_copies_removes_node(self):
+        lineage.add_model_lineage("T2-v5", *EXAMPLE_DATA["T2-v5"],
+                                  "id-copy", "copy")
+        lineage.remove_model_lineage("id-T2-v5")
+        lineage.remove_model_lineage("id-copy")
+        self.assertNotIn("T2-v5", lineage.get_descendants("T2-v1"))
+
+    def test_shows_first_of_copies(self):
+        lineage.add_model_lineage("T2-v5", *EXAMPLE_DATA["T2-v5"],
+                                  "id-copy", "copy")
+        self.assertEqual(lineage.get_registered_models(["T2-v5"]),
+                         {"T2-v5": EXAMPLE_MODELS["T2-v5"]})
+
+    def test_rebuilt_with_copies(self):
+        lineage.rebuild_lineage(EXAMPLE_DATA, {
+            **EXAMPLE_MODEL_VERSIONS, "id-copy": ("T2-v5", "copy")})
+        lineage.remove_model_lineage("id-T2-v5")
+        self.assertEqual(lineage.get_registered_models(["T2-v5"]),
+                         {"T2-v5": ("id-copy", "copy")})
+
+    def test_renaming(self):
+        lineage.rename_model_lineage("id-T1-v1", "new name")
+        self.assertEqual(lineage.get_registered_models(["T1-v1"]),
+                         {"T1-v1": ("id-T1-v1", "new name")})
+
+
+class RenderTests(unittest.TestCase):
+
+    def test_renders_chain_longer_than_recursion_limit(self):
+        length = sys.getrecursionlimit() * 2
+        children = {f"v{nr}": [f"v{nr + 1}"] for nr in range(length - 1)}
+        rendered = list(lineage._render("v0", children))
+        self.assertEqual([version for _, version in rendered],
+                         [f"v{nr}" for nr in range(length)])
+        self.assertEqual(rendered[1][0], lineage._END)
+        self.assertEqual(rendered[-1][0],
+                         lineage._BLANK * (length - 2) + lineage._END)
@@ -0,0 +1,230 @@
+from src.app.modelmanage import mlflow_integration
+from src.app.modelmanage import views
+
+from mlflow.entities.model_registry import RegisteredModel
+from mlflow.entities.model_registry import RegisteredModelTag
+from mlflow.store.entities.paged_list import PagedList
+
+from datetime import datetime
+from typing import List, Optional
+from unittest import mock
+import unittest
+
+from flask import Flask
+
+
+class PageTokenTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        token = mlflow_integration._encode_page_token("abc", 3)
+        self.assertEqual(mlflow_integration._decode_page_token(token),
+                         ("abc", 3))
+
+    def test_no_token_is_first_page(self):
+        self.assertEqual(mlflow_integration._decode_page_token(None),
+                         (None, 0))
+
+    def test_invalid_token_raises(self):
+        with self.assertRaises(ValueError):
+            mlflow_integration._decode_page_token("not-a-token")
+
+
+class ModelSummaryTests(unittest.TestCase):
+    TAGS = {"id": "ID1", "name": "model1", "description": "descr",
+            "category": "cat1", "version": "v1", "cdb_hash": "hash1",
+            "model_file_name": "model1.zip", "run_id": "run1",
+            "stats": "{'big': 'dict'}", "performance": "{}"}
+
+    def setUp(self) -> None:
+        self.model = RegisteredModel("model1", creation_timestamp=0, tags=[
+            RegisteredModelTag(key, value)
+            for key, value in self.TAGS.items()])
+        self.summary = mlflow_integration._get_model_summary(self.model)
+
+    def test_has_summary_keys(self):
+        for key in mlflow_integration.SUMMARY_KEYS:
+            with self.subTest(key):
+                self.assertEqual(self.summary[key], self.TAGS[key])
+
+    def test_has_no_big_dicts(self):
+        self.assertNotIn("stats", self.summary)
+        self.assertNotIn("performance", self.summary)
+
+    def test_has_creation_time(self):
+        self.assertIsNotNone(self.summary["created"])
+
+
+def _timestamp_ms(day: int) -> int:
+    return int(datetime(2023, 1, day).timestamp() * 1000)
+
+
+def make_model(name: str, created: int, updated: int,
+               category: str = "cat1", foreign: bool = False
+               ) -> RegisteredModel:
+    """Make a registered model created and updated on the given days."""
+    tags = {} if foreign else {"id": f"ID-{name}", "name": name,
+                               "category": category}
+    return RegisteredModel(name,
+                           creation_timestamp=_timestamp_ms(created),
+                           last_updated_timestamp=_timestamp_ms(updated),
+                           tags=[RegisteredModelTag(key, value)
+                                 for key, value in tags.items()])
+
+
+class FakeRegistry:
+    """Returns the models (sorted as requested) a page at a time."""
+
+    def __init__(self, models: List[RegisteredModel]) -> None:
+        self.models = models
+        self.filter_strings: List[Optional[str]] = []
+
+    def search_registered_models(self, filter_string=None, max_results=100,
+                                 order_by=None, page_token=None):
+        self.filter_strings.append(filter_string)
+        key, order = (order_by or ["name ASC"])[0].split(" ")
+        models = sorted(self.models, key=lambda model: getattr(model, key),
+                        reverse=order == "DESC")
+        start = int(page_token) if page_token else 0
+        end = start + max_results
+        # NOTE: the SQL store returns the tokens as bytes
+        token = str(end).encode("utf-8") if end < len(models) else None
+        return PagedList(models[start:end], token)
+
+
+class ListModelSummariesTests(unittest.TestCase):
+    models = [
+        make_model("model3", created=3, updated=5),
+        make_model("model1", created=1, updated=7),
+        make_model("foreign", created=2, updated=2, foreign=True),
+        make_model("model5", created=5, updated=1, category="cat2"),
+        make_model("model2", created=2, updated=6),
+        make_model("model4", created=4, updated=3),
+    ]
+
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(self.models)
+        patcher = mock.patch.object(mlflow_integration, "MLFLOW_CLIENT",
+                                    self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def list_all(self, page_size: int = 2, **kwargs) -> List[str]:
+        names = []
+        page_token = None
+        while True:
+            summaries, page_token = mlflow_integration.list_model_summaries(
+                page_size=page_size, page_token=page_token, **kwargs)
+            self.assertLessEqual(len(summaries), page_size)
+            names.extend(summary["name"] for summary in summaries)
+            if page_token is None:
+                return names
+
+    def test_lists_all_pages(self):
+        self.assertEqual(self.list_all(),
+                         ["model1", "model2", "model3", "model4", "model5"])
+
+    def test_first_page_has_next_token(self):
+        summaries, page_token = mlflow_integration.list_model_summaries(
+            page_size=2)
+        self.assertEqual([summary["name"] for summary in summaries],
+                         ["model1", "model2"])
+        self.assertIsNotNone(page_token)
+
+    def test_skips_foreign_models(self):
+        self.assertNotIn("foreign", self.list_all(page_size=1))
+
+    def test_sorts_descending(self):
+        self.assertEqual(self.list_all(descending=True),
+                         ["model5", "model4", "model3", "model2", "model1"])
+
+    def test_sorts_by_update_time(self):
+        self.assertEqual(self.list_all(sort="updated"),
+                         ["model5", "model4", "model3", "model2", "model1"])
+
+    def test_filters_by_creation_date(self):
+        names = self.list_all(created_after=datetime(2023, 1, 2),
+                              created_before=datetime(2023, 1, 4))
+        self.assertEqual(names, ["model2", "model3", "model4"])
+
+    def test_date_filter_fills_pages(self):
+        summaries, _ = mlflow_integration.list_model_summaries(
+            page_size=2, created_after=datetime(2023, 1, 3))
+        self.assertEqual([summary["name"] for summary in summaries],
+                         ["model3", "model4"])
+
+    def test_passes_filters_to_registry(self):
+        mlflow_integration.list_model_summaries(
+            category="cat1", name_prefix="mod'el", cdb_hash="hash1")
+        self.assertEqual(self.registry.filter_strings[0],
+                         "tag.category = 'cat1' AND name LIKE 'mod\\'el%' "
+                         "AND tag.cdb_hash = 'hash1'")
+
+    def test_prefix_wildcards_match_literally(self):
+        models = [make_model("a_b1", created=1, updated=1),
+                  make_model("axb2", created=2, updated=2),
+                  make_model("a%b3", created=3, updated=3)]
+        # NOTE: the fake doesn't filter, i.e it returns (at least) what
+        #       the registry's LIKE would with _ and % as wildcards
+        with mock.patch.object(mlflow_integration, "MLFLOW_CLIENT",
+                               FakeRegistry(models)):
+            self.assertEqual(self.list_all(name_prefix="a_b"), ["a_b1"])
+            self.assertEqual(self.list_all(name_prefix="a%"), ["a%b3"])
+
+    def test_no_filters(self):
+        mlflow_integration.list_model_summaries()
+        self.assertIsNone(self.registry.filter_strings[0])
+
+    def test_unknown_sort_key_raises(self):
+        with self.assertRaises(ValueError):
+            mlflow_integration.list_model_summaries(sort="created")
+
+    def test_invalid_page_size_raises(self):
+        with self.assertRaises(ValueError):
+            mlflow_integration.list_model_summaries(page_size=0)
+
+
+class ListModelsViewTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        app = Flask(__name__)
+        app.register_blueprint(views.models_bp)
+        cls.client = app.test_client()
+
+    def setUp(self) -> None:
+        patcher = mock.patch.object(
+            mlflow_integration, "MLFLOW_CLIENT",
+            FakeRegistry(ListModelSummariesTests.models))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **args):
+        return self.client.get("/api/models", query_string=args)
+
+    def test_pages_through_models(self):
+        first = self.get(page_size=3, order="desc").get_json()
+        self.assertEqual([model["name"] for model in first["models"]],
+                         ["model5", "model4", "model3"])
+        second = self.get(page_size=3, order="desc",
+                          page_token=first["next_page_token"]).get_json()
+        self.assertEqual([model["name"] for model in second["models"]],
+                         ["model2", "model1"])
+        self.assertIsNone(second["next_page_token"])
+
+    def test_has_summaries(self):
+        model = self.get().get_json()["models"][0]
+        self.assertEqual(model["id"], "ID-model1")
+        self.assertIn("created", model)
+
+    def test_filters_by_creation_date(self):
+        models = self.get(created_after="2023-01-02",
+                          created_before="2023-01-03").get_json()["models"]
+        # NOTE: the end date is inclusive
+        self.assertEqual([model["name"] for model in models],
+                         ["model2", "model3"])
+
+    def test_invalid_sort_is_bad_request(self):
+        self.assertEqual(self.get(sort="created").status_code, 400)
+
+    def test_invalid_page_token_is_bad_request(self):
+        self.assertEqual(self.get(page_token="nope").status_code, 400)
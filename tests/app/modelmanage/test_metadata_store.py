@@ -0,0 +1,109 @@
+from src.app.modelmanage import metadata_store
+from src.app.medcat_linkage.metadata import ModelMetaData
+
+from ..db_helpers import TestCaseWithDB
+
+
+def _get_meta(nr: int, category: str = "cat1",
+              mct_cdb_id=None) -> ModelMetaData:
+    return ModelMetaData(
+        id=f"ID{nr}", name=f"model{nr}", description=f"descr{nr}",
+        category=category, version=f"v{nr}",
+        version_history=[f"v{nr - 1}"], cdb_hash=f"hash{nr}",
+        stats={"Number of concepts": nr, "nested": {"a": [1, 2]}},
+        performance={"ds": {"f1": 0.5}}, changed_parts=[],
+        model_file_name=f"model{nr}.zip", run_id=f"run{nr}",
+        mct_cdb_id=mct_cdb_id)
+
+
+class MetadataStoreTests(TestCaseWithDB):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.metas = [_get_meta(1), _get_meta(2, mct_cdb_id="5"),
+                      _get_meta(3, category="cat2")]
+        for meta in self.metas:
+            metadata_store.save_metadata(meta, f"reg-{meta.name}")
+
+    def test_has_metadata(self):
+        self.assertTrue(metadata_store.has_metadata())
+
+    def test_round_trip(self):
+        for meta in self.metas:
+            with self.subTest(meta.id):
+                self.assertEqual(metadata_store.get_metadata(meta.id), meta)
+
+    def test_get_by_version(self):
+        self.assertEqual(metadata_store.get_metadata_by_version("v2"),
+                         self.metas[1])
+
+    def test_get_by_registered_name(self):
+        self.assertEqual(
+            metadata_store.get_metadata_by_registered_name("reg-model3"),
+            self.metas[2])
+
+    def test_get_registered_name(self):
+        self.assertEqual(metadata_store.get_registered_name("ID1"),
+                         "reg-model1")
+
+    def test_get_all(self):
+        self.assertEqual(metadata_store.get_all_metadata(), self.metas)
+
+    def test_get_all_in_category(self):
+        self.assertEqual(metadata_store.get_all_metadata("cat2"),
+                         self.metas[2:])
+
+    def test_update(self):
+        meta = _get_meta(1)
+        meta.name = "new name"
+        meta.stats = {"changed": True}
+        metadata_store.save_metadata(meta, "reg-model1")
+        self.assertEqual(metadata_store.get_metadata("ID1"), meta)
+        self.assertEqual(len(metadata_store.get_all_metadata()), 3)
+
+    def test_delete(self):
+        metadata_store.delete_metadata("ID1")
+        self.assertIsNone(metadata_store.get_metadata("ID1"))
+        self.assertEqual(len(metadata_store.get_all_metadata()), 2)
+
+    def test_hash2mct_id(self):
+        self.assertEqual(metadata_store.get_hash2mct_id(), {"hash2": "5"})
+
+    def test_import_skips_existing(self):
+        changed = _get_meta(1)
+        changed.name = "should not change"
+        nr_of_models = metadata_store.import_metadata(
+            [(changed, "reg-model1"), (_get_meta(4), "reg-model4")])
+        self.assertEqual(nr_of_models, 1)
+        self.assertEqual(metadata_store.get_metadata("ID1").name, "model1")
+        self.assertEqual(metadata_store.get_metadata("ID4"), _get_meta(4))
+
+    def test_count_per_category(self):
+        self.assertEqual(metadata_store.get_model_count_per_category(),
+                         {"cat1": 2, "cat2": 1})
+
+    def test_get_by_file_name(self):
+        self.assertEqual(
+            metadata_store.get_metadata_by_file_name("model2.zip"),
+            self.metas[1])
+
+    def test_count_file_references(self):
+        metadata_store.save_metadata(_get_meta(4), "reg-model4")
+        other = _get_meta(5)
+        other.model_file_name = "model4.zip"
+        metadata_store.save_metadata(other, "reg-model5")
+        self.assertEqual(
+            metadata_store.count_file_references("model4.zip"), 2)
+        self.assertEqual(
+            metadata_store.count_file_references("unknown.zip"), 0)
+
+    def test_metadata_source(self):
+        metadata_store.save_metadata_source("ID1", "packhash1", 1)
+        metadata_store.save_metadata_source("ID1", "packhash2", 2)
+        self.assertEqual(metadata_store.get_metadata_sources(),
+                         {"ID1": ("packhash2", 2)})
+
+    def test_delete_removes_source(self):
+        metadata_store.save_metadata_source("ID1", "packhash1", 1)
+        metadata_store.delete_metadata("ID1")
+        self.assertEqual(metadata_store.get_metadata_sources(), {})
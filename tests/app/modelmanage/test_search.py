@@ -0,0 +1,103 @@
+from src.app.modelmanage import search
+from src.app.modelmanage import mlflow_integration
+from src.app.main.models import db
+
+from unittest import mock
+
+from sqlalchemy import text
+
+from ..db_helpers import TestCaseWithDB
+from .test_listing import FakeRegistry, make_model
+
+
+EXAMPLE_MODELS = [
+    {"id": "ID1", "name": "kidney model", "description": "renal concepts",
+     "category": "snomed", "version": "v1", "run_id": "run1"},
+    {"id": "ID2", "name": "heart model", "description": "cardiology",
+     "category": "umls", "version": "v2", "run_id": "run2"},
+    {"id": "ID3", "name": "general", "description": "kidney and heart",
+     "category": "snomed", "version": "v3", "run_id": "run3"},
+]
+
+
+class _SearchTestBase(TestCaseWithDB):
+    use_fts = True
+
+    def setUp(self) -> None:
+        super().setUp()
+        if self.use_fts:
+            search.setup_search_index(self.app)
+        search.rebuild_search_index(EXAMPLE_MODELS)
+
+    def tearDown(self) -> None:
+        db.session.execute(text(f"DROP TABLE IF EXISTS {search.FTS_TABLE}"))
+        super().tearDown()
+
+    def _search(self, query, category=None):
+        return [res["id"] for res in
+                search.search_models(query, category=category)]
+
+
+class SearchTests(_SearchTestBase):
+
+    def test_uses_fts(self):
+        self.assertTrue(search._has_fts())
+
+    def test_finds_by_name(self):
+        self.assertIn("ID2", self._search("heart"))
+
+    def test_finds_by_prefix(self):
+        self.assertIn("ID1", self._search("kidn"))
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self._search("kidney"), ["ID1", "ID3"])
+
+    def test_all_terms_need_to_match(self):
+        self.assertEqual(self._search("kidney heart"), ["ID3"])
+
+    def test_finds_by_category(self):
+        self.assertEqual(sorted(self._search("snomed")), ["ID1", "ID3"])
+
+    def test_filters_by_category(self):
+        self.assertEqual(self._search("heart", category="umls"), ["ID2"])
+
+    def test_empty_query_finds_nothing(self):
+        self.assertEqual(self._search("  "), [])
+
+    def test_index_model_updates(self):
+        search.index_model("ID2", "lung model", "respiratory", "umls", "v2")
+        self.assertEqual(self._search("heart"), ["ID3"])
+        self.assertEqual(self._search("lung"), ["ID2"])
+
+    def test_index_model_adds(self):
+        search.index_model("ID4", "liver model", "hepatic", "umls", "v4")
+        self.assertEqual(self._search("liver"), ["ID4"])
+
+    def test_remove_model(self):
+        search.remove_model("ID1")
+        self.assertEqual(self._search("kidney"), ["ID3"])
+
+
+class PatternSearchTests(SearchTests):
+    use_fts = False
+
+    def test_uses_fts(self):
+        self.assertFalse(search._has_fts())
+
+    def test_ranks_name_matches_first(self):
+        # no ranking - just ordered by name
+        self.assertEqual(self._search("kidney"), ["ID3", "ID1"])
+
+
+class BuildSearchIndexTests(TestCaseWithDB):
+
+    def test_skips_foreign_models(self):
+        registry = FakeRegistry([
+            make_model("model1", created=1, updated=1),
+            make_model("foreign", created=2, updated=2, foreign=True)])
+        with mock.patch.object(mlflow_integration, "MLFLOW_CLIENT",
+                               registry):
+            mlflow_integration._ensure_search_index()
+        self.assertTrue(search.has_search_index())
+        self.assertEqual([res["id"] for res in search.search_models("model")],
+                         ["ID-model1"])
@@ -0,0 +1,57 @@
+from src.app.modelmanage import mlflow_integration
+from src.app.medcat_linkage.metadata import METADATA_VERSION
+from src.app.main.utils import StaleMetadataException
+
+from mlflow.entities.model_registry import RegisteredModel
+from mlflow.entities.model_registry import RegisteredModelTag
+
+import unittest
+from unittest.mock import patch
+
+
+TAGS = {"id": "ID1", "name": "model1", "description": "descr",
+        "category": "cat1", "version": "v1", "version_history": "[]",
+        "cdb_hash": "hash1", "stats": "{}", "performance": "{}",
+        "changed_parts": "[]", "model_file_name": "model1.zip",
+        "run_id": "run1", "mct_cdb_id": "None"}
+
+
+def _get_model(**changes) -> RegisteredModel:
+    tags = dict(TAGS, **changes)
+    return RegisteredModel("model1", tags=[
+        RegisteredModelTag(key, value) for key, value in tags.items()
+        if value is not None])
+
+
+class StaleMetadataTests(unittest.TestCase):
+    sources = {"ID1": ("packhash1", METADATA_VERSION)}
+
+    def test_up_to_date(self):
+        self.assertFalse(mlflow_integration._is_stale(
+            _get_model(), self.sources, "packhash1"))
+
+    def test_incomplete_is_stale(self):
+        self.assertTrue(mlflow_integration._is_stale(
+            _get_model(stats=None), self.sources, "packhash1"))
+
+    def test_changed_pack_is_stale(self):
+        self.assertTrue(mlflow_integration._is_stale(
+            _get_model(), self.sources, "packhash2"))
+
+    def test_old_version_is_stale(self):
+        sources = {"ID1": ("packhash1", METADATA_VERSION - 1)}
+        self.assertTrue(mlflow_integration._is_stale(
+            _get_model(), sources, "packhash1"))
+
+    def test_unknown_source_is_not_stale(self):
+        self.assertFalse(mlflow_integration._is_stale(
+            _get_model(), {}, "packhash1"))
+
+    @patch.object(mlflow_integration, "_get_run_id", return_value="run1")
+    def test_page_views_do_not_recalculate(self, _):
+        with patch.object(mlflow_integration,
+                          "recalc_model_metadata") as recalc:
+            with self.assertRaises(StaleMetadataException):
+                mlflow_integration._get_meta_from_tags(
+                    _get_model(stats=None))
+        recalc.assert_not_called()
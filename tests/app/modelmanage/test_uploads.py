@@ -0,0 +1,61 @@
+from src.app.modelmanage import uploads
+
+from werkzeug.test import EnvironBuilder
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+
+CONTENT = b"some model pack content" * 10000
+
+
+class StreamedUploadTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self._temp_dir.name
+        environ = EnvironBuilder(method="POST", data={
+            "model_name": "model1",
+            "file": (io.BytesIO(CONTENT), "pack.zip"),
+        }).get_environ()
+        self.form, self.files = uploads.parse_streamed_upload(
+            environ, self.dir_path)
+        self.file_name, self.file = self.files["file"]
+
+    def tearDown(self) -> None:
+        self.file.discard()
+        self._temp_dir.cleanup()
+
+    def test_parses_form(self):
+        self.assertEqual(self.form["model_name"], "model1")
+
+    def test_has_file_name(self):
+        self.assertEqual(self.file_name, "pack.zip")
+
+    def test_streams_to_dir(self):
+        self.assertEqual(os.path.dirname(self.file.path), self.dir_path)
+
+    def test_hashes_content(self):
+        self.assertEqual(self.file.content_hash,
+                         hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(self.file.size, len(CONTENT))
+
+    def test_move_to(self):
+        file_path = os.path.join(self.dir_path, "final.zip")
+        self.file.move_to(file_path)
+        with open(file_path, "rb") as f:
+            self.assertEqual(f.read(), CONTENT)
+        self.assertEqual(os.listdir(self.dir_path), ["final.zip"])
+
+    def test_discard(self):
+        self.file.discard()
+        self.assertEqual(os.listdir(self.dir_path), [])
+
+    def test_file_hash_matches(self):
+        self.file.move_to(os.path.join(self.dir_path, "final.zip"))
+        self.assertEqual(uploads.get_file_hash(
+            os.path.join(self.dir_path, "final.zip")),
+            self.file.content_hash)
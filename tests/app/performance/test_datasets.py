@@ -0,0 +1,81 @@
+from src.app.performance import datasets
+from src.app.performance.cache import add_to_cache
+from src.app.main.utils import AdmissionController, AdmissionRejectedException
+
+from unittest import mock
+
+from ..db_helpers import TestCaseWithDB
+
+
+class FakeModel:
+
+    def __init__(self, model_id: str) -> None:
+        self.id = model_id
+        self.name = f"name of {model_id}"
+        self.model_file_name = f"{model_id}.zip"
+        self.cdb_hash = f"cdb hash of {model_id}"
+
+
+class IterPerformanceTests(TestCaseWithDB):
+    models = [FakeModel("m1"), FakeModel("m2")]
+    dataset_names = ["/datasets/ds1.json", "/datasets/ds2.json"]
+    cached = ("m2", "/datasets/ds2.json")
+    calculated = {"False positives": 1}
+
+    def setUp(self) -> None:
+        super().setUp()
+        add_to_cache(*self.cached, {"False positives": 5})
+
+    def get_updates(self, force_recalc: bool = False):
+        with mock.patch.object(datasets, "calc_performance",
+                               return_value=self.calculated) as calc:
+            updates = list(datasets.iter_performance(
+                self.models, self.dataset_names, force_recalc=force_recalc))
+        return updates, calc
+
+    def test_yields_all_pairs(self):
+        updates, _ = self.get_updates()
+        self.assertEqual(len(updates),
+                         len(self.models) * len(self.dataset_names))
+
+    def test_yields_cached_first(self):
+        updates, _ = self.get_updates()
+        first = updates[0]
+        self.assertTrue(first.from_cache)
+        self.assertEqual(first.model.id, self.cached[0])
+        self.assertEqual(first.dataset_name, "ds2.json")
+        self.assertFalse(any(update.from_cache for update in updates[1:]))
+
+    def test_only_calculates_uncached(self):
+        _, calc = self.get_updates()
+        self.assertEqual(calc.call_count, 3)
+
+    def test_force_recalc_calculates_all(self):
+        updates, calc = self.get_updates(force_recalc=True)
+        self.assertEqual(calc.call_count, 4)
+        self.assertFalse(any(update.from_cache for update in updates))
+
+    def test_find_or_load_keeps_order(self):
+        with mock.patch.object(datasets, "calc_performance",
+                               return_value=self.calculated):
+            results = datasets.find_or_load_performance(self.models,
+                                                        self.dataset_names)
+        self.assertEqual(list(results), [model.name for model in self.models])
+        for model_results in results.values():
+            self.assertEqual(list(model_results), ["ds1.json", "ds2.json"])
+
+    def test_rejected_calculation_raises(self):
+        controller = AdmissionController(10, max_queue_size=0)
+        controller.acquire(10)
+        with mock.patch.object(datasets, "get_admission_controller",
+                               return_value=controller), \
+                mock.patch.object(datasets, "get_model_memory_estimate",
+                                  return_value=5), \
+                mock.patch.object(datasets, "calc_performance",
+                                  return_value=self.calculated):
+            updates = datasets.iter_performance(self.models,
+                                                self.dataset_names)
+            # the cached result doesn't need admission
+            self.assertTrue(next(updates).from_cache)
+            with self.assertRaises(AdmissionRejectedException):
+                next(updates)
@@ -0,0 +1,127 @@
+from src.app.performance import imaging
+
+import unittest
+from unittest import mock
+
+
+def _get_perf(cuis, value):
+    return {
+        "Precision for each CUI": {cui: value for cui in cuis},
+        "Recall for each CUI": {cui: value for cui in cuis},
+        "F1 for each CUI": {cui: value for cui in cuis},
+    }
+
+
+EXAMPLE_RESULTS = {
+    "model1": {
+        "ds1": _get_perf(["C1", "C2", "C3"], 0.5),
+        "ds2": _get_perf(["C4", "C5"], 0.75),
+    },
+    "model2": {
+        "ds1": _get_perf(["C1", "C2", "C3"], 0.25),
+        "ds2": _get_perf(["C4", "C5"], 1.0),
+    },
+}
+
+
+class GetBuffersTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        imaging._RENDER_CACHE.cache.clear()
+
+    def test_has_buffer_for_each_dataset(self):
+        buffers = imaging.get_buffers(EXAMPLE_RESULTS)
+        self.assertEqual(set(buffers), {"ds1", "ds2"})
+        for ds_name, buffer in buffers.items():
+            with self.subTest(ds_name):
+                self.assertTrue(buffer)
+
+    def test_does_not_rerender_cached(self):
+        buffers1 = imaging.get_buffers(EXAMPLE_RESULTS)
+        with mock.patch.object(imaging, "_render_spec") as render:
+            buffers2 = imaging.get_buffers(EXAMPLE_RESULTS)
+        render.assert_not_called()
+        self.assertEqual(buffers1, buffers2)
+
+    def test_rerenders_changed(self):
+        imaging.get_buffers(EXAMPLE_RESULTS)
+        changed = dict(EXAMPLE_RESULTS)
+        changed["model3"] = {"ds1": _get_perf(["C1", "C2", "C3"], 0.1)}
+        with mock.patch.object(imaging, "_render_spec",
+                               return_value="") as render:
+            imaging.get_buffers(changed)
+        # only ds1 changed
+        render.assert_called_once()
+
+
+class GetBufferForCUICountTrainTests(unittest.TestCase):
+    data = {"model1": {"C1": 10, "C2": 0}, "model2": {"C1": 5, "C2": 3}}
+    totals = [10, 8]
+
+    def setUp(self) -> None:
+        imaging._RENDER_CACHE.cache.clear()
+
+    def test_gets_buffer(self):
+        buffer = imaging.get_buffer_for_cui_count_train(self.data,
+                                                        self.totals)
+        self.assertTrue(buffer)
+
+    def test_uses_cache(self):
+        buffer1 = imaging.get_buffer_for_cui_count_train(self.data,
+                                                         self.totals)
+        with mock.patch.object(imaging, "_render_spec") as render:
+            buffer2 = imaging.get_buffer_for_cui_count_train(self.data,
+                                                             self.totals)
+        render.assert_not_called()
+        self.assertEqual(buffer1, buffer2)
+
+
+class PlotModeTests(unittest.TestCase):
+    many_cuis = [f"C{nr}" for nr in range(5000)]
+    results = {
+        "model1": {"ds1": _get_perf(many_cuis, 0.5)},
+        "model2": {"ds1": _get_perf(many_cuis, 0.75)},
+    }
+
+    def test_few_cuis_plots_all(self):
+        self.assertEqual(imaging.choose_plot_mode(10, 2),
+                         imaging.PLOT_MODE_FULL)
+
+    def test_many_cuis_plots_summary(self):
+        self.assertIn(imaging.choose_plot_mode(len(self.many_cuis), 1),
+                      (imaging.PLOT_MODE_TOPK, imaging.PLOT_MODE_HISTOGRAM))
+
+    def test_downsampled_has_limited_points(self):
+        per_model = imaging.get_per_dataset_plotted(self.results)["ds1"]
+        spec = imaging.get_dataset_plot_spec(
+            "ds1", per_model, mode=imaging.PLOT_MODE_DOWNSAMPLED,
+            max_points=100)
+        self.assertLessEqual(len(spec["labels"]), 100)
+        for series in spec["series"]:
+            with self.subTest(series["name"]):
+                self.assertEqual(len(series["values"]), len(spec["labels"]))
+
+    def test_topk_has_limited_cuis(self):
+        per_model = imaging.get_per_dataset_plotted(self.results)["ds1"]
+        spec = imaging.get_dataset_plot_spec(
+            "ds1", per_model, mode=imaging.PLOT_MODE_TOPK, top_k=10)
+        self.assertLessEqual(len(spec["labels"]), 20)
+
+    def test_histogram_counts_all_cuis(self):
+        per_model = imaging.get_per_dataset_plotted(self.results)["ds1"]
+        spec = imaging.get_dataset_plot_spec(
+            "ds1", per_model, mode=imaging.PLOT_MODE_HISTOGRAM)
+        self.assertEqual(len(spec["series"]), 1)
+        self.assertEqual(sum(spec["series"][0]["values"]),
+                         len(self.many_cuis))
+
+    def test_unknown_mode_fails(self):
+        per_model = imaging.get_per_dataset_plotted(self.results)["ds1"]
+        with self.assertRaises(ValueError):
+            imaging.get_dataset_plot_spec("ds1", per_model, mode="unknown")
+
+    def test_all_modes_render(self):
+        for mode in imaging.PLOT_MODES:
+            with self.subTest(mode):
+                buffers = imaging.get_buffers(self.results, mode=mode)
+                self.assertTrue(buffers["ds1"])
@@ -0,0 +1,53 @@
+from src.app.performance import views
+from src.app.performance.datasets import PerformanceUpdate
+
+from typing import List, Tuple
+from unittest import mock
+import unittest
+
+from flask import Flask
+
+from .test_datasets import FakeModel
+
+
+class PerformanceViewTests(unittest.TestCase):
+    models = {"m1": FakeModel("m1"), "m2": FakeModel("m2")}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        app = Flask(__name__)
+        app.register_blueprint(views.perf_bp)
+        cls.client = app.test_client()
+
+    def setUp(self) -> None:
+        patcher = mock.patch.object(views, "get_model_from_id",
+                                    side_effect=self.models.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_stream(self, model_ids) -> Tuple[int, List[str]]:
+        updates = [PerformanceUpdate(self.models[model_id], "ds1.json",
+                                     {"False positives": 1}, False)
+                   for model_id in model_ids if model_id in self.models]
+        with mock.patch.object(views, "iter_performance",
+                               return_value=iter(updates)):
+            resp = self.client.get("/api/performance_stream", query_string={
+                "selected_models": model_ids,
+                "selected_datasets": ["/datasets/ds1.json"]})
+            # NOTE: the events are generated as the body is read
+            events = resp.get_data(as_text=True).split("\n\n")
+        return resp.status_code, events
+
+    def test_stream_starts_with_number_of_found_models(self):
+        _, events = self.get_stream(["m1", "unknown", "m2"])
+        self.assertEqual(events[0], 'event: start\ndata: {"models": 2}')
+        self.assertEqual(sum(event.startswith("event: result")
+                             for event in events), 2)
+
+    def test_stream_with_no_found_models_is_not_found(self):
+        self.assertEqual(self.get_stream(["unknown"])[0], 404)
+
+    def test_data_with_no_found_models_is_not_found(self):
+        resp = self.client.get("/api/performance_data", query_string={
+            "selected_models": ["unknown"], "dataset": "/datasets/ds1.json"})
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,64 @@
+from src.app.performance import warmer
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+
+class MemoryBudgetTests(unittest.TestCase):
+
+    def test_allows_oversized_when_empty(self):
+        budget = warmer.MemoryBudget(10)
+        budget.acquire(100)
+        self.assertEqual(budget.used_bytes, 100)
+
+    def test_waits_for_release(self):
+        budget = warmer.MemoryBudget(10)
+        budget.acquire(8)
+        acquired = threading.Event()
+
+        def _acquire():
+            budget.acquire(5)
+            acquired.set()
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        budget.release(8)
+        thread.join(timeout=1)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(budget.used_bytes, 5)
+
+
+class FakeModel:
+    id = "model-id"
+    name = "model name"
+    model_file_name = "model.zip"
+    cdb_hash = "cdb-hash"
+
+
+class PerformanceWarmerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.warmer = warmer.PerformanceWarmer(Flask(__name__), 1, 1024)
+
+    def test_evaluates_queued(self):
+        with mock.patch.object(warmer, "find_or_load_performance") as calc:
+            self.warmer.queue(FakeModel(), ["ds1", "ds2"])
+            self.warmer._executor.shutdown(wait=True)
+        calc.assert_called_once()
+        self.assertEqual(calc.call_args[0][1], ["ds1", "ds2"])
+
+    def test_does_not_queue_twice(self):
+        blocker = threading.Event()
+        with mock.patch.object(warmer, "find_or_load_performance",
+                               side_effect=lambda *_: blocker.wait(1)
+                               ) as calc:
+            self.warmer.queue(FakeModel(), ["ds1"])
+            self.warmer.queue(FakeModel(), ["ds1"])
+            blocker.set()
+            self.warmer._executor.shutdown(wait=True)
+        calc.assert_called_once()
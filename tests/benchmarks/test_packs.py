@@ -0,0 +1,72 @@
+from benchmarks.packs import make_model_pack, make_dataset
+
+from src.app.medcat_linkage.medcat_integration import (
+    load_CAT, get_model_performance_with_dataset
+)
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+
+NR_OF_CUIS = 20
+NAMES_PER_CUI = 2
+
+
+class SyntheticPackTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._temp_dir = tempfile.TemporaryDirectory()
+        cls.pack = make_model_pack(cls._temp_dir.name, seed=1,
+                                   nr_of_cuis=NR_OF_CUIS,
+                                   names_per_cui=NAMES_PER_CUI,
+                                   vocab_size=200, vector_size=20)
+        cls.dataset_path = make_dataset(
+            cls.pack, os.path.join(cls._temp_dir.name, "dataset.json"),
+            nr_of_docs=3, annotations_per_doc=5)
+        with open(cls.dataset_path) as f:
+            cls.dataset = json.load(f)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._temp_dir.cleanup()
+
+    def test_pack_loads(self):
+        cat = load_CAT(self.pack.file_path, keep_in_cache=False)
+        self.assertEqual(len(cat.cdb.cui2names), NR_OF_CUIS)
+
+    def test_has_cdb_hash_of_loaded_model(self):
+        cat = load_CAT(self.pack.file_path, keep_in_cache=False)
+        self.assertEqual(cat.cdb.get_hash(), self.pack.cdb_hash)
+
+    def test_names(self):
+        self.assertEqual(len(self.pack.names), NR_OF_CUIS)
+        for names in self.pack.names.values():
+            self.assertEqual(len(names), NAMES_PER_CUI)
+
+    def test_is_seeded(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pack = make_model_pack(temp_dir, seed=1, nr_of_cuis=NR_OF_CUIS,
+                                   names_per_cui=NAMES_PER_CUI,
+                                   vocab_size=200, vector_size=20)
+        self.assertEqual(os.path.basename(pack.file_path),
+                         os.path.basename(self.pack.file_path))
+        self.assertEqual(pack.cdb_hash, self.pack.cdb_hash)
+
+    def test_annotations_match_text(self):
+        for doc in self.dataset["projects"][0]["documents"]:
+            for ann in doc["annotations"]:
+                with self.subTest(f"{doc['name']}: {ann['id']}"):
+                    self.assertEqual(doc["text"][ann["start"]:ann["end"]],
+                                     ann["value"])
+                    self.assertIn(ann["value"], self.pack.names[ann["cui"]])
+
+    def test_model_finds_annotations(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            perf = get_model_performance_with_dataset(self.pack.file_path,
+                                                      self.dataset_path)
+        self.assertGreater(perf["True positives"], 0)